@@ -0,0 +1,250 @@
+"""
+Micro-batching encoder service for asyncio code and plain threads.
+
+When many coroutines or threads each ask for one embedding, encoding them
+one by one runs a batch-size-1 forward pass per call. This service puts
+requests on a queue; a single background thread collects everything that
+arrives within a short window (max_wait_ms, up to max_batch_size texts),
+encodes it as one batch and fans the results back out.
+
+Example (asyncio):
+    >>> from async_encoder import embed
+    >>> vectors = await asyncio.gather(*(embed(t) for t in sentences))
+
+Example (threads):
+    >>> from async_encoder import embed_sync
+    >>> vector = embed_sync("Hello world")   # safe from any thread
+
+Environment Variables:
+    EMBEDDING_MAX_BATCH: Largest coalesced batch (default: 64)
+    EMBEDDING_MAX_WAIT_MS: How long the first request waits for company (default: 5)
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from embedding_batching import encode_length_bucketed
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Queue sentinel telling the worker thread to exit
+_STOP = object()
+
+
+class MicroBatchEncoder:
+    """
+    Coalesce concurrent single-text requests into batched model.encode calls.
+
+    Use as a context manager, or call close() when done:
+        >>> with MicroBatchEncoder() as encoder:
+        ...     vector = encoder.encode("Hello")            # from a thread
+        ...     vector = await encoder.embed("Hello")       # from a coroutine
+    """
+
+    def __init__(self, model=None, max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None):
+        """
+        Args:
+            model: Model with encode() (defaults to model_loader.get_model(),
+                loaded by the worker thread on first request)
+            max_batch_size: Largest batch to encode at once
+            max_wait_ms: Longest time the oldest request waits for a batch to fill
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size or int(
+            os.environ.get('EMBEDDING_MAX_BATCH', DEFAULT_MAX_BATCH_SIZE))
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else float(
+            os.environ.get('EMBEDDING_MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS))
+
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._thread = threading.Thread(target=self._run, name='micro-batch-encoder', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # -- public API ---------------------------------------------------------
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the Future resolves to its (dim,) float32 embedding."""
+        # Checked and queued under the lock close() takes, so every request
+        # is queued before the stop sentinel and gets served
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatchEncoder is closed")
+            future: Future = Future()
+            self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """Blocking embed for threads."""
+        return self.submit(text).result(timeout)
+
+    def encode_many(self, texts: Sequence[str], timeout: Optional[float] = None) -> List[np.ndarray]:
+        """Blocking embed of several texts, which may share batches with other callers."""
+        futures = [self.submit(t) for t in texts]
+        return [f.result(timeout) for f in futures]
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Awaitable embed for coroutines; does not block the event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    async def embed_many(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """Awaitable embed of several texts, in input order."""
+        return list(await asyncio.gather(*(self.embed(t) for t in texts)))
+
+    def stats(self) -> dict:
+        """Requests served, batches run and mean batch size."""
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'batches': self._batches,
+                'mean_batch_size': self._requests / self._batches if self._batches else 0.0,
+            }
+
+    def close(self, timeout: Optional[float] = None):
+        """Finish queued requests, then stop the worker thread."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # -- worker -------------------------------------------------------------
+
+    def _collect_batch(self, first) -> tuple:
+        """Gather requests until the batch is full or the wait window closes."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stopping = self._collect_batch(item)
+            self._serve(batch)
+
+        # Serve anything still queued behind the stop sentinel
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._serve(leftovers)
+
+    def _serve(self, batch):
+        """Encode a batch; whatever happens, no request is left pending."""
+        try:
+            self._encode_batch(batch)
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _ensure_model(self):
+        """The model, loading the default one if needed."""
+        if self.model is None:
+            from model_loader import ModelLoadError, get_model
+            try:
+                self.model = get_model()
+            except SystemExit as e:
+                # load_model exits on failure; fail the requests, not the worker thread
+                raise ModelLoadError(f"Could not load the embedding model (exit status {e.code})") from None
+        return self.model
+
+    def _encode_batch(self, batch):
+        # Skip requests whose caller has already given up
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        with self._lock:
+            self._requests += len(batch)
+            self._batches += 1
+
+        try:
+            model = self._ensure_model()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        try:
+            unique = list(dict.fromkeys(text for text, _ in batch))
+            vectors = dict(zip(unique, encode_length_bucketed(model, unique)))
+        except Exception:
+            self._encode_one_by_one(batch)
+            return
+
+        for text, future in batch:
+            future.set_result(vectors[text].copy())
+
+    def _encode_one_by_one(self, batch):
+        """Retry individually so one bad input only fails its own request."""
+        for text, future in batch:
+            try:
+                vector = np.asarray(self.model.encode([text], convert_to_numpy=True), dtype=np.float32)[0]
+                future.set_result(vector)
+            except Exception as e:
+                future.set_exception(e)
+
+
+_default_encoder: Optional[MicroBatchEncoder] = None
+_default_encoder_lock = threading.Lock()
+
+
+def get_encoder() -> MicroBatchEncoder:
+    """Get the shared encoder built on model_loader.get_model()."""
+    global _default_encoder
+
+    with _default_encoder_lock:
+        if _default_encoder is None or _default_encoder._closed:
+            _default_encoder = MicroBatchEncoder()
+        return _default_encoder
+
+
+async def embed(text: str) -> np.ndarray:
+    """Embed one text through the shared micro-batching encoder."""
+    return await get_encoder().embed(text)
+
+
+async def embed_many(texts: Sequence[str]) -> List[np.ndarray]:
+    """Embed several texts through the shared micro-batching encoder."""
+    return await get_encoder().embed_many(texts)
+
+
+def embed_sync(text: str, timeout: Optional[float] = None) -> np.ndarray:
+    """Embed one text from a plain thread through the shared encoder."""
+    return get_encoder().encode(text, timeout)
@@ -0,0 +1,539 @@
+"""
+Vectorized group-by statistics for semantic drift results.
+
+Grouping a results list with one list comprehension per key is
+O(keys x N) Python work. Here, keys are factorized to integer codes once
+and every statistic is computed for all groups together:
+- count, mean and std from np.bincount
+- min, max, median and percentiles from one sort by (group, value), read
+  at each group's offsets
+
+Keys can be any column (typo_rate, domain, language chain, model...), or
+several columns at once, in which case groups are keyed by tuples. Rows
+whose value is NaN or whose key is missing (None/NaN) are skipped.
+
+Uncertainty:
+- bootstrap_ci() gives percentile bootstrap confidence intervals for a
+  mean, median or any axis-aware statistic; group_bootstrap_ci() does so
+  per group
+- permutation_test() tests whether two groups differ (difference of means
+  or medians); pairwise_permutation_tests() runs it between groups
+
+Resampling is vectorized, with no Python loop per resample:
+- method='exact': each block of resamples is an index matrix (or a
+  row-wise permuted matrix) reduced along its last axis. Cost is
+  O(resamples x rows), about 15 ns per drawn value.
+- method='binned' (mean and median only): the sorted sample is cut into
+  `bins` equal-count quantile bins and each block draws a (block, bins)
+  matrix of how many values every resample takes from every bin
+  (multinomial for the bootstrap, multivariate hypergeometric for
+  permutations). Within a bin the draws are summarized by the bin's mean
+  and variance (mean) or its interpolated quantiles (median), so cost is
+  O(resamples x bins) whatever the row count. With 1024 bins the
+  within-bin spread is a tiny fraction of the sample's, and intervals
+  agree with the exact method to within Monte Carlo error.
+- method='auto' (default) uses exact unless resamples x rows exceeds
+  DEFAULT_EXACT_ELEMENTS and the sample has at least MIN_ROWS_PER_BIN
+  rows per bin.
+
+Blocks are sized to at most max_block_elements values, so memory stays
+bounded however many rows and resamples are requested. Results are
+reproducible for a given seed, method and max_block_elements.
+
+Example:
+    >>> from drift_stats import group_stats
+    >>> stats = group_stats(distances, by=typo_rates)
+    >>> stats[30]['mean'], stats[30]['p75'], stats[30]['n']
+    >>> stats = group_stats(distances, by=[typo_rates, domains])   # keys like (30, 'Physics')
+    >>> bootstrap_ci(distances[typo_rates == 30], seed=0)
+    {'estimate': ..., 'low': ..., 'high': ..., 'se': ..., ...}
+    >>> permutation_test(distances[typo_rates == 30], distances[typo_rates == 25], seed=0)['p_value']
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+DEFAULT_PERCENTILES = (25, 75)
+DEFAULT_RESAMPLES = 10000
+DEFAULT_CONFIDENCE = 0.95
+
+# Values per resampling block: 2**24 float64 values is 128 MB
+DEFAULT_MAX_BLOCK_ELEMENTS = 2 ** 24
+
+# method='auto' switches to binned resampling above this many drawn values
+DEFAULT_EXACT_ELEMENTS = 2 ** 26
+DEFAULT_BINS = 1024
+MIN_ROWS_PER_BIN = 16
+METHODS = ('auto', 'exact', 'binned')
+
+Statistic = Union[str, Callable[..., np.ndarray]]
+
+
+def _is_missing(key) -> bool:
+    return key is None or (isinstance(key, float) and key != key)
+
+
+def factorize(keys: Sequence) -> Tuple[np.ndarray, list]:
+    """
+    Map keys to integer codes.
+
+    Args:
+        keys: One key per row (numbers, strings, None...)
+
+    Returns:
+        (codes, uniques): codes[i] indexes uniques, or is -1 for a missing
+        key. uniques are sorted; with mixed key types, numbers come first
+        and other keys follow in string order.
+    """
+    array = np.asarray(keys)
+    if array.dtype.kind in 'US':
+        uniques, codes = np.unique(array, return_inverse=True)
+        return codes.astype(np.intp), uniques.tolist()
+    if array.dtype.kind in 'biuf':
+        valid = ~np.isnan(array) if array.dtype.kind == 'f' else np.ones(len(array), dtype=bool)
+        uniques, codes = np.unique(array[valid], return_inverse=True)
+        full = np.full(len(array), -1, dtype=np.intp)
+        full[valid] = codes
+        return full, [u.item() for u in uniques]
+
+    keys = list(keys)
+    present = sorted({k for k in keys if not _is_missing(k)}, key=_sort_key)
+    lookup = {k: i for i, k in enumerate(present)}
+    codes = np.fromiter((lookup.get(k, -1) if not _is_missing(k) else -1 for k in keys),
+                        dtype=np.intp, count=len(keys))
+    return codes, present
+
+
+def _sort_key(key):
+    """Sort numbers before strings and other keys, each group in natural order."""
+    if isinstance(key, (int, float, np.number)) and not isinstance(key, bool):
+        return (0, float(key), '')
+    return (1, 0.0, str(key))
+
+
+def _combine_codes(code_columns: List[np.ndarray], unique_columns: List[list]) -> Tuple[np.ndarray, list]:
+    """Combine per-column codes into one code per distinct tuple of keys."""
+    valid = np.all([c >= 0 for c in code_columns], axis=0)
+    shape = tuple(max(1, len(u)) for u in unique_columns)
+    flat = np.ravel_multi_index(tuple(c[valid] for c in code_columns), shape)
+    flat_uniques, inverse = np.unique(flat, return_inverse=True)
+    codes = np.full(len(valid), -1, dtype=np.intp)
+    codes[valid] = inverse.reshape(-1)
+    keys = [tuple(unique_columns[j][i] for j, i in enumerate(row))
+            for row in zip(*np.unravel_index(flat_uniques, shape))]
+    return codes, keys
+
+
+def _segment_percentiles(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray,
+                         q: float) -> np.ndarray:
+    """Linear-interpolated q-th percentile of every sorted segment (np.percentile's default)."""
+    position = (counts - 1) * (q / 100.0)
+    lower = np.floor(position).astype(np.intp)
+    upper = np.minimum(lower + 1, counts - 1)
+    low_values = sorted_values[starts + lower]
+    high_values = sorted_values[starts + upper]
+    return low_values + (high_values - low_values) * (position - lower)
+
+
+def _group_sort_order(codes: np.ndarray, values: np.ndarray, num_groups: int) -> np.ndarray:
+    """
+    Row order sorted by (group, value).
+
+    Sorts values once, then stable-sorts the group codes in that order.
+    Codes narrowed to 16 bits use NumPy's radix sort, which is several
+    times faster than np.lexsort on millions of rows.
+    """
+    by_value = np.argsort(values)
+    group_codes = codes[by_value]
+    if num_groups <= np.iinfo(np.uint16).max:
+        group_codes = group_codes.astype(np.uint16)
+    return by_value[np.argsort(group_codes, kind='stable')]
+
+
+def group_stats(values: Sequence[float], by, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+    """
+    Per-group count, mean, std, min, max, median and percentiles.
+
+    Args:
+        values: One value per row (NaN rows are skipped)
+        by: One key per row, or a list of key columns to group by tuples
+        percentiles: Extra percentiles to report, as 'p<q>' entries
+
+    Returns:
+        {key: {'n', 'mean', 'std', 'min', 'max', 'median', 'p25', 'p75', ...,
+        'values'}} in sorted key order. 'values' is the group's values,
+        sorted ascending. std is the population std (ddof=0), like np.std.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if isinstance(by, list) and by and not np.isscalar(by[0]) and by[0] is not None:
+        columns = [factorize(column) for column in by]
+        codes, keys = _combine_codes([c for c, _ in columns], [u for _, u in columns])
+    else:
+        codes, keys = factorize(by)
+    if len(codes) != len(values):
+        raise ValueError(f"Got {len(values)} values but {len(codes)} keys")
+
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    if len(values) == 0:
+        return {}
+
+    counts = np.bincount(codes, minlength=len(keys))
+    present = np.flatnonzero(counts)
+    counts = counts[present]
+
+    # Renumber to present groups only, then sort rows by (group, value)
+    remap = np.full(len(keys), -1, dtype=np.intp)
+    remap[present] = np.arange(len(present))
+    codes = remap[codes]
+    order = _group_sort_order(codes, values, len(present))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    means = np.bincount(codes, weights=values) / counts
+    stds = np.sqrt(np.bincount(codes, weights=(values - means[codes]) ** 2) / counts)
+    columns = {
+        'n': counts,
+        'mean': means,
+        'std': stds,
+        'min': sorted_values[starts],
+        'max': sorted_values[starts + counts - 1],
+        'median': _segment_percentiles(sorted_values, starts, counts, 50),
+    }
+    for q in percentiles:
+        columns[f"p{q:g}"] = _segment_percentiles(sorted_values, starts, counts, q)
+
+    stats = {}
+    for g, key_index in enumerate(present):
+        group = {name: column[g].item() for name, column in columns.items()}
+        group['values'] = sorted_values[starts[g]:starts[g] + counts[g]]
+        stats[keys[key_index]] = group
+    return stats
+
+
+def results_column(results: Sequence[dict], field: str) -> list:
+    """One field from every result dict (None where missing)."""
+    return [r.get(field) for r in results]
+
+
+def result_distances(results: Sequence[dict]) -> np.ndarray:
+    """Distances from result dicts as float64, NaN where the distance failed."""
+    return np.array([np.nan if r.get('distance') is None else r['distance'] for r in results],
+                    dtype=np.float64)
+
+
+def _statistic_function(statistic: Statistic) -> Callable[..., np.ndarray]:
+    """Resolve 'mean'/'median' or a callable f(samples, axis=-1)."""
+    if callable(statistic):
+        return statistic
+    if statistic == 'mean':
+        return np.mean
+    if statistic == 'median':
+        return np.median
+    raise ValueError(f"Unknown statistic: {statistic}. Use 'mean', 'median' or a callable")
+
+
+def _resolve_method(method: str, statistic: Statistic, num_rows: int, num_resamples: int, bins: int) -> str:
+    """'exact' or 'binned' for a request (see the module docstring)."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}. Use one of {', '.join(METHODS)}")
+    binnable = statistic in ('mean', 'median')
+    if method == 'binned' and not binnable:
+        raise ValueError("method='binned' supports only the 'mean' and 'median' statistics")
+    if method == 'auto':
+        large = num_rows * num_resamples > DEFAULT_EXACT_ELEMENTS
+        return 'binned' if binnable and large and num_rows >= bins * MIN_ROWS_PER_BIN else 'exact'
+    return method
+
+
+def _clean(values: Sequence[float]) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return values[~np.isnan(values)]
+
+
+def _block_rows(row_length: int, total: int, max_block_elements: int) -> int:
+    """Resamples per block so that a block holds at most max_block_elements values."""
+    return int(max(1, min(total, max_block_elements // max(1, row_length))))
+
+
+class _QuantileBins:
+    """A sorted sample cut into equal-count bins, with per-bin summaries."""
+
+    def __init__(self, values: np.ndarray, bins: int):
+        self.sorted = np.sort(values)
+        bins = int(max(1, min(bins, len(values))))
+        edges = np.linspace(0, len(values), bins + 1).astype(np.int64)
+        self.starts = edges[:-1]
+        self.sizes = np.diff(edges)
+        sums = np.add.reduceat(self.sorted, self.starts)
+        self.means = sums / self.sizes
+        deviations = self.sorted - np.repeat(self.means, self.sizes)
+        self.variances = np.add.reduceat(deviations * deviations, self.starts) / self.sizes
+        self.total = float(sums.sum())
+
+    def sums(self, counts: np.ndarray, rng: np.random.Generator, replace: bool) -> np.ndarray:
+        """
+        Sum of the drawn values per row of counts (rows, bins).
+
+        The draws within each bin are summarized by a normal term with their
+        exact conditional mean and variance (with or without replacement).
+        """
+        if replace:
+            spread = self.variances
+        else:
+            spread = self.variances * self.sizes / np.maximum(self.sizes - 1, 1)
+        variance = counts @ spread
+        if not replace:
+            variance -= (counts * counts) @ (spread / self.sizes)
+        noise = np.sqrt(np.maximum(variance, 0.0)) * rng.standard_normal(len(counts))
+        return counts @ self.means + noise
+
+    def order_statistic(self, counts: np.ndarray, rank: np.ndarray) -> np.ndarray:
+        """
+        Value of the given 0-based rank among each row's draws, read as the
+        matching within-bin quantile of the bin it falls in.
+        """
+        rows = np.arange(len(counts))
+        cumulative = np.cumsum(counts, axis=1)
+        bin_index = np.argmax(cumulative > rank[:, None], axis=1)
+        drawn = counts[rows, bin_index]
+        within = rank - (cumulative[rows, bin_index] - drawn)
+        size = self.sizes[bin_index]
+        position = (within + 0.5) / drawn * size - 0.5
+        position = np.clip(position, 0, size - 1) + self.starts[bin_index]
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, len(self.sorted) - 1)
+        fraction = position - lower
+        return self.sorted[lower] * (1 - fraction) + self.sorted[upper] * fraction
+
+    def statistic(self, counts: np.ndarray, statistic: str, rng: np.random.Generator,
+                  replace: bool) -> np.ndarray:
+        """Mean or median of each row's draws."""
+        drawn = counts.sum(axis=1)
+        if statistic == 'mean':
+            return self.sums(counts, rng, replace) / drawn
+        return (self.order_statistic(counts, (drawn - 1) // 2)
+                + self.order_statistic(counts, drawn // 2)) / 2
+
+
+def bootstrap_distribution(values: Sequence[float], statistic: Statistic = 'mean',
+                           n_resamples: int = DEFAULT_RESAMPLES, seed=None,
+                           max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+                           method: str = 'auto', bins: int = DEFAULT_BINS) -> np.ndarray:
+    """
+    The statistic on n_resamples bootstrap resamples of values.
+
+    The exact method draws a (block, n) matrix of row indices with
+    replacement per block and reduces it along the last axis. The binned
+    method draws a (block, bins) multinomial matrix of per-bin counts.
+
+    Args:
+        values: Sample (NaN entries are dropped)
+        statistic: 'mean', 'median' or a callable f(samples, axis=-1)
+        n_resamples: Number of bootstrap resamples
+        seed: Seed or np.random.Generator
+        max_block_elements: Values held per block
+        method: 'auto', 'exact' or 'binned'
+        bins: Quantile bins for the binned method
+
+    Returns:
+        (n_resamples,) float64 array
+    """
+    values = _clean(values)
+    if len(values) == 0:
+        raise ValueError("Cannot bootstrap an empty sample")
+    func = _statistic_function(statistic)
+    method = _resolve_method(method, statistic, len(values), n_resamples, bins)
+    rng = np.random.default_rng(seed)
+    out = np.empty(n_resamples, dtype=np.float64)
+
+    if method == 'binned':
+        quantile_bins = _QuantileBins(values, bins)
+        probabilities = quantile_bins.sizes / len(values)
+        block = _block_rows(len(probabilities), n_resamples, max_block_elements)
+        for start in range(0, n_resamples, block):
+            rows = min(block, n_resamples - start)
+            counts = rng.multinomial(len(values), probabilities, size=rows).astype(np.float64)
+            out[start:start + rows] = quantile_bins.statistic(counts, statistic, rng, replace=True)
+        return out
+
+    index_dtype = np.int32 if len(values) < 2 ** 31 else np.int64
+    block = _block_rows(len(values), n_resamples, max_block_elements)
+    for start in range(0, n_resamples, block):
+        rows = min(block, n_resamples - start)
+        indices = rng.integers(0, len(values), size=(rows, len(values)), dtype=index_dtype)
+        out[start:start + rows] = func(values[indices], axis=-1)
+    return out
+
+
+def bootstrap_ci(values: Sequence[float], statistic: Statistic = 'mean',
+                 n_resamples: int = DEFAULT_RESAMPLES, confidence: float = DEFAULT_CONFIDENCE,
+                 seed=None, max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+                 method: str = 'auto', bins: int = DEFAULT_BINS) -> dict:
+    """
+    Percentile bootstrap confidence interval.
+
+    Args:
+        values: Sample (NaN entries are dropped)
+        statistic: 'mean', 'median' or a callable f(samples, axis=-1)
+        n_resamples: Number of bootstrap resamples
+        confidence: Interval coverage, e.g. 0.95
+        seed: Seed or np.random.Generator
+        max_block_elements: Values held per resampling block
+        method: 'auto', 'exact' or 'binned'
+        bins: Quantile bins for the binned method
+
+    Returns:
+        Dict with estimate (statistic on the full sample), low, high,
+        se (bootstrap standard error), n, n_resamples and confidence
+    """
+    values = _clean(values)
+    distribution = bootstrap_distribution(values, statistic, n_resamples, seed, max_block_elements,
+                                          method, bins)
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.percentile(distribution, [100 * alpha, 100 * (1 - alpha)])
+    return {
+        'estimate': float(_statistic_function(statistic)(values, axis=-1)),
+        'low': float(low),
+        'high': float(high),
+        'se': float(distribution.std(ddof=1)) if n_resamples > 1 else 0.0,
+        'n': len(values),
+        'n_resamples': n_resamples,
+        'confidence': confidence,
+    }
+
+
+def group_bootstrap_ci(values: Sequence[float], by, statistic: Statistic = 'mean',
+                       n_resamples: int = DEFAULT_RESAMPLES, confidence: float = DEFAULT_CONFIDENCE,
+                       seed=None, max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+                       method: str = 'auto', bins: int = DEFAULT_BINS) -> Dict:
+    """
+    bootstrap_ci() for every group, keyed like group_stats().
+
+    All groups draw from one generator, so a seed fixes every interval.
+    """
+    rng = np.random.default_rng(seed)
+    return {
+        key: bootstrap_ci(group['values'], statistic, n_resamples, confidence, rng, max_block_elements,
+                          method, bins)
+        for key, group in group_stats(values, by, percentiles=()).items()
+    }
+
+
+def _permutation_differences(a: np.ndarray, b: np.ndarray, statistic: Statistic, n_permutations: int,
+                             rng: np.random.Generator, max_block_elements: int, method: str,
+                             bins: int):
+    """Yield blocks of statistic(a) - statistic(b) under random relabelings."""
+    pooled = np.concatenate([a, b])
+    if method == 'binned':
+        quantile_bins = _QuantileBins(pooled, bins)
+        sizes = quantile_bins.sizes
+        block = _block_rows(len(sizes), n_permutations, max_block_elements)
+        for start in range(0, n_permutations, block):
+            rows = min(block, n_permutations - start)
+            counts_a = rng.multivariate_hypergeometric(sizes, len(a), size=rows, method='marginals')
+            counts_a = counts_a.astype(np.float64)
+            if statistic == 'mean':
+                sums_a = quantile_bins.sums(counts_a, rng, replace=False)
+                yield sums_a / len(a) - (quantile_bins.total - sums_a) / len(b)
+            else:
+                yield (quantile_bins.statistic(counts_a, statistic, rng, replace=False)
+                       - quantile_bins.statistic(sizes - counts_a, statistic, rng, replace=False))
+        return
+
+    func = _statistic_function(statistic)
+    block = _block_rows(len(pooled), n_permutations, max_block_elements)
+    for start in range(0, n_permutations, block):
+        rows = min(block, n_permutations - start)
+        shuffled = rng.permuted(np.broadcast_to(pooled, (rows, len(pooled))), axis=1)
+        yield func(shuffled[:, :len(a)], axis=-1) - func(shuffled[:, len(a):], axis=-1)
+
+
+def permutation_test(a: Sequence[float], b: Sequence[float], statistic: Statistic = 'mean',
+                     n_permutations: int = DEFAULT_RESAMPLES, alternative: str = 'two-sided',
+                     seed=None, max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+                     method: str = 'auto', bins: int = DEFAULT_BINS) -> dict:
+    """
+    Permutation test for a difference between two samples.
+
+    The test statistic is statistic(a) - statistic(b). The exact method
+    shuffles (block, n_a + n_b) copies of the pooled sample row-wise with
+    Generator.permuted and splits every row into pseudo-groups. The binned
+    method draws how many of each pooled bin's rows land in a from a
+    multivariate hypergeometric distribution.
+
+    Args:
+        a, b: Samples (NaN entries are dropped)
+        statistic: 'mean', 'median' or a callable f(samples, axis=-1)
+        n_permutations: Number of random relabelings
+        alternative: 'two-sided', 'greater' (a > b) or 'less' (a < b)
+        seed: Seed or np.random.Generator
+        max_block_elements: Values held per permutation block
+        method: 'auto', 'exact' or 'binned'
+        bins: Quantile bins of the pooled sample for the binned method
+
+    Returns:
+        Dict with difference, p_value, n_a, n_b and n_permutations.
+        p-values count the observed labeling, (hits + 1) / (n + 1), so they
+        are never 0.
+    """
+    if alternative not in ('two-sided', 'greater', 'less'):
+        raise ValueError(f"Unknown alternative: {alternative}. Use 'two-sided', 'greater' or 'less'")
+    a, b = _clean(a), _clean(b)
+    if len(a) == 0 or len(b) == 0:
+        raise ValueError("Both samples need at least one value")
+
+    func = _statistic_function(statistic)
+    method = _resolve_method(method, statistic, len(a) + len(b), n_permutations, bins)
+    rng = np.random.default_rng(seed)
+    observed = float(func(a, axis=-1) - func(b, axis=-1))
+
+    hits = 0
+    for differences in _permutation_differences(a, b, statistic, n_permutations, rng,
+                                                max_block_elements, method, bins):
+        if alternative == 'two-sided':
+            hits += int(np.count_nonzero(np.abs(differences) >= abs(observed) - 1e-12))
+        elif alternative == 'greater':
+            hits += int(np.count_nonzero(differences >= observed - 1e-12))
+        else:
+            hits += int(np.count_nonzero(differences <= observed + 1e-12))
+
+    return {
+        'difference': observed,
+        'p_value': (hits + 1) / (n_permutations + 1),
+        'n_a': len(a),
+        'n_b': len(b),
+        'n_permutations': n_permutations,
+        'alternative': alternative,
+    }
+
+
+def pairwise_permutation_tests(values: Sequence[float], by, pairs: Optional[Sequence[tuple]] = None,
+                               statistic: Statistic = 'mean', n_permutations: int = DEFAULT_RESAMPLES,
+                               seed=None, max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+                               method: str = 'auto', bins: int = DEFAULT_BINS) -> Dict:
+    """
+    Two-sided permutation_test() between groups.
+
+    Args:
+        values: One value per row
+        by: One key per row
+        pairs: (key_a, key_b) pairs to test (default: each group against the
+            next in sorted key order, e.g. 20% vs 25%, 25% vs 30%...)
+
+    Returns:
+        {(key_a, key_b): permutation_test result}. p-values are not
+        adjusted for multiple comparisons.
+    """
+    groups = group_stats(values, by, percentiles=())
+    keys = list(groups)
+    if pairs is None:
+        pairs = list(zip(keys, keys[1:]))
+    rng = np.random.default_rng(seed)
+    return {
+        (key_a, key_b): permutation_test(groups[key_a]['values'], groups[key_b]['values'], statistic,
+                                         n_permutations, 'two-sided', rng, max_block_elements,
+                                         method, bins)
+        for key_a, key_b in pairs
+    }
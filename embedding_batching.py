@@ -0,0 +1,366 @@
+"""
+Length-bucketed batching for sentence encoders.
+
+Our corpora mix 6-word chat lines, 30-word technical sentences and
+1,500-character stress inputs. A batch is padded to its longest member, so
+fixed-size batches of mixed lengths spend most of their compute on padding.
+
+This module:
+1. Measures each input's tokenized length (truncated to max_seq_length)
+2. Sorts inputs by length so each batch holds similar lengths
+3. Sizes batches by a token budget (batch size x longest member) instead of
+   a fixed count: many short inputs per batch, few long ones
+4. Restores the original order on output
+
+compute_embeddings_batch() also encodes each distinct string once and
+scatters the result back to every duplicate. With normalize=True, strings
+that differ only in whitespace or Unicode composition (NFC) count as
+duplicates too.
+
+For corpora that do not fit in memory, iter_embeddings() streams any
+iterable in chunks, and embed_to_memmap() writes each chunk straight into a
+preallocated (N, dim) float32 np.memmap on disk. Progress is recorded next
+to the memmap, so a crashed run resumes from the last finished chunk.
+
+Example:
+    >>> from embedding_batching import compute_embeddings_batch
+    >>> embeddings = compute_embeddings_batch(texts)   # list in input order
+    >>> embeddings = compute_embeddings_batch(texts, workers='auto')   # all cores
+    >>> lines = (line.rstrip('\n') for line in open('corpus.txt'))
+    >>> matrix = embed_to_memmap(lines, 'corpus.f32', num_rows=5_000_000)
+
+Environment Variables:
+    EMBEDDING_BATCH_TOKENS: Token budget per batch (default: the model's
+        tuned_max_tokens from model_tuning, else 8192)
+"""
+
+import itertools
+import json
+import os
+import unicodedata
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+DEFAULT_MAX_TOKENS = 8192
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_SEQ_LENGTH = 256
+DEFAULT_CHUNK_SIZE = 4096
+
+# [CLS] and [SEP]
+_SPECIAL_TOKENS = 2
+
+
+def get_default_max_tokens(model=None) -> int:
+    """
+    Get the per-batch token budget.
+
+    EMBEDDING_BATCH_TOKENS wins, then the host-tuned budget that
+    model_tuning sets on the model, then DEFAULT_MAX_TOKENS.
+    """
+    env_tokens = os.environ.get('EMBEDDING_BATCH_TOKENS')
+    if env_tokens:
+        return int(env_tokens)
+    return getattr(model, 'tuned_max_tokens', None) or DEFAULT_MAX_TOKENS
+
+
+def approximate_token_length(text: str) -> int:
+    """Rough WordPiece length for English text when no tokenizer is available."""
+    return len(text.split()) * 4 // 3 + _SPECIAL_TOKENS
+
+
+def token_lengths(model, texts: Sequence[str]) -> List[int]:
+    """
+    Tokenized length of each text, capped at the model's max_seq_length.
+
+    Uses the model's own tokenizer when it has one: a Hugging Face tokenizer
+    (SentenceTransformer) or a `tokenizers.Tokenizer` (ONNX backend).
+    Otherwise falls back to approximate_token_length.
+    """
+    max_len = getattr(model, 'max_seq_length', None) or DEFAULT_MAX_SEQ_LENGTH
+    texts = list(texts)
+    tokenizer = getattr(model, 'tokenizer', None)
+
+    lengths = None
+    if tokenizer is not None:
+        try:
+            if hasattr(tokenizer, 'encode_batch'):
+                # tokenizers.Tokenizer may pad; the attention mask counts real tokens
+                lengths = [sum(e.attention_mask) for e in tokenizer.encode_batch(texts)]
+            else:
+                encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_len)
+                lengths = [len(ids) for ids in encoded['input_ids']]
+        except Exception:
+            lengths = None
+
+    if lengths is None:
+        lengths = [approximate_token_length(t) for t in texts]
+    return [min(n, max_len) for n in lengths]
+
+
+def normalization_key(text: str) -> str:
+    """Key for near-exact duplicates: Unicode NFC with whitespace runs collapsed."""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def deduplicate(texts: Sequence[str], normalize: bool = False) -> Tuple[List[str], np.ndarray]:
+    """
+    Find the distinct texts in a sequence.
+
+    Args:
+        texts: Texts, possibly with duplicates
+        normalize: Treat texts with the same normalization_key() as duplicates
+
+    Returns:
+        (unique, inverse): unique texts in first-seen order, and for each
+        input the index of its representative, so texts[i] maps to
+        unique[inverse[i]]. A group of near-exact duplicates is represented
+        by its first member, unchanged.
+    """
+    first_index = {}
+    unique = []
+    inverse = np.empty(len(texts), dtype=np.intp)
+    for i, text in enumerate(texts):
+        key = normalization_key(text) if normalize else text
+        j = first_index.get(key)
+        if j is None:
+            j = first_index[key] = len(unique)
+            unique.append(text)
+        inverse[i] = j
+    return unique, inverse
+
+
+def make_length_buckets(lengths: Sequence[int], max_tokens: Optional[int] = None,
+                        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> List[List[int]]:
+    """
+    Group indices into batches of similar length under a token budget.
+
+    Indices are sorted by length (longest first, so memory peaks early) and
+    a batch is closed when adding the next input would make
+    len(batch) * longest_in_batch exceed max_tokens. An input longer than
+    the budget gets a batch of its own.
+
+    Args:
+        lengths: Token length per input
+        max_tokens: Padded tokens allowed per batch (default: EMBEDDING_BATCH_TOKENS)
+        max_batch_size: Hard cap on inputs per batch
+
+    Returns:
+        Lists of input indices, one per batch
+    """
+    max_tokens = max_tokens or get_default_max_tokens()
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+
+    batches, current, longest = [], [], 0
+    for i in order:
+        longest_if_added = max(longest, lengths[i])
+        if current and ((len(current) + 1) * longest_if_added > max_tokens
+                        or len(current) >= max_batch_size):
+            batches.append(current)
+            current, longest_if_added = [], lengths[i]
+        current.append(i)
+        longest = longest_if_added
+    if current:
+        batches.append(current)
+    return batches
+
+
+def encode_length_bucketed(model, texts: Sequence[str], max_tokens: Optional[int] = None,
+                           max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                           lengths: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    Encode texts in length-sorted, token-budgeted batches.
+
+    Args:
+        model: Model with encode(texts, batch_size=..., convert_to_numpy=True)
+        texts: Texts to encode
+        max_tokens: Padded tokens allowed per batch (default: get_default_max_tokens(model))
+        max_batch_size: Hard cap on inputs per batch
+        lengths: Precomputed token lengths (computed with token_lengths if None)
+
+    Returns:
+        (N, dim) float32 array in input order
+    """
+    texts = list(texts)
+    if not texts:
+        return np.asarray(model.encode([], convert_to_numpy=True), dtype=np.float32)
+
+    if lengths is None:
+        lengths = token_lengths(model, texts)
+    max_tokens = max_tokens or get_default_max_tokens(model)
+
+    output = None
+    for batch in make_length_buckets(lengths, max_tokens, max_batch_size):
+        embeddings = np.asarray(
+            model.encode([texts[i] for i in batch], batch_size=len(batch), convert_to_numpy=True),
+            dtype=np.float32
+        )
+        if output is None:
+            output = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+        output[batch] = embeddings
+    return output
+
+
+def compute_embeddings_batch(texts: Sequence[str], model=None,
+                             max_tokens: Optional[int] = None,
+                             workers: Union[int, str, None] = None,
+                             normalize: bool = False,
+                             verbose: bool = False) -> List[np.ndarray]:
+    """
+    Compute embeddings for many texts with length-bucketed batching.
+
+    Each distinct text is encoded once (see deduplicate()).
+
+    Args:
+        texts: Texts to encode
+        model: Model with encode() (defaults to model_loader.get_model())
+        max_tokens: Padded tokens allowed per batch (in-process only)
+        workers: Encode across this many worker processes, or 'auto' to size
+            the pool from the available CPUs (see parallel_encoding).
+            None or 1 encodes in-process.
+        normalize: Also merge texts that differ only in whitespace or
+            Unicode composition
+        verbose: Whether to print deduplication counts
+
+    Returns:
+        One embedding per text, in input order. With workers, a text that
+        fails to encode gets None instead of raising.
+    """
+    texts = list(texts)
+    unique, inverse = deduplicate(texts, normalize=normalize)
+    if verbose and texts:
+        print(f"🔁 Deduplicated {len(texts):,} texts to {len(unique):,} unique "
+              f"({len(texts) - len(unique):,} duplicates skipped)")
+
+    if workers is not None and workers != 1:
+        from parallel_encoding import compute_embeddings
+        embeddings = compute_embeddings(unique, num_workers=workers, model=model)
+        return [None if embeddings[j] is None else embeddings[j].copy() for j in inverse]
+
+    if model is None:
+        from model_loader import get_model
+        model = get_model()
+    return list(encode_length_bucketed(model, unique, max_tokens=max_tokens)[inverse])
+
+
+def iter_embeddings(texts: Iterable[str], model=None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    max_tokens: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Stream embeddings for any iterable of texts, one chunk at a time.
+
+    Only one chunk of texts and embeddings is held in memory, so this works
+    for generators and files of any size.
+
+    Args:
+        texts: Iterable of texts (a list, a generator, an open text file...)
+        model: Model with encode() (defaults to model_loader.get_model())
+        chunk_size: Texts encoded per block
+        max_tokens: Padded tokens allowed per batch within a block
+
+    Yields:
+        (start_index, (n, dim) float32 block) in input order
+    """
+    if model is None:
+        from model_loader import get_model
+        model = get_model()
+
+    iterator = iter(texts)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start, encode_length_bucketed(model, chunk, max_tokens=max_tokens)
+        start += len(chunk)
+
+
+def _progress_path(path: Path) -> Path:
+    return path.with_name(path.name + '.progress.json')
+
+
+def _read_progress(path: Path, num_rows: int) -> int:
+    """Rows already written to the memmap by an earlier run (0 if none)."""
+    try:
+        with open(_progress_path(path), encoding='utf-8') as f:
+            progress = json.load(f)
+        if progress['num_rows'] == num_rows and path.exists():
+            return int(progress['rows_done'])
+    except (OSError, ValueError, KeyError):
+        pass
+    return 0
+
+
+def _write_progress(path: Path, num_rows: int, dim: int, rows_done: int):
+    progress_path = _progress_path(path)
+    tmp_path = progress_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'num_rows': num_rows, 'dim': dim, 'rows_done': rows_done}, f)
+    os.replace(tmp_path, progress_path)
+
+
+def embed_to_memmap(texts: Iterable[str], path, num_rows: Optional[int] = None, model=None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, max_tokens: Optional[int] = None,
+                    resume: bool = True, verbose: bool = False) -> np.memmap:
+    """
+    Embed a corpus straight into a preallocated float32 np.memmap on disk.
+
+    Memory use stays at one chunk regardless of corpus size. Each finished
+    chunk is flushed and recorded in `<path>.progress.json`; with resume=True
+    a rerun skips the rows already written.
+
+    Args:
+        texts: Iterable of texts, in the same order on every run
+        path: Output file (raw float32, shape (num_rows, dim))
+        num_rows: Number of texts (defaults to len(texts))
+        model: Model with encode() (defaults to model_loader.get_model())
+        chunk_size: Texts encoded and flushed per block
+        max_tokens: Padded tokens allowed per batch within a block
+        resume: Continue an interrupted run instead of starting over
+        verbose: Whether to print progress
+
+    Returns:
+        The filled (num_rows, dim) memmap, opened read-only
+    """
+    path = Path(path)
+    if num_rows is None:
+        num_rows = len(texts)
+
+    if model is None:
+        from model_loader import get_model
+        model = get_model()
+
+    rows_done = _read_progress(path, num_rows) if resume else 0
+    remaining = itertools.islice(iter(texts), rows_done, None)
+
+    matrix = None
+    dim = None
+    if rows_done:
+        with open(_progress_path(path), encoding='utf-8') as f:
+            dim = json.load(f)['dim']
+        matrix = np.memmap(path, dtype=np.float32, mode='r+', shape=(num_rows, dim))
+        if verbose:
+            print(f"♻️  Resuming at row {rows_done:,} of {num_rows:,}")
+
+    for start, block in iter_embeddings(remaining, model, chunk_size, max_tokens):
+        start += rows_done
+        if start + len(block) > num_rows:
+            raise ValueError(f"Got more than num_rows={num_rows:,} texts")
+        if matrix is None:
+            dim = block.shape[1]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            matrix = np.memmap(path, dtype=np.float32, mode='w+', shape=(num_rows, dim))
+
+        matrix[start:start + len(block)] = block
+        matrix.flush()
+        _write_progress(path, num_rows, dim, start + len(block))
+        if verbose:
+            print(f"   {start + len(block):,}/{num_rows:,} rows embedded")
+
+    if matrix is None:
+        raise ValueError("No texts to embed")
+    written = _read_progress(path, num_rows)
+    if written != num_rows:
+        raise ValueError(f"Got {written:,} texts, expected num_rows={num_rows:,}")
+    del matrix
+    return np.memmap(path, dtype=np.float32, mode='r', shape=(num_rows, dim))
@@ -0,0 +1,662 @@
+"""
+Persistent, content-addressed embedding cache.
+
+The experiment scripts encode the same sentences on every run (the 21
+originals, the raw data files, the interactive examples). This cache keeps
+every embedding on disk, keyed by (model fingerprint, exact text), so a warm
+run needs no model forward passes at all.
+
+Layout (one directory per model fingerprint):
+    <cache_dir>/<fingerprint>/vectors.f32   float32 matrix, one row per text
+    <cache_dir>/<fingerprint>/index.json    text hash -> row, last-use tick
+
+The fingerprint covers the backend and the weights file (size, mtime and
+leading bytes), so replacing the weights starts a fresh cache automatically
+and the stale one is removed.
+
+Example:
+    >>> from embedding_cache import CachedEncoder, get_embedding_cache
+    >>> model = CachedEncoder(get_model(), get_embedding_cache())
+    >>> model.encode(["Hello world"])       # encoded and stored
+    >>> model.encode(["Hello world"])       # served from disk
+    >>> model.cache.stats()['hits']
+    1
+
+An in-process LRU memo (EmbeddingMemo) sits in front of the disk cache and
+bounds memory by bytes, so repeated texts within one process (e.g. one
+original compared against several corruptions) skip even the disk lookup.
+
+Environment Variables:
+    EMBEDDING_CACHE: Set to "0" to disable the cache
+    EMBEDDING_MEMO_MAX_MB: Byte budget of the in-process memo (default: 32, "0" disables)
+    EMBEDDING_CACHE_DIR: Cache location (default: ~/.cache/model_loader/embeddings)
+    EMBEDDING_CACHE_MAX_MB: Size cap per model before LRU eviction (default: 256)
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+DEFAULT_MAX_MB = 256
+DEFAULT_MEMO_MAX_MB = 32
+
+# Bytes of the weights file hashed into the fingerprint (covers the safetensors header)
+_FINGERPRINT_PREFIX_BYTES = 1024 * 1024
+
+# After eviction the cache is trimmed to this fraction of its cap
+_EVICT_TO_FRACTION = 0.8
+
+
+def is_cache_enabled() -> bool:
+    """Check if the embedding cache is enabled."""
+    return os.environ.get('EMBEDDING_CACHE', '1') != '0'
+
+
+def get_cache_dir() -> Path:
+    """Get the root directory for cached embeddings."""
+    env_path = os.environ.get('EMBEDDING_CACHE_DIR')
+    if env_path:
+        return Path(env_path).expanduser()
+    return Path.home() / '.cache' / 'model_loader' / 'embeddings'
+
+
+def _get_default_max_bytes() -> int:
+    return int(float(os.environ.get('EMBEDDING_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+def _weights_path(model_path: Path, backend: str) -> Optional[Path]:
+    if backend == 'onnx':
+        from onnx_backend import get_onnx_model_path
+        path = get_onnx_model_path(model_path)
+        return path if path.exists() else None
+
+    from safetensors_weights import find_weights_file
+    return find_weights_file(model_path)
+
+
+def model_fingerprint(model_path: Optional[Path] = None, backend: str = 'torch',
+                      model_name: str = 'all-MiniLM-L6-v2') -> str:
+    """
+    Identify the exact model that produced an embedding.
+
+    Hashes the backend, the weights file size and mtime, and the leading
+    bytes of the weights (the safetensors header), which is cheap and
+    changes whenever the weights are replaced. Without local weights, the
+    model name stands in for them.
+    """
+    digest = hashlib.sha256(f"{backend}|{model_name}".encode('utf-8'))
+    weights = _weights_path(Path(model_path), backend) if model_path else None
+
+    if weights is not None:
+        stat = weights.stat()
+        digest.update(f"|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8'))
+        with open(weights, 'rb') as f:
+            digest.update(f.read(_FINGERPRINT_PREFIX_BYTES))
+    return digest.hexdigest()[:16]
+
+
+def text_key(text: str) -> str:
+    """Cache key for an exact text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding store for one model fingerprint.
+
+    Lookups read rows from a memory-mapped float32 matrix. New embeddings are
+    held in memory until flush(), which appends them to the matrix, rewrites
+    the index and evicts least recently used rows when over the size cap.
+
+    Several processes may share a cache directory (the daemon, the batch
+    script and the interactive tool all default to the same one). flush()
+    holds an exclusive flock on the directory's lock file and re-reads the
+    index before appending, so writers never overwrite each other's rows.
+    Eviction replaces the matrix file rather than rewriting it in place, and
+    each instance maps the matrix together with the index it read, so
+    readers keep a consistent (if older) view until their next flush.
+    Without fcntl (Windows) only threads are synchronized.
+    """
+
+    def __init__(self, directory: Path, max_bytes: Optional[int] = None, owner: str = ''):
+        self.directory = Path(directory)
+        self.vectors_path = self.directory / 'vectors.f32'
+        self.index_path = self.directory / 'index.json'
+        self.max_bytes = max_bytes if max_bytes is not None else _get_default_max_bytes()
+        self.owner = owner
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.RLock()
+        self._pending: Dict[str, np.ndarray] = {}
+        self._matrix = None
+        self._load_index()
+
+    # -- index --------------------------------------------------------------
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Cross-process lock on the cache directory (shared for reading the index)."""
+        if fcntl is None or (not exclusive and not self.directory.exists()):
+            yield
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / '.lock', 'a+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        with self._file_lock(exclusive=False):
+            self._read_index()
+
+    def _read_index(self):
+        """Load index.json and map the matrix it describes. Caller holds the file lock."""
+        self._matrix = None
+        self.dim = None
+        self._rows: Dict[str, int] = {}
+        self._last_used: Dict[str, int] = {}
+        self._num_rows = 0
+        self._tick = 0
+
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+            entries = index['entries']
+            dim, num_rows = index['dim'], index['num_rows']
+        except (OSError, ValueError, KeyError):
+            return
+
+        # Vectors must cover every indexed row, otherwise start over
+        expected = num_rows * dim * 4 if dim else 0
+        if not self.vectors_path.exists() or self.vectors_path.stat().st_size < expected:
+            return
+
+        self.dim = dim
+        self._num_rows = num_rows
+        self._tick = index.get('tick', 0)
+        for key, (row, last_used) in entries.items():
+            self._rows[key] = row
+            self._last_used[key] = last_used
+        self._matrix = self._open_matrix()
+
+    def _reload_index(self):
+        """
+        Pick up rows other processes committed since this instance read the
+        index, keeping this instance's use ticks and dropping staged texts
+        that are now on disk. Caller holds the exclusive file lock.
+        """
+        dim, tick, last_used = self.dim, self._tick, self._last_used
+        self._read_index()
+        if self.dim is None:
+            self.dim = dim
+        elif dim is not None and dim != self.dim:
+            raise ValueError(f"Embedding dimension {dim} != cache dimension {self.dim} on disk")
+        self._tick = max(self._tick, tick)
+        for key in self._rows:
+            if key in last_used:
+                self._last_used[key] = max(self._last_used[key], last_used[key])
+        for key in [k for k in self._pending if k in self._rows]:
+            del self._pending[key]
+
+    def _write_index(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index = {
+            'owner': self.owner,
+            'dim': self.dim,
+            'num_rows': self._num_rows,
+            'tick': self._tick,
+            'entries': {k: [row, self._last_used[k]] for k, row in self._rows.items()},
+        }
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _open_matrix(self) -> Optional[np.ndarray]:
+        if not self._num_rows:
+            return None
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self._num_rows, self.dim))
+
+    def _vectors(self) -> np.ndarray:
+        # Mapped when the index was read, so rows always match this instance's index
+        return self._matrix
+
+    # -- lookups ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._pending)
+
+    def __contains__(self, text: str) -> bool:
+        key = text_key(text)
+        return key in self._pending or key in self._rows
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return cached embeddings in input order (None for misses)."""
+        results = []
+        with self._lock:
+            self._tick += 1
+            for text in texts:
+                key = text_key(text)
+                if key in self._pending:
+                    vector = self._pending[key].copy()
+                elif key in self._rows:
+                    vector = np.array(self._vectors()[self._rows[key]])
+                    self._last_used[key] = self._tick
+                else:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                results.append(vector)
+        return results
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for text, or None."""
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[np.ndarray]):
+        """Stage embeddings for texts; they are written on flush()."""
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+                if self.dim is None:
+                    self.dim = vector.shape[0]
+                elif vector.shape[0] != self.dim:
+                    raise ValueError(f"Embedding dimension {vector.shape[0]} != cache dimension {self.dim}")
+                key = text_key(text)
+                if key not in self._rows:
+                    self._pending[key] = vector
+
+    def put(self, text: str, vector: np.ndarray):
+        """Stage one embedding."""
+        self.put_many([text], [vector])
+
+    # -- persistence --------------------------------------------------------
+
+    def flush(self):
+        """Write staged embeddings to disk and enforce the size cap."""
+        with self._lock:
+            if not self._pending:
+                return
+            with self._file_lock(exclusive=True):
+                # Another process may have appended or evicted since the index was read
+                self._reload_index()
+                if self._pending:
+                    self._append_pending()
+
+    def _append_pending(self):
+        """Append staged rows, evict over the cap and commit the index. Caller holds both locks."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        row_bytes = self.dim * 4
+
+        # Overwrite anything past the indexed rows (left by an interrupted flush)
+        mode = 'r+b' if self.vectors_path.exists() else 'wb'
+        # New rows are the most recently used, even when nothing was read since the last flush
+        self._tick += 1
+        with open(self.vectors_path, mode) as f:
+            f.seek(self._num_rows * row_bytes)
+            for key, vector in self._pending.items():
+                f.write(vector.tobytes())
+                self._rows[key] = self._num_rows
+                self._last_used[key] = self._tick
+                self._num_rows += 1
+            f.truncate()
+        self._pending.clear()
+        self._matrix = self._open_matrix()
+
+        if self._num_rows * row_bytes > self.max_bytes:
+            self._evict(int(self.max_bytes * _EVICT_TO_FRACTION) // row_bytes)
+        self._write_index()
+        self._matrix = self._open_matrix()
+
+    def _evict(self, keep_rows: int):
+        """Keep the keep_rows most recently used rows, compacting the matrix."""
+        keep = sorted(self._rows, key=self._last_used.__getitem__, reverse=True)[:keep_rows]
+        old = self._vectors()
+        new_rows = {key: i for i, key in enumerate(keep)}
+        compacted = np.array([old[self._rows[key]] for key in keep], dtype=np.float32)
+
+        tmp_path = self.vectors_path.with_suffix('.tmp')
+        compacted.reshape(-1).tofile(tmp_path)
+        self._matrix = None
+        del old
+        os.replace(tmp_path, self.vectors_path)
+
+        self.evictions += len(self._rows) - len(keep)
+        self._last_used = {key: self._last_used[key] for key in keep}
+        self._rows = new_rows
+        self._num_rows = len(keep)
+
+    def clear(self):
+        """Delete every cached embedding for this model."""
+        with self._lock:
+            self._matrix = None
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._pending.clear()
+            self._load_index()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self),
+            'bytes': self._num_rows * (self.dim or 0) * 4,
+            'directory': str(self.directory),
+        }
+
+
+def _remove_stale_caches(root: Path, owner: str, current: str):
+    """Delete caches for the same model made with weights that have since changed."""
+    if not root.exists():
+        return
+    for directory in root.iterdir():
+        if directory.name == current or not directory.is_dir():
+            continue
+        try:
+            with open(directory / 'index.json', encoding='utf-8') as f:
+                stale = json.load(f).get('owner') == owner
+        except (OSError, ValueError):
+            continue
+        if stale:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def open_cache(model_path: Optional[Path] = None, backend: str = 'torch',
+               cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None) -> EmbeddingCache:
+    """
+    Open the cache for a model, invalidating caches for its old weights.
+
+    Args:
+        model_path: Local model directory (defaults to model_loader.get_default_model_path())
+        backend: 'torch' or 'onnx'
+        cache_dir: Cache root (defaults to get_cache_dir())
+        max_bytes: Size cap (defaults to EMBEDDING_CACHE_MAX_MB)
+    """
+    if model_path is None:
+        from model_loader import get_default_model_path
+        model_path = get_default_model_path()
+
+    root = Path(cache_dir) if cache_dir else get_cache_dir()
+    fingerprint = model_fingerprint(model_path, backend)
+    owner = f"{backend}|{Path(model_path).expanduser()}"
+    _remove_stale_caches(root, owner, fingerprint)
+    return EmbeddingCache(root / fingerprint, max_bytes=max_bytes, owner=owner)
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the shared cache for the default model, or None if disabled."""
+    global _default_cache
+
+    if not is_cache_enabled():
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = open_cache()
+        return _default_cache
+
+
+MemoInfo = namedtuple('MemoInfo', ['hits', 'misses', 'entries', 'currsize', 'maxsize'])
+
+
+class EmbeddingMemo:
+    """
+    Thread-safe in-memory LRU of embeddings, bounded by bytes.
+
+    Vectors are stored read-only and handed out as copies, so callers that
+    modify a returned embedding cannot corrupt later results.
+
+    Keys are (namespace, text); use a separate namespace per model when one
+    memo is shared between models.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('EMBEDDING_MEMO_MAX_MB', DEFAULT_MEMO_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str, namespace: str = '') -> Optional[np.ndarray]:
+        """Return a copy of the memoized embedding, or None."""
+        key = (namespace, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return vector.copy()
+
+    def put(self, text: str, vector: np.ndarray, namespace: str = ''):
+        """Memoize an embedding, evicting least recently used ones over budget."""
+        vector = np.array(vector, copy=True)
+        if vector.nbytes > self.max_bytes:
+            return
+        vector.setflags(write=False)
+        key = (namespace, text)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = vector
+            self._bytes += vector.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def cache_info(self) -> MemoInfo:
+        """Hit/miss counters and current size, like functools.lru_cache."""
+        with self._lock:
+            return MemoInfo(self._hits, self._misses, len(self._entries), self._bytes, self.max_bytes)
+
+    def cache_clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hits = 0
+            self._misses = 0
+
+
+_default_memo: Optional[EmbeddingMemo] = None
+
+
+def get_embedding_memo() -> Optional[EmbeddingMemo]:
+    """Get the process-wide memo, or None if EMBEDDING_MEMO_MAX_MB is 0."""
+    global _default_memo
+
+    with _default_cache_lock:
+        if _default_memo is None:
+            _default_memo = EmbeddingMemo()
+    return _default_memo if _default_memo.max_bytes > 0 else None
+
+
+def memoize_embedding(func: Callable[[str], np.ndarray],
+                      memo: Optional[EmbeddingMemo] = None, namespace: str = ''):
+    """
+    Wrap a single-text embedding function (like compute_embedding) with a memo.
+
+    The wrapper exposes cache_info() and cache_clear() from the memo.
+    """
+    memo = memo or EmbeddingMemo()
+
+    def wrapper(text: str) -> np.ndarray:
+        vector = memo.get(text, namespace)
+        if vector is None:
+            vector = func(text)
+            memo.put(text, vector, namespace)
+        return vector
+
+    wrapper.__wrapped__ = func
+    wrapper.__doc__ = func.__doc__
+    wrapper.cache_info = memo.cache_info
+    wrapper.cache_clear = memo.cache_clear
+    return wrapper
+
+
+def memoize_embeddings_batch(func: Callable[[List[str]], Sequence[np.ndarray]],
+                             memo: Optional[EmbeddingMemo] = None, namespace: str = ''):
+    """
+    Wrap a batch embedding function (like compute_embeddings_batch) with a memo.
+
+    Only texts not in the memo are passed to func, in one call; results are
+    returned as a list in input order.
+    """
+    memo = memo or EmbeddingMemo()
+
+    def wrapper(texts: Sequence[str]) -> List[np.ndarray]:
+        return cached_encode(texts, func, cache=None, memo=memo, namespace=namespace)
+
+    wrapper.__wrapped__ = func
+    wrapper.__doc__ = func.__doc__
+    wrapper.cache_info = memo.cache_info
+    wrapper.cache_clear = memo.cache_clear
+    return wrapper
+
+
+def cached_encode(texts: Sequence[str], encode: Callable[[List[str]], Sequence[np.ndarray]],
+                  cache: Optional[EmbeddingCache], flush: bool = True,
+                  memo: Optional[EmbeddingMemo] = None, namespace: str = '') -> List[np.ndarray]:
+    """
+    Encode texts, only calling encode() for texts missing from the memo and cache.
+
+    Args:
+        texts: Texts to embed
+        encode: Function mapping a list of texts to one embedding per text
+        cache: Disk cache to use; None skips it
+        flush: Write new embeddings to disk now (pass False in loops and
+            call cache.flush() once at the end)
+        memo: In-process memo checked before the disk cache; None skips it
+        namespace: Memo namespace (defaults to the disk cache fingerprint)
+
+    Returns:
+        One float32 embedding per text, in input order
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    if cache is None and memo is None:
+        return [np.asarray(v, dtype=np.float32) for v in encode(texts)]
+    if cache is not None and not namespace:
+        namespace = cache.directory.name
+
+    results = [memo.get(t, namespace) for t in texts] if memo is not None else [None] * len(texts)
+
+    if cache is not None:
+        pending = [i for i, r in enumerate(results) if r is None]
+        for i, vector in zip(pending, cache.get_many([texts[i] for i in pending])):
+            if vector is not None:
+                results[i] = vector
+                if memo is not None:
+                    memo.put(texts[i], vector, namespace)
+
+    missing = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+    if missing:
+        computed = dict(zip(missing, (np.asarray(v, dtype=np.float32) for v in encode(missing))))
+        if cache is not None:
+            cache.put_many(missing, list(computed.values()))
+            if flush:
+                cache.flush()
+        if memo is not None:
+            for text, vector in computed.items():
+                memo.put(text, vector, namespace)
+        # Copy repeats so every position owns its array, as an uncached call would
+        seen = set()
+        for i, text in enumerate(texts):
+            if results[i] is None:
+                results[i] = computed[text].copy() if text in seen else computed[text]
+                seen.add(text)
+    return results
+
+
+# encode() kwargs that do not change the embeddings
+_OUTPUT_NEUTRAL_KWARGS = {'batch_size', 'show_progress_bar', 'device'}
+
+# encode() kwargs whose default values give the cached (float32 numpy) embeddings
+_CACHED_OUTPUT_DEFAULTS = {
+    'convert_to_numpy': True,
+    'convert_to_tensor': False,
+    'normalize_embeddings': False,
+    'output_value': 'sentence_embedding',
+    'precision': 'float32',
+    'prompt': None,
+    'prompt_name': None,
+}
+
+
+def _is_cacheable(kwargs: dict) -> bool:
+    missing = object()
+    return all(name in _OUTPUT_NEUTRAL_KWARGS
+               or _CACHED_OUTPUT_DEFAULTS.get(name, missing) == value
+               for name, value in kwargs.items())
+
+
+class CachedEncoder:
+    """
+    Wrap a model so encode() is served from an EmbeddingMemo and/or EmbeddingCache.
+
+    Keeps the SentenceTransformer encode() contract: a (dim,) array for a
+    string and an (N, dim) array for a list. Other attributes are forwarded
+    to the wrapped model.
+
+    Only plain embeddings are cached: calls with kwargs that change the
+    output (normalize_embeddings, convert_to_tensor, prompts, precision,
+    ...) go straight to the wrapped model.
+    """
+
+    def __init__(self, model, cache: Optional[EmbeddingCache] = None,
+                 memo: Optional[EmbeddingMemo] = None):
+        self.model = model
+        self.cache = cache
+        self.memo = memo
+        self._namespace = f"model-{id(model)}" if cache is None else ''
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        if not _is_cacheable(kwargs):
+            return self.model.encode(sentences, **kwargs)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = cached_encode(texts, lambda batch: self.model.encode(batch, **kwargs), self.cache,
+                                memo=self.memo, namespace=self._namespace)
+        if single:
+            return vectors[0]
+        if not vectors:
+            return self.model.encode([], **kwargs)
+        return np.stack(vectors)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Long-lived embedding daemon served over a Unix domain socket.
+
+Loading torch, sentence-transformers and the all-MiniLM-L6-v2 weights takes
+seconds, while a single distance calculation takes milliseconds. This module
+keeps one model instance (from ``model_loader.get_model()``) warm in a
+background process and lets short-lived callers such as
+``scripts/calculate_distance.py`` reuse it.
+
+The client half of this module only uses the standard library, so importing
+it never pulls in torch.
+
+Protocol:
+    One JSON object per line in each direction.
+    {"op": "ping"}                                  -> {"ok": true, "pid": ...}
+    {"op": "embed", "texts": ["..."]}               -> {"ok": true, "embeddings": [[...]]}
+    {"op": "distance", "text1": "...", "text2": "..."} -> {"ok": true, "distance": 0.12}
+    Failures are reported as {"ok": false, "error": "..."}.
+
+Usage:
+    python3 embedding_daemon.py                # Start the daemon (foreground)
+    python3 embedding_daemon.py --status       # Check whether a daemon is running
+    python3 embedding_daemon.py --stop         # Ask a running daemon to exit
+
+Environment Variables:
+    EMBEDDING_DAEMON_SOCKET: Override the default socket path
+    EMBEDDING_DAEMON: Set to "0" to make clients skip the daemon entirely
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+# Seconds a client waits for the daemon before falling back to in-process work
+DEFAULT_CLIENT_TIMEOUT = 30.0
+
+# Upper bound on a single request line, protects the daemon from runaway input
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+
+class DaemonUnavailableError(Exception):
+    """Raised when no daemon is listening or the daemon returned an error."""
+    pass
+
+
+def get_default_socket_path() -> Path:
+    """Get the Unix socket path shared by the daemon and its clients."""
+    env_path = os.environ.get('EMBEDDING_DAEMON_SOCKET')
+    if env_path:
+        return Path(env_path).expanduser()
+
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return Path(tempfile.gettempdir()) / f'embedding-daemon-{uid}.sock'
+
+
+def is_daemon_enabled() -> bool:
+    """Check if clients are allowed to use the daemon."""
+    return os.environ.get('EMBEDDING_DAEMON', '1') != '0'
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+def send_request(request: dict, socket_path: Optional[Path] = None,
+                 timeout: float = DEFAULT_CLIENT_TIMEOUT) -> dict:
+    """
+    Send one request to the daemon and return its response.
+
+    Args:
+        request: JSON-serializable request object
+        socket_path: Daemon socket (defaults to get_default_socket_path())
+        timeout: Seconds to wait for connect and response
+
+    Returns:
+        Decoded response object
+
+    Raises:
+        DaemonUnavailableError: If the daemon cannot be reached or reports an error
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        raise DaemonUnavailableError("Unix domain sockets are not supported on this platform")
+
+    if socket_path is None:
+        socket_path = get_default_socket_path()
+
+    if not socket_path.exists():
+        raise DaemonUnavailableError(f"No daemon socket at {socket_path}")
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if chunk.endswith(b'\n'):
+                    break
+    except OSError as e:
+        raise DaemonUnavailableError(f"Could not talk to daemon at {socket_path}: {e}") from e
+
+    try:
+        response = json.loads(b''.join(chunks).decode('utf-8'))
+    except ValueError as e:
+        raise DaemonUnavailableError(f"Malformed response from daemon: {e}") from e
+
+    if not response.get('ok'):
+        raise DaemonUnavailableError(response.get('error', 'Unknown daemon error'))
+
+    return response
+
+
+def is_daemon_running(socket_path: Optional[Path] = None) -> bool:
+    """Return True if a daemon answers a ping on the socket."""
+    try:
+        send_request({'op': 'ping'}, socket_path=socket_path, timeout=2.0)
+        return True
+    except DaemonUnavailableError:
+        return False
+
+
+def remote_embed(texts: List[str], socket_path: Optional[Path] = None) -> List[List[float]]:
+    """Embed texts using the daemon. Returns plain lists of floats."""
+    response = send_request({'op': 'embed', 'texts': list(texts)}, socket_path=socket_path)
+    return response['embeddings']
+
+
+def remote_distance(text1: str, text2: str, socket_path: Optional[Path] = None) -> float:
+    """Compute cosine distance between two texts using the daemon."""
+    response = send_request(
+        {'op': 'distance', 'text1': text1, 'text2': text2},
+        socket_path=socket_path
+    )
+    return float(response['distance'])
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+def _cosine_distance(vec1, vec2) -> float:
+    """Cosine distance matching embedding_utils.cosine_distance."""
+    import numpy as np
+
+    return float(1.0 - np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle newline-delimited JSON requests on one connection."""
+
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST_BYTES)
+        if not line:
+            return
+
+        try:
+            request = json.loads(line.decode('utf-8'))
+            response = self.server.dispatch(request)
+        except Exception as e:
+            response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class EmbeddingDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server that answers embed/distance requests from a warm model."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, model):
+        self.socket_path = socket_path
+        self.model = model
+        # SentenceTransformer.encode is not documented as thread-safe
+        self._encode_lock = threading.Lock()
+        super().__init__(str(socket_path), _RequestHandler)
+
+    def encode(self, texts: List[str]):
+        with self._encode_lock:
+            return self.model.encode(texts, convert_to_numpy=True)
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get('op')
+
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+
+        if op == 'embed':
+            texts = request.get('texts')
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                return {'ok': False, 'error': "'texts' must be a list of strings"}
+            embeddings = self.encode(texts) if texts else []
+            return {'ok': True, 'embeddings': [e.tolist() for e in embeddings]}
+
+        if op == 'distance':
+            text1, text2 = request.get('text1'), request.get('text2')
+            if not isinstance(text1, str) or not isinstance(text2, str):
+                return {'ok': False, 'error': "'text1' and 'text2' must be strings"}
+            emb1, emb2 = self.encode([text1, text2])
+            return {'ok': True, 'distance': _cosine_distance(emb1, emb2)}
+
+        if op == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True}
+
+        return {'ok': False, 'error': f"Unknown op: {op!r}"}
+
+    def server_close(self):
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _load_env_file():
+    """Load .env next to this module, matching the other entry points."""
+    env_file = Path(__file__).parent / '.env'
+    if env_file.exists():
+        with open(env_file) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    os.environ.setdefault(key.strip(), value.strip())
+
+
+def serve(socket_path: Optional[Path] = None, verbose: bool = True):
+    """
+    Load the model and serve requests until interrupted or shut down.
+
+    Args:
+        socket_path: Socket to listen on (defaults to get_default_socket_path())
+        verbose: Whether to print status messages
+    """
+    if socket_path is None:
+        socket_path = get_default_socket_path()
+
+    if socket_path.exists():
+        if is_daemon_running(socket_path):
+            raise RuntimeError(f"A daemon is already running on {socket_path}")
+        # Stale socket left behind by a crashed daemon
+        socket_path.unlink()
+
+    from embedding_cache import CachedEncoder, get_embedding_cache, get_embedding_memo
+    from model_loader import get_model
+
+    model = get_model(verbose=verbose)
+    cache, memo = get_embedding_cache(), get_embedding_memo()
+    if cache is not None or memo is not None:
+        model = CachedEncoder(model, cache, memo=memo)
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    server = EmbeddingDaemon(socket_path, model)
+    os.chmod(str(socket_path), 0o600)
+
+    if verbose:
+        print(f"✅ Embedding daemon listening on {socket_path} (pid {os.getpid()})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if verbose:
+            print("👋 Embedding daemon stopped")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve embeddings from a warm model over a Unix socket')
+    parser.add_argument('--socket', type=Path, default=None, help='Socket path to listen on')
+    parser.add_argument('--status', action='store_true', help='Only report whether a daemon is running')
+    parser.add_argument('--stop', action='store_true', help='Stop a running daemon')
+    parser.add_argument('--quiet', action='store_true', help='Suppress status messages')
+    args = parser.parse_args()
+
+    _load_env_file()
+    socket_path = args.socket or get_default_socket_path()
+
+    if args.status:
+        running = is_daemon_running(socket_path)
+        print(f"Daemon {'running' if running else 'not running'} at {socket_path}")
+        sys.exit(0 if running else 1)
+
+    if args.stop:
+        try:
+            send_request({'op': 'shutdown'}, socket_path=socket_path, timeout=5.0)
+            print(f"Stopped daemon at {socket_path}")
+        except DaemonUnavailableError as e:
+            print(f"No daemon to stop: {e}")
+            sys.exit(1)
+        return
+
+    serve(socket_path, verbose=not args.quiet)
+
+
+if __name__ == '__main__':
+    main()
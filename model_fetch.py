@@ -0,0 +1,321 @@
+"""
+Selective, parallel, resumable model download over HTTP.
+
+Cloning the HuggingFace repo pulls every variant it ships (ONNX, OpenVINO,
+TF, ...) and restarts from zero after a timeout. This fetcher instead:
+1. Reads the repo manifest (file list, sizes and checksums) from the Hub API
+2. Picks only the files the chosen backend loads
+3. Downloads large files as parallel HTTP range requests
+4. Resumes partial downloads chunk by chunk after an interruption
+5. Verifies every file against the manifest checksum before installing it
+
+Only the standard library is used, so it works before requirements.txt
+has been installed.
+
+Environment Variables:
+    HF_ENDPOINT: Hub (or mirror) base URL (default: https://huggingface.co)
+
+Example:
+    >>> from model_fetch import fetch_model
+    >>> fetch_model(Path.home() / 'models' / 'all-MiniLM-L6-v2', backend='torch')
+
+Any server that exposes the Hub layout works as a mirror:
+    <endpoint>/api/models/<repo>/revision/<revision>   (JSON manifest)
+    <endpoint>/<repo>/resolve/<revision>/<filename>    (file contents)
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_ENDPOINT = 'https://huggingface.co'
+DEFAULT_REPO = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# Config and tokenizer files every backend needs
+COMMON_FILES = (
+    'config.json',
+    'modules.json',
+    'sentence_bert_config.json',
+    'config_sentence_transformers.json',
+    'tokenizer.json',
+    'tokenizer_config.json',
+    'special_tokens_map.json',
+    'vocab.txt',
+    '1_Pooling/config.json',
+)
+
+# Weight files per backend, in order of preference (first one present wins)
+BACKEND_WEIGHTS = {
+    'torch': ('model.safetensors', 'pytorch_model.bin'),
+    'onnx': ('onnx/model.onnx',),
+}
+
+CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_WORKERS = 4
+REQUEST_TIMEOUT = 60
+
+
+class FetchError(Exception):
+    """Raised when the model cannot be downloaded or fails verification."""
+    pass
+
+
+def get_endpoint() -> str:
+    """Get the Hub endpoint, honoring HF_ENDPOINT like huggingface_hub does."""
+    return os.environ.get('HF_ENDPOINT', DEFAULT_ENDPOINT).rstrip('/')
+
+
+def _open(url: str, headers: Optional[dict] = None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        return urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        raise FetchError(f"HTTP {e.code} for {url}") from e
+    except urllib.error.URLError as e:
+        raise FetchError(f"Could not reach {url}: {e.reason}") from e
+    except (OSError, http.client.HTTPException) as e:
+        raise FetchError(f"Could not reach {url}: {e!r}") from e
+
+
+def _read(response, url: str, size: int = -1) -> bytes:
+    """response.read(), with timeouts, resets, SSL errors and truncated bodies raised as FetchError."""
+    try:
+        return response.read(size)
+    except (OSError, http.client.HTTPException) as e:
+        raise FetchError(f"Connection lost while reading {url}: {e!r}") from e
+
+
+def fetch_manifest(repo: str = DEFAULT_REPO, revision: str = 'main',
+                   endpoint: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Fetch the repo file list with sizes and checksums.
+
+    Returns:
+        Mapping of filename to {'size', 'sha256'} for LFS files or
+        {'size', 'git_sha1'} for regular files
+    """
+    url = f"{endpoint or get_endpoint()}/api/models/{repo}/revision/{revision}?blobs=true"
+    with _open(url) as response:
+        info = json.loads(_read(response, url))
+
+    manifest = {}
+    for sibling in info.get('siblings', []):
+        entry = {'size': sibling.get('size')}
+        lfs = sibling.get('lfs')
+        if lfs:
+            entry['sha256'] = lfs['sha256']
+            entry['size'] = lfs.get('size', entry['size'])
+        elif sibling.get('blobId'):
+            entry['git_sha1'] = sibling['blobId']
+        manifest[sibling['rfilename']] = entry
+    return manifest
+
+
+def select_files(manifest: Dict[str, dict], backend: str = 'torch') -> List[str]:
+    """
+    Choose the files a backend needs from the manifest.
+
+    Raises:
+        FetchError: If no weights for the backend are listed
+    """
+    if backend not in BACKEND_WEIGHTS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose from: {', '.join(BACKEND_WEIGHTS)}")
+
+    files = [name for name in COMMON_FILES if name in manifest]
+    weights = next((name for name in BACKEND_WEIGHTS[backend] if name in manifest), None)
+    if weights is None:
+        raise FetchError(f"No {backend} weights in manifest (looked for "
+                         f"{', '.join(BACKEND_WEIGHTS[backend])})")
+    return files + [weights]
+
+
+def file_checksum_ok(path: Path, entry: dict) -> bool:
+    """Verify a file against its manifest entry (size, then sha256 or git blob sha1)."""
+    size = path.stat().st_size
+    if entry.get('size') is not None and size != entry['size']:
+        return False
+
+    if 'sha256' in entry:
+        digest, expected = hashlib.sha256(), entry['sha256']
+    elif 'git_sha1' in entry:
+        digest, expected = hashlib.sha1(), entry['git_sha1']
+        digest.update(f"blob {size}\0".encode())
+    else:
+        return True
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest() == expected
+
+
+class _PartialFile:
+    """
+    A `<name>.part` download plus a `<name>.part.json` record of finished chunks.
+
+    Chunks are written in place at their offsets, so parallel range requests
+    can complete in any order and an interrupted download resumes with only
+    the missing chunks.
+    """
+
+    def __init__(self, target: Path, size: int, chunk_size: int):
+        self.path = target.with_name(target.name + '.part')
+        self.state_path = target.with_name(target.name + '.part.json')
+        self.size = size
+        self.chunk_size = chunk_size
+        self.num_chunks = max(1, -(-size // chunk_size))
+        self._lock = threading.Lock()
+        self.done = self._load_state()
+
+        if not self.path.exists() or self.path.stat().st_size != size:
+            with open(self.path, 'wb') as f:
+                f.truncate(size)
+            self.done = set()
+
+    def _load_state(self) -> set:
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('size') == self.size and state.get('chunk_size') == self.chunk_size:
+                return set(state['done'])
+        except (OSError, ValueError, KeyError):
+            pass
+        return set()
+
+    def pending(self) -> List[int]:
+        return [i for i in range(self.num_chunks) if i not in self.done]
+
+    def byte_range(self, index: int):
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.size) - 1
+
+    def write_chunk(self, index: int, data: bytes):
+        start, _ = self.byte_range(index)
+        with open(self.path, 'r+b') as f:
+            f.seek(start)
+            f.write(data)
+        with self._lock:
+            self.done.add(index)
+            tmp_path = self.state_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'size': self.size, 'chunk_size': self.chunk_size,
+                           'done': sorted(self.done)}, f)
+            os.replace(tmp_path, self.state_path)
+
+    def discard(self):
+        for path in (self.path, self.state_path):
+            if path.exists():
+                path.unlink()
+
+
+def _download_chunk(url: str, partial: _PartialFile, index: int):
+    start, end = partial.byte_range(index)
+    with _open(url, {'Range': f'bytes={start}-{end}'}) as response:
+        if response.status != 206:
+            raise FetchError(f"Server ignored range request for {url}")
+        data = _read(response, url)
+    if len(data) != end - start + 1:
+        raise FetchError(f"Short read for {url} bytes {start}-{end}")
+    partial.write_chunk(index, data)
+
+
+def _download_whole(url: str, target: Path):
+    tmp_path = target.with_name(target.name + '.part')
+    with _open(url) as response, open(tmp_path, 'wb') as f:
+        for block in iter(lambda: _read(response, url, 1024 * 1024), b''):
+            f.write(block)
+        # read(amt) returns b'' instead of raising when the body is cut short
+        if response.length:
+            raise FetchError(f"Connection lost while reading {url}: {response.length} bytes missing")
+
+
+def download_file(url: str, target: Path, entry: dict, chunk_size: int = CHUNK_SIZE,
+                  workers: int = DEFAULT_WORKERS) -> Path:
+    """
+    Download one file, verifying it against its manifest entry.
+
+    Files larger than one chunk are fetched with parallel range requests and
+    resume from a previous partial download.
+
+    Raises:
+        FetchError: On network errors or checksum mismatch
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    size = entry.get('size')
+
+    if size is not None and size > chunk_size:
+        partial = _PartialFile(target, size, chunk_size)
+        pending = partial.pending()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() re-raises the first chunk failure; finished chunks stay recorded
+            list(executor.map(lambda i: _download_chunk(url, partial, i), pending))
+        part_path = partial.path
+    else:
+        _download_whole(url, target)
+        part_path = target.with_name(target.name + '.part')
+
+    if not file_checksum_ok(part_path, entry):
+        part_path.unlink()
+        target.with_name(target.name + '.part.json').unlink(missing_ok=True)
+        raise FetchError(f"Checksum mismatch for {target.name}")
+
+    os.replace(part_path, target)
+    target.with_name(target.name + '.part.json').unlink(missing_ok=True)
+    return target
+
+
+def fetch_model(model_path: Path, backend: str = 'torch', repo: str = DEFAULT_REPO,
+                revision: str = 'main', endpoint: Optional[str] = None,
+                workers: int = DEFAULT_WORKERS, chunk_size: int = CHUNK_SIZE,
+                verbose: bool = True) -> List[Path]:
+    """
+    Download only the files a backend needs into model_path.
+
+    Files already present with a matching checksum are skipped, so rerunning
+    after a failure only fetches what is missing.
+
+    Args:
+        model_path: Destination model directory
+        backend: 'torch' or 'onnx' (see model_loader.BACKENDS)
+        repo: Hub repo id
+        revision: Branch, tag or commit
+        endpoint: Hub or mirror base URL (defaults to HF_ENDPOINT)
+        workers: Parallel range requests per file
+        chunk_size: Bytes per range request
+        verbose: Whether to print progress
+
+    Returns:
+        Paths of the files in model_path
+
+    Raises:
+        FetchError: If the manifest or a file cannot be fetched or verified
+    """
+    endpoint = (endpoint or get_endpoint()).rstrip('/')
+    manifest = fetch_manifest(repo, revision, endpoint)
+    files = select_files(manifest, backend)
+    total = sum(manifest[name].get('size') or 0 for name in files)
+    if verbose:
+        print(f"📥 Fetching {len(files)} files ({total / 1024 / 1024:.1f}MB) from {endpoint}")
+
+    model_path = Path(model_path)
+    paths = []
+    for name in files:
+        target = model_path / name
+        entry = manifest[name]
+        if target.exists() and file_checksum_ok(target, entry):
+            if verbose:
+                print(f"   ✓ {name} (already present)")
+        else:
+            url = f"{endpoint}/{repo}/resolve/{revision}/{name}"
+            download_file(url, target, entry, chunk_size=chunk_size, workers=workers)
+            if verbose:
+                print(f"   ✓ {name}")
+        paths.append(target)
+    return paths
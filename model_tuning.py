@@ -0,0 +1,235 @@
+"""
+Warmup and host-specific thread/batch tuning for the embedding model.
+
+The first encode() after loading is much slower than later ones (lazy
+kernel setup, allocator growth), and torch's default thread count ignores
+cgroup CPU quotas, so containers often run with far too many threads.
+
+This module:
+1. Warms a model up with encodes at several sequence lengths
+2. Benchmarks intra-op thread counts and batch sizes on the current host
+3. Persists the best setting in a small host-profile JSON file
+4. Re-applies the stored setting on later loads
+
+The fastest batch size is stored as the token budget it amounts to on the
+tuning corpus (batch size x longest tuning sentence) and set as
+model.tuned_max_tokens, which embedding_batching uses as its default
+per-batch budget.
+
+Inter-op threads are fixed at 1: a BERT forward pass is a single chain of
+ops, and torch only allows setting inter-op threads once per process, so
+they cannot be benchmarked in-process anyway.
+
+Environment Variables:
+    MODEL_HOST_PROFILE: Override the host profile file location
+"""
+
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from embedding_batching import token_lengths
+from parallel_encoding import available_cpu_count, configure_torch_threads
+
+# Approximate sequence lengths (in words) exercised by warmup
+WARMUP_LENGTHS = (8, 32, 128, 256)
+WARMUP_BATCH_SIZES = (1, 8)
+
+DEFAULT_BATCH_SIZES = (8, 16, 32, 64)
+
+# Sentence lengths (in words) of the auto_tune corpus
+TUNING_LENGTHS = (6, 12, 20, 30, 60)
+
+_WARMUP_WORDS = (
+    "semantic drift appears when translated sentences lose meaning across "
+    "multiple hops between languages and models"
+).split()
+
+
+def make_warmup_sentence(num_words: int) -> str:
+    """Build a sentence of roughly num_words words."""
+    words = (_WARMUP_WORDS * (num_words // len(_WARMUP_WORDS) + 1))[:num_words]
+    return ' '.join(words)
+
+
+def warmup_model(model, lengths: Sequence[int] = WARMUP_LENGTHS,
+                 batch_sizes: Sequence[int] = WARMUP_BATCH_SIZES, verbose: bool = False) -> float:
+    """
+    Run representative encodes so the first real call is not a cold one.
+
+    Returns:
+        Seconds spent warming up
+    """
+    start = time.perf_counter()
+    for num_words in lengths:
+        sentence = make_warmup_sentence(num_words)
+        for batch_size in batch_sizes:
+            model.encode([sentence] * batch_size, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print(f"🔥 Model warmed up in {elapsed:.2f}s")
+    return elapsed
+
+
+def default_thread_candidates(cpus: Optional[int] = None) -> List[int]:
+    """Powers of two up to the available CPUs, plus the CPU count itself."""
+    cpus = cpus or available_cpu_count()
+    candidates, n = [], 1
+    while n < cpus:
+        candidates.append(n)
+        n *= 2
+    candidates.append(cpus)
+    return candidates
+
+
+def _tuning_corpus(size: int) -> List[str]:
+    """Mixed-length sentences resembling the experiment inputs."""
+    return [make_warmup_sentence(TUNING_LENGTHS[i % len(TUNING_LENGTHS)]) for i in range(size)]
+
+
+def batch_size_to_max_tokens(model, batch_size: int) -> int:
+    """
+    Token budget matching a tuned batch size.
+
+    auto_tune batches mix every tuning length, so each batch was padded to
+    the longest tuning sentence.
+    """
+    longest = max(token_lengths(model, [make_warmup_sentence(n) for n in TUNING_LENGTHS]))
+    return batch_size * longest
+
+
+def auto_tune(model, thread_candidates: Optional[Sequence[int]] = None,
+              batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES, corpus_size: int = 64,
+              repeats: int = 2, verbose: bool = False) -> dict:
+    """
+    Benchmark thread counts and batch sizes, then apply the fastest.
+
+    Args:
+        model: Loaded model with encode()
+        thread_candidates: Intra-op thread counts to try
+        batch_sizes: Batch sizes to try
+        corpus_size: Sentences encoded per measurement
+        repeats: Measurements per setting (best one is kept)
+        verbose: Whether to print each measurement
+
+    Returns:
+        Best settings: intra_op_threads, inter_op_threads, batch_size,
+        max_tokens, sentences_per_second, cpus, tuned_at
+    """
+    corpus = _tuning_corpus(corpus_size)
+    thread_candidates = list(thread_candidates or default_thread_candidates())
+    best = None
+
+    for threads in thread_candidates:
+        configure_torch_threads(threads)
+        model.encode(corpus[:8], batch_size=8)  # settle the new thread pool
+        for batch_size in batch_sizes:
+            elapsed = min(
+                _time_encode(model, corpus, batch_size) for _ in range(max(1, repeats))
+            )
+            throughput = len(corpus) / elapsed if elapsed > 0 else float('inf')
+            if verbose:
+                print(f"   threads={threads:<3} batch={batch_size:<4} {throughput:8.1f} sentences/s")
+            if best is None or throughput > best['sentences_per_second']:
+                best = {'intra_op_threads': threads, 'batch_size': batch_size,
+                        'sentences_per_second': throughput}
+
+    best.update({
+        'max_tokens': batch_size_to_max_tokens(model, best['batch_size']),
+        'inter_op_threads': 1,
+        'cpus': available_cpu_count(),
+        'tuned_at': datetime.now(timezone.utc).isoformat(),
+    })
+    configure_torch_threads(best['intra_op_threads'])
+    return best
+
+
+def _time_encode(model, corpus: List[str], batch_size: int) -> float:
+    start = time.perf_counter()
+    model.encode(corpus, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def get_host_profile_path() -> Path:
+    """Get the host profile file location."""
+    env_path = os.environ.get('MODEL_HOST_PROFILE')
+    if env_path:
+        return Path(env_path).expanduser()
+    return Path.home() / '.cache' / 'model_loader' / 'host_profile.json'
+
+
+def host_profile_key(model_path: Path, backend: str = 'torch') -> str:
+    """Key a tuning result by host, usable CPUs, backend and model."""
+    return f"{platform.node()}|cpus={available_cpu_count()}|{backend}|{Path(model_path).expanduser()}"
+
+
+def _read_profiles(path: Path) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_host_profile(model_path: Path, backend: str = 'torch') -> Optional[dict]:
+    """Return stored settings for this host and model, or None."""
+    return _read_profiles(get_host_profile_path()).get(host_profile_key(model_path, backend))
+
+
+def save_host_profile(model_path: Path, settings: dict, backend: str = 'torch') -> Path:
+    """Store settings for this host and model, keeping other entries."""
+    path = get_host_profile_path()
+    profiles = _read_profiles(path)
+    profiles[host_profile_key(model_path, backend)] = settings
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def apply_host_profile(model, model_path: Path, backend: str = 'torch',
+                       verbose: bool = False) -> Optional[dict]:
+    """
+    Apply stored thread settings and set the tuned token budget on the model.
+
+    Returns:
+        The applied settings, or None if this host has not been tuned
+    """
+    settings = load_host_profile(model_path, backend)
+    if settings is None:
+        return None
+
+    configure_torch_threads(settings['intra_op_threads'])
+    _set_token_budget(model, settings)
+    if verbose:
+        print(f"⚙️  Using tuned settings: {settings['intra_op_threads']} threads, "
+              f"{model.tuned_max_tokens} tokens per batch")
+    return settings
+
+
+def _set_token_budget(model, settings: dict):
+    # Profiles saved before max_tokens was stored only have batch_size
+    model.tuned_max_tokens = (settings.get('max_tokens')
+                              or batch_size_to_max_tokens(model, settings['batch_size']))
+
+
+def tune_model(model, model_path: Path, backend: str = 'torch', verbose: bool = True) -> dict:
+    """Run auto_tune, save the result to the host profile and apply it."""
+    if verbose:
+        print("⚙️  Auto-tuning threads and batch size for this host...")
+    settings = auto_tune(model, verbose=verbose)
+    path = save_host_profile(model_path, settings, backend)
+    _set_token_budget(model, settings)
+    if verbose:
+        print(f"✅ Best: {settings['intra_op_threads']} threads, batch size "
+              f"{settings['batch_size']} = {settings['max_tokens']} tokens per batch "
+              f"({settings['sentences_per_second']:.0f} sentences/s)")
+        print(f"   Saved host profile: {path}")
+    return settings
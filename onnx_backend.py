@@ -0,0 +1,243 @@
+"""
+ONNX Runtime inference backend for the embedding model.
+
+This module provides a drop-in replacement for SentenceTransformer.encode()
+that runs an exported ONNX graph with ONNX Runtime graph optimizations:
+1. Exports the transformer to ONNX once and caches it in the model directory
+2. Tokenizes with the fast `tokenizers` library (no torch import)
+3. Applies the same mean pooling and L2 normalization as the
+   sentence-transformers pipeline for all-MiniLM-L6-v2
+
+Use it through model_loader:
+    >>> model = load_model(backend='onnx')
+    >>> model.encode("Hello world").shape
+    (384,)
+
+Exporting requires torch and transformers the first time only; later loads
+need just onnxruntime, tokenizers and numpy.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+# Location of the exported graph, relative to the model directory. This is the
+# same layout HuggingFace uses, so a repo snapshot that ships onnx/model.onnx
+# is picked up without exporting.
+ONNX_SUBDIR = 'onnx'
+ONNX_FILENAME = 'model.onnx'
+
+# sentence-transformers default for all-MiniLM-L6-v2 (sentence_bert_config.json)
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+ONNX_OPSET_VERSION = 14
+
+
+def is_onnx_available() -> bool:
+    """Check if onnxruntime and tokenizers are installed without importing them."""
+    import importlib.util
+
+    return (importlib.util.find_spec('onnxruntime') is not None
+            and importlib.util.find_spec('tokenizers') is not None)
+
+
+def get_onnx_model_path(model_path: Path) -> Path:
+    """Get the cached ONNX graph path for a local model directory."""
+    return Path(model_path) / ONNX_SUBDIR / ONNX_FILENAME
+
+
+def _read_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _uses_normalize_module(model_path: Path) -> bool:
+    """Return True if the sentence-transformers pipeline ends with Normalize."""
+    modules_file = Path(model_path) / 'modules.json'
+    if not modules_file.exists():
+        return True  # all-MiniLM-L6-v2 normalizes
+    with open(modules_file, encoding='utf-8') as f:
+        modules = json.load(f)
+    return any(m.get('type', '').endswith('Normalize') for m in modules)
+
+
+def mean_pooling(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Average token embeddings, ignoring padding.
+
+    Args:
+        token_embeddings: (batch, seq_len, dim) transformer output
+        attention_mask: (batch, seq_len) mask with 1 for real tokens
+
+    Returns:
+        (batch, dim) sentence embeddings
+    """
+    mask = attention_mask[..., None].astype(token_embeddings.dtype)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+def l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, matching torch.nn.functional.normalize."""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.clip(norms, 1e-12, None)
+
+
+def export_onnx_model(model_path: Path, onnx_path: Optional[Path] = None,
+                      verbose: bool = True) -> Path:
+    """
+    Export the transformer in a local model directory to ONNX.
+
+    Args:
+        model_path: Local sentence-transformers model directory
+        onnx_path: Output file (defaults to get_onnx_model_path(model_path))
+        verbose: Whether to print status messages
+
+    Returns:
+        Path to the exported graph
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    model_path = Path(model_path)
+    if onnx_path is None:
+        onnx_path = get_onnx_model_path(model_path)
+
+    if verbose:
+        print(f"🔧 Exporting ONNX graph to: {onnx_path}")
+
+    tokenizer = AutoTokenizer.from_pretrained(str(model_path))
+    transformer = AutoModel.from_pretrained(str(model_path))
+    transformer.eval()
+
+    dummy = tokenizer(["Hello world"], return_tensors='pt')
+    input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in dummy]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    # Export to a temporary file so an interrupted export never leaves a
+    # truncated graph behind that later loads would trust
+    tmp_path = onnx_path.with_suffix('.onnx.tmp')
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[name] for name in input_names),
+            str(tmp_path),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET_VERSION,
+        )
+    os.replace(tmp_path, onnx_path)
+
+    if verbose:
+        print("✅ ONNX export complete")
+    return onnx_path
+
+
+class OnnxSentenceEncoder:
+    """
+    Sentence encoder backed by ONNX Runtime.
+
+    Mirrors the parts of the SentenceTransformer API this project uses:
+    `encode()` returns a (384,) vector for a string and an (N, 384) float32
+    array for a list of strings.
+    """
+
+    def __init__(self, model_path: Path, onnx_path: Optional[Path] = None,
+                 num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_path = Path(model_path)
+        self.onnx_path = Path(onnx_path) if onnx_path else get_onnx_model_path(self.model_path)
+
+        st_config = _read_json(self.model_path / 'sentence_bert_config.json')
+        self.max_seq_length = st_config.get('max_seq_length', DEFAULT_MAX_SEQ_LENGTH)
+        self.normalize = _uses_normalize_module(self.model_path)
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_path / 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(self.onnx_path), sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self._input_names = [i.name for i in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.session.get_outputs()[0].shape[-1])
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(sentences)
+        features = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        feeds = {name: features[name] for name in self._input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+        embeddings = mean_pooling(token_embeddings, features['attention_mask'])
+        if self.normalize:
+            embeddings = l2_normalize(embeddings)
+        return embeddings.astype(np.float32, copy=False)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, show_progress_bar: bool = False,
+               **kwargs) -> np.ndarray:
+        """
+        Encode one sentence or a list of sentences.
+
+        Args:
+            sentences: A string or list of strings
+            batch_size: Number of sentences per ONNX Runtime call
+            convert_to_numpy: Accepted for SentenceTransformer compatibility
+            show_progress_bar: Accepted for SentenceTransformer compatibility
+
+        Returns:
+            (dim,) array for a single string, (N, dim) array for a list
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        if len(sentences) == 0:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        batches = [
+            self._encode_batch(list(sentences[i:i + batch_size]))
+            for i in range(0, len(sentences), batch_size)
+        ]
+        embeddings = np.concatenate(batches, axis=0)
+        return embeddings[0] if single else embeddings
+
+
+def load_onnx_model(model_path: Path, verbose: bool = True) -> OnnxSentenceEncoder:
+    """
+    Load the ONNX backend for a local model, exporting the graph on first use.
+
+    Args:
+        model_path: Local sentence-transformers model directory
+        verbose: Whether to print status messages
+
+    Returns:
+        OnnxSentenceEncoder with the SentenceTransformer encode() contract
+    """
+    onnx_path = get_onnx_model_path(model_path)
+    if not onnx_path.exists():
+        export_onnx_model(model_path, onnx_path, verbose=verbose)
+    elif verbose:
+        print(f"📦 Using cached ONNX graph: {onnx_path}")
+
+    return OnnxSentenceEncoder(model_path, onnx_path)
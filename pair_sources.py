@@ -0,0 +1,193 @@
+"""
+Stream sentence pairs from files for batch distance analysis.
+
+Supported sources:
+- pipe: `id|typo_rate|original|final` lines, as in
+  data/experiment_raw_data/sentence_pairs_for_analysis.txt (header and
+  blank lines are skipped)
+- sentence-files: a directory of sentence_XX_original.txt /
+  sentence_XX_corrupted.txt pairs; typo rates come from a
+  sentence_pairs_for_analysis.txt in the same directory if there is one
+- jsonl: one JSON object per line
+- csv: a header row followed by one pair per row
+
+JSON and CSV records need `original` and `final` fields; `id`,
+`typo_rate` and `domain` are optional.
+
+Every reader is a generator yielding one pair dict at a time:
+    {'id': ..., 'typo_rate': ..., 'domain': ..., 'original': ..., 'final': ...}
+so a file of any size is read lazily. iter_pair_chunks() groups any pair
+iterable into lists of bounded size for batched encoding.
+
+Example:
+    >>> from pair_sources import iter_pairs, iter_pair_chunks
+    >>> for chunk in iter_pair_chunks(iter_pairs('pairs.jsonl'), 4096):
+    ...     encode_and_score(chunk)
+"""
+
+import csv
+import itertools
+import json
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+DEFAULT_CHUNK_PAIRS = 4096
+
+FORMATS = ('pipe', 'sentence-files', 'jsonl', 'csv')
+
+_SENTENCE_FILE = re.compile(r'sentence_(\d+)_original\.txt$')
+
+# Pipe file next to sentence_XX files holding each id's typo rate
+RATES_FILENAME = 'sentence_pairs_for_analysis.txt'
+
+
+def _parse_rate(value) -> Optional[Union[int, float]]:
+    """Parse a typo rate from text or JSON; blank or missing gives None."""
+    if value is None or value == '':
+        return None
+    rate = float(value)
+    return int(rate) if rate.is_integer() else rate
+
+
+def _parse_id(value):
+    """Keep numeric ids as ints so they sort and compare like the built-in list."""
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
+
+
+def make_pair(record: dict, default_id) -> dict:
+    """
+    Build a pair dict from a JSON/CSV record.
+
+    Raises:
+        ValueError: If the record has no original or final text
+    """
+    original, final = record.get('original'), record.get('final')
+    if original is None or final is None:
+        raise ValueError(f"Pair {default_id} needs 'original' and 'final' fields")
+    pair_id = record.get('id')
+    return {
+        'id': _parse_id(pair_id) if pair_id not in (None, '') else default_id,
+        'typo_rate': _parse_rate(record.get('typo_rate')),
+        'domain': record.get('domain') or None,
+        'original': original,
+        'final': final,
+    }
+
+
+def iter_pipe_pairs(path) -> Iterator[dict]:
+    """Read `id|typo_rate|original|final` lines, skipping headers and blanks."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('|', 3)
+            if len(fields) != 4 or not fields[0].strip().isdigit():
+                continue
+            pair_id, rate, original, final = fields
+            yield {
+                'id': int(pair_id),
+                'typo_rate': _parse_rate(rate.strip()),
+                'domain': None,
+                'original': original.strip(),
+                'final': final.strip(),
+            }
+
+
+def iter_sentence_file_pairs(directory) -> Iterator[dict]:
+    """
+    Read sentence_XX_original.txt / sentence_XX_corrupted.txt pairs, by id.
+
+    The sentence files carry no typo rate; it is looked up by id in
+    RATES_FILENAME when the directory has one, and is None otherwise.
+    """
+    directory = Path(directory)
+    rates_path = directory / RATES_FILENAME
+    rates = {pair['id']: pair['typo_rate'] for pair in iter_pipe_pairs(rates_path)} if rates_path.exists() else {}
+    numbered = []
+    for path in directory.glob('sentence_*_original.txt'):
+        match = _SENTENCE_FILE.search(path.name)
+        if match:
+            numbered.append((int(match.group(1)), path))
+
+    for pair_id, original_path in sorted(numbered):
+        final_path = original_path.with_name(original_path.name.replace('_original', '_corrupted'))
+        if not final_path.exists():
+            continue
+        yield {
+            'id': pair_id,
+            'typo_rate': rates.get(pair_id),
+            'domain': None,
+            'original': original_path.read_text(encoding='utf-8').strip(),
+            'final': final_path.read_text(encoding='utf-8').strip(),
+        }
+
+
+def iter_jsonl_pairs(path) -> Iterator[dict]:
+    """Read one JSON pair object per line, skipping blank lines."""
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                yield make_pair(json.loads(line), line_number)
+
+
+def iter_csv_pairs(path) -> Iterator[dict]:
+    """Read pairs from a CSV file with a header row."""
+    with open(path, encoding='utf-8', newline='') as f:
+        for row_number, row in enumerate(csv.DictReader(f), 1):
+            yield make_pair(row, row_number)
+
+
+_READERS = {
+    'pipe': iter_pipe_pairs,
+    'sentence-files': iter_sentence_file_pairs,
+    'jsonl': iter_jsonl_pairs,
+    'csv': iter_csv_pairs,
+}
+
+
+def detect_format(path) -> str:
+    """
+    Guess a source format from the path.
+
+    Raises:
+        ValueError: If the format cannot be guessed
+    """
+    path = Path(path)
+    if path.is_dir():
+        return 'sentence-files'
+    suffix = path.suffix.lower()
+    if suffix in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if suffix == '.csv':
+        return 'csv'
+    if suffix == '.txt':
+        return 'pipe'
+    raise ValueError(f"Cannot detect pair format of {path}; pass one of {', '.join(FORMATS)}")
+
+
+def iter_pairs(source, fmt: Optional[str] = None) -> Iterator[dict]:
+    """
+    Stream pairs from a file or directory.
+
+    Args:
+        source: Path to a pipe/JSONL/CSV file or a sentence-files directory
+        fmt: One of FORMATS (detected from the path if None)
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    fmt = fmt or detect_format(source)
+    if fmt not in _READERS:
+        raise ValueError(f"Unknown pair format: {fmt}. Use one of {', '.join(FORMATS)}")
+    return _READERS[fmt](source)
+
+
+def iter_pair_chunks(pairs: Iterable[dict], chunk_size: int = DEFAULT_CHUNK_PAIRS) -> Iterator[List[dict]]:
+    """Group pairs into lists of at most chunk_size, preserving order."""
+    iterator = iter(pairs)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
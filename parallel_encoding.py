@@ -0,0 +1,403 @@
+"""
+Multi-process encoding with a worker pool that shares one loaded model.
+
+Loading the embedding model takes seconds and hundreds of MB; forking after
+the load lets every worker use the parent's weights without loading or
+copying them. Tensor storage is never written during inference, so those
+pages stay shared between all workers (copy-on-write).
+
+This module:
+1. Loads the model once in the parent via model_loader.get_model()
+2. Forks a pool of workers that inherit it
+3. Limits torch intra-op threads per worker so workers don't oversubscribe cores
+4. Shards the input, and merges results back in input order
+
+With num_workers='auto' (the default for compute_embeddings and
+compute_pair_distances), plan_workers() sizes the pool and the per-worker
+torch threads from the usable CPUs and the job size. measure_speedup()
+times the pool against the single-process path.
+
+Example:
+    >>> from parallel_encoding import compute_embeddings, compute_pair_distances
+    >>> distances = compute_pair_distances([("Hello", "Hi"), ("Cat", "Dog")], num_workers=4)
+    >>> embeddings = compute_embeddings(texts)   # pool sized automatically
+
+Fork is only available on POSIX. Where it is missing (Windows, or with
+start_method='spawn'), each worker loads its own copy of the model instead.
+
+Note: avoid calling model.encode() in the parent before forking. Some OpenMP
+runtimes do not survive a fork once their thread pool has started.
+"""
+
+import math
+import multiprocessing as mp
+import os
+import time
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from distance_kernels import paired_cosine_distances
+from embedding_batching import encode_length_bucketed
+
+# Fewest items worth sending to a worker when sizing the pool automatically
+MIN_ITEMS_PER_WORKER = 32
+
+# Model inherited by forked workers (set in the parent right before forking)
+_worker_model = None
+
+
+def available_cpu_count() -> int:
+    """
+    Number of CPUs this process may actually use.
+
+    Honors the CPU affinity mask and cgroup v1/v2 CPU quotas, which
+    os.cpu_count() and torch's defaults ignore inside containers.
+    """
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, max(1, math.floor(quota)))
+    return max(1, count)
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """Return the cgroup CPU limit in CPUs, or None if unlimited/unknown."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        # cgroup v1
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def is_fork_available() -> bool:
+    """Check if the 'fork' start method is supported on this platform."""
+    return 'fork' in mp.get_all_start_methods()
+
+
+def configure_torch_threads(intra_op_threads: int, inter_op_threads: Optional[int] = None):
+    """
+    Set torch thread counts for the current process.
+
+    Inter-op threads can only be set before torch runs any parallel work, so
+    failures there are ignored.
+    """
+    os.environ['OMP_NUM_THREADS'] = str(intra_op_threads)
+    try:
+        import torch
+    except ImportError:
+        return
+
+    torch.set_num_threads(intra_op_threads)
+    if inter_op_threads is not None:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            pass
+
+
+def plan_workers(num_items: int, cpus: Optional[int] = None,
+                 min_items_per_worker: int = MIN_ITEMS_PER_WORKER) -> Tuple[int, int]:
+    """
+    Choose (num_workers, threads_per_worker) for a job of num_items.
+
+    Small encoders like all-MiniLM-L6-v2 scale better across processes than
+    across torch threads, so the plan is one single-threaded worker per CPU.
+    Jobs too small to give every worker min_items_per_worker items use fewer
+    workers, and the spare cores become extra threads per worker.
+
+    Args:
+        num_items: Number of texts or pairs to process
+        cpus: CPUs to plan for (defaults to available_cpu_count())
+        min_items_per_worker: Fewest items worth a worker process
+
+    Returns:
+        (num_workers, threads_per_worker); num_workers == 1 means in-process
+    """
+    cpus = cpus or available_cpu_count()
+    num_workers = max(1, min(cpus, num_items // max(1, min_items_per_worker)))
+    return num_workers, max(1, cpus // num_workers)
+
+
+def _resolve_workers(num_items: int, num_workers: Union[int, str, None],
+                     threads_per_worker: Optional[int]) -> Tuple[int, Optional[int]]:
+    """Expand num_workers=None/'auto' into a plan_workers() layout."""
+    if num_workers is None or num_workers == 'auto':
+        planned_workers, planned_threads = plan_workers(num_items)
+        return planned_workers, threads_per_worker or planned_threads
+    return int(num_workers), threads_per_worker
+
+
+def _init_worker(threads_per_worker: int, model=None, load_model: bool = False):
+    global _worker_model
+
+    configure_torch_threads(threads_per_worker, inter_op_threads=1)
+    if model is not None:
+        _worker_model = model
+    elif load_model:
+        from model_loader import get_model
+        _worker_model = get_model()
+
+
+def _run_shard(args):
+    func, shard = args
+    return func(_worker_model, shard)
+
+
+def split_into_shards(items: Sequence, num_shards: int) -> List[Sequence]:
+    """Split items into up to num_shards contiguous, nearly equal slices."""
+    num_shards = max(1, min(num_shards, len(items)))
+    size, remainder = divmod(len(items), num_shards)
+    shards, start = [], 0
+    for i in range(num_shards):
+        end = start + size + (1 if i < remainder else 0)
+        shards.append(items[start:end])
+        start = end
+    return shards
+
+
+class PreforkPool:
+    """
+    Worker pool whose workers share an already-loaded model, or hold their own.
+
+    Use as a context manager:
+        >>> with PreforkPool(num_workers=4) as pool:
+        ...     results = pool.map_shards(my_shard_func, items)
+
+    `my_shard_func(model, shard)` must be a module-level function returning
+    a list with one result per item of the shard.
+
+    With the 'fork' start method (the default where available) workers
+    inherit the parent's model copy-on-write. With 'spawn' each worker holds
+    its own model: a pickled copy of `model` if one was given, otherwise one
+    loaded with model_loader.get_model() in the worker.
+    """
+
+    def __init__(self, model=None, num_workers: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None,
+                 start_method: Optional[str] = None):
+        cpus = available_cpu_count()
+        self.model = model
+        self.num_workers = num_workers or cpus
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.num_workers)
+        self.start_method = start_method or ('fork' if is_fork_available() else 'spawn')
+        self._pool = None
+
+    def _ensure_model(self):
+        if self.model is None:
+            from model_loader import get_model
+            self.model = get_model()
+        return self.model
+
+    def __enter__(self):
+        global _worker_model
+
+        if self.num_workers <= 1:
+            self._ensure_model()
+            return self
+
+        ctx = mp.get_context(self.start_method)
+        if self.start_method == 'fork':
+            _worker_model = self._ensure_model()
+            initargs = (self.threads_per_worker,)
+        else:
+            initargs = (self.threads_per_worker, self.model, self.model is None)
+        self._pool = ctx.Pool(
+            processes=self.num_workers,
+            initializer=_init_worker,
+            initargs=initargs
+        )
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _worker_model
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        _worker_model = None
+        return False
+
+    def map_shards(self, func: Callable, items: Sequence) -> list:
+        """
+        Apply func(model, shard) to contiguous shards and merge results in order.
+
+        Runs in-process when the pool has a single worker.
+        """
+        if len(items) == 0:
+            return []
+
+        if self._pool is None:
+            return list(func(self._ensure_model(), items))
+
+        shards = split_into_shards(items, self.num_workers)
+        results = []
+        for shard_result in self._pool.map(_run_shard, [(func, shard) for shard in shards]):
+            results.extend(shard_result)
+        return results
+
+
+def distances_for_shard(model, pairs: Sequence[Tuple[str, str]]) -> List[Optional[float]]:
+    """
+    Compute cosine distances for a shard of (text1, text2) pairs.
+
+    The shard is encoded in length-bucketed batches. If that fails, pairs are
+    retried one at a time so a single bad input yields None instead of
+    failing the shard.
+    """
+    try:
+        texts = [p[0] for p in pairs] + [p[1] for p in pairs]
+        embeddings = encode_length_bucketed(model, texts)
+        n = len(pairs)
+        return [float(d) for d in paired_cosine_distances(embeddings[:n], embeddings[n:])]
+    except Exception:
+        pass
+
+    results = []
+    for text1, text2 in pairs:
+        try:
+            emb = np.asarray(model.encode([text1, text2], convert_to_numpy=True))
+            results.append(float(paired_cosine_distances(emb[:1], emb[1:])[0]))
+        except Exception:
+            results.append(None)
+    return results
+
+
+def embeddings_for_shard(model, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+    """
+    Encode a shard of texts, retrying one at a time if the batch fails.
+
+    A text that cannot be encoded yields None.
+    """
+    try:
+        return list(encode_length_bucketed(model, texts))
+    except Exception:
+        pass
+
+    results = []
+    for text in texts:
+        try:
+            results.append(np.asarray(model.encode([text], convert_to_numpy=True), dtype=np.float32)[0])
+        except Exception:
+            results.append(None)
+    return results
+
+
+def compute_embeddings(
+    texts: Sequence[str],
+    num_workers: Union[int, str, None] = 'auto',
+    threads_per_worker: Optional[int] = None,
+    model=None,
+    start_method: Optional[str] = None
+) -> List[Optional[np.ndarray]]:
+    """
+    Encode many texts across a worker pool.
+
+    Arguments match compute_pair_distances. Returns one float32 embedding per
+    text in input order (None for texts that failed).
+    """
+    texts = list(texts)
+    num_workers, threads_per_worker = _resolve_workers(len(texts), num_workers, threads_per_worker)
+    with PreforkPool(model=model, num_workers=num_workers, threads_per_worker=threads_per_worker,
+                     start_method=start_method) as pool:
+        return pool.map_shards(embeddings_for_shard, texts)
+
+
+def compute_pair_distances(
+    pairs: Sequence[Tuple[str, str]],
+    num_workers: Union[int, str, None] = 'auto',
+    threads_per_worker: Optional[int] = None,
+    model=None,
+    start_method: Optional[str] = None
+) -> List[Optional[float]]:
+    """
+    Compute cosine distances for many sentence pairs across a worker pool.
+
+    Args:
+        pairs: (original, final) sentence pairs
+        num_workers: Worker processes, or 'auto'/None to size the pool with
+            plan_workers()
+        threads_per_worker: Torch intra-op threads per worker
+            (defaults to available CPUs // num_workers)
+        model: Preloaded model (defaults to model_loader.get_model())
+        start_method: 'fork' to share the model, 'spawn' for one model per
+            worker (defaults to fork where available)
+
+    Returns:
+        One distance per pair in input order (None for pairs that failed)
+    """
+    pairs = list(pairs)
+    num_workers, threads_per_worker = _resolve_workers(len(pairs), num_workers, threads_per_worker)
+    with PreforkPool(model=model, num_workers=num_workers, threads_per_worker=threads_per_worker,
+                     start_method=start_method) as pool:
+        return pool.map_shards(distances_for_shard, pairs)
+
+
+def measure_speedup(
+    texts: Sequence[str],
+    num_workers: Union[int, str, None] = 'auto',
+    threads_per_worker: Optional[int] = None,
+    model=None,
+    start_method: Optional[str] = None
+) -> dict:
+    """
+    Time compute_embeddings against single-process encoding of the same texts.
+
+    The pool runs first, because the single-process run starts the parent's
+    OpenMP thread pool (see the fork note in the module docstring). The
+    single-process path uses every available CPU as torch threads.
+
+    Returns:
+        Dict with the worker layout, both wall times, texts/second for each
+        and the speedup of the pool over the single process
+    """
+    texts = list(texts)
+    if model is None:
+        from model_loader import get_model
+        model = get_model()
+    num_workers, threads_per_worker = _resolve_workers(len(texts), num_workers, threads_per_worker)
+
+    start = time.perf_counter()
+    compute_embeddings(texts, num_workers=num_workers, threads_per_worker=threads_per_worker,
+                       model=model, start_method=start_method)
+    parallel_seconds = time.perf_counter() - start
+
+    cpus = available_cpu_count()
+    configure_torch_threads(cpus)
+    start = time.perf_counter()
+    encode_length_bucketed(model, texts)
+    single_seconds = time.perf_counter() - start
+
+    return {
+        'texts': len(texts),
+        'cpus': cpus,
+        'num_workers': num_workers,
+        'threads_per_worker': threads_per_worker or max(1, cpus // num_workers),
+        'single_process_seconds': single_seconds,
+        'parallel_seconds': parallel_seconds,
+        'single_process_texts_per_second': len(texts) / single_seconds if single_seconds else 0.0,
+        'parallel_texts_per_second': len(texts) / parallel_seconds if parallel_seconds else 0.0,
+        'speedup': single_seconds / parallel_seconds if parallel_seconds else 0.0,
+    }
@@ -0,0 +1,346 @@
+"""
+Columnar store for batch distance results and their embeddings.
+
+The Markdown report keeps only rounded distances, so any new statistic
+used to mean re-encoding every sentence. This store keeps, per pair:
+
+    id, typo_rate, domain, distance, original embedding, final embedding
+
+Layout (one directory):
+    meta.json         row count and embedding dimension (committed rows)
+    distance.f64      float64 per row, NaN where the distance failed
+    typo_rate.f64     float64 per row, NaN where unknown
+    original.f32      (rows, dim) float32
+    final.f32         (rows, dim) float32
+    labels.jsonl      [id, domain] per row
+
+Numeric columns are raw little-endian arrays, so ResultStore opens them with
+np.memmap and reading a subset of rows only touches those pages. Rows are
+appended chunk by chunk; meta.json is rewritten after each chunk and only
+rows it counts are visible to readers. A caller can commit its own
+checkpoint record in the same meta.json write, so resuming a run sees the
+rows and the checkpoint from the same moment.
+
+export_table() writes the store as a single Parquet file (when pyarrow is
+installed) or .npz file for other tools.
+
+Example:
+    >>> with ResultStoreWriter('results/distance_store') as writer:
+    ...     writer.append(records, original_embeddings, final_embeddings)
+    >>> store = ResultStore('results/distance_store')
+    >>> store.distance[:10], store.embeddings('final')[[3, 7]]
+    >>> results = store.to_results()     # dicts for generate_statistics()
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+STORE_VERSION = 1
+
+_SCALAR_COLUMNS = {'distance': 'distance.f64', 'typo_rate': 'typo_rate.f64'}
+_EMBEDDING_COLUMNS = {'original': 'original.f32', 'final': 'final.f32'}
+_LABELS_FILE = 'labels.jsonl'
+_META_FILE = 'meta.json'
+
+
+def _as_float(value) -> float:
+    return float('nan') if value is None else float(value)
+
+
+def _from_float(value: float):
+    """NaN back to None; integral floats back to int (typo rates like 20)."""
+    if np.isnan(value):
+        return None
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def read_meta(directory) -> Optional[dict]:
+    """Committed store metadata, or None if the directory holds no store."""
+    try:
+        with open(Path(directory) / _META_FILE, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') == STORE_VERSION:
+            return meta
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class ResultStoreWriter:
+    """
+    Append result rows with their embeddings to a store directory.
+
+    Use as a context manager, or call close() when done. Each append() is
+    committed to meta.json before it returns. `checkpoint` holds the record
+    committed with the latest append (None for a new store).
+    """
+
+    def __init__(self, directory, dim: Optional[int] = None, overwrite: bool = True):
+        """
+        Args:
+            directory: Store directory (created if missing)
+            dim: Embedding dimension (taken from the first append if None)
+            overwrite: Start a new store; False appends after the committed rows
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        meta = None if overwrite else read_meta(self.directory)
+        if meta is None:
+            # Readers must not pair an old row count with truncated columns
+            (self.directory / _META_FILE).unlink(missing_ok=True)
+        self.rows = meta['rows'] if meta else 0
+        self.dim = meta['dim'] if meta else dim
+        self.checkpoint = meta.get('checkpoint') if meta else None
+        self._files = {}
+        self._open(truncate=meta is None)
+
+    def _open(self, truncate: bool):
+        names = list(_SCALAR_COLUMNS.values()) + list(_EMBEDDING_COLUMNS.values()) + [_LABELS_FILE]
+        for name in names:
+            path = self.directory / name
+            f = open(path, 'wb' if truncate else 'r+b')
+            if not truncate:
+                # Drop anything past the committed rows (an interrupted append)
+                f.truncate(self._committed_bytes(name))
+                f.seek(0, os.SEEK_END)
+            self._files[name] = f
+
+    def _committed_bytes(self, name: str) -> int:
+        if name in _SCALAR_COLUMNS.values():
+            return self.rows * 8
+        if name in _EMBEDDING_COLUMNS.values():
+            return self.rows * (self.dim or 0) * 4
+        # labels.jsonl: bytes of the first self.rows lines
+        size = 0
+        with open(self.directory / name, 'rb') as f:
+            for _, line in zip(range(self.rows), f):
+                size += len(line)
+        return size
+
+    def append(self, records: Sequence[dict], original_embeddings, final_embeddings,
+               checkpoint: Optional[dict] = None):
+        """
+        Append rows and commit them.
+
+        Args:
+            records: Dicts with id, typo_rate, domain and distance (None allowed)
+            original_embeddings: (n, dim) array, or a sequence with None for
+                pairs that could not be encoded (stored as zeros)
+            final_embeddings: Same for the final sentences
+            checkpoint: JSON-serializable record committed together with
+                these rows (see the checkpoint attribute)
+        """
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        if not records:
+            if checkpoint is not None:
+                self._write_meta()
+            return
+        original = self._stack(original_embeddings, len(records))
+        final = self._stack(final_embeddings, len(records))
+
+        files = self._files
+        files['distance.f64'].write(
+            np.array([_as_float(r.get('distance')) for r in records], dtype='<f8').tobytes())
+        files['typo_rate.f64'].write(
+            np.array([_as_float(r.get('typo_rate')) for r in records], dtype='<f8').tobytes())
+        files['original.f32'].write(original.tobytes())
+        files['final.f32'].write(final.tobytes())
+        files[_LABELS_FILE].write(''.join(
+            json.dumps([r.get('id'), r.get('domain')], ensure_ascii=False) + '\n' for r in records
+        ).encode('utf-8'))
+
+        for f in files.values():
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows += len(records)
+        self._write_meta()
+
+    def _stack(self, embeddings, n: int) -> np.ndarray:
+        if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2:
+            matrix = embeddings
+        else:
+            present = next((e for e in embeddings if e is not None), None)
+            dim = self.dim or (len(present) if present is not None else None)
+            if dim is None:
+                raise ValueError("Cannot infer the embedding dimension from a chunk with no embeddings")
+            matrix = np.stack([np.zeros(dim, dtype=np.float32) if e is None else np.asarray(e)
+                               for e in embeddings])
+        matrix = np.ascontiguousarray(matrix, dtype='<f4')
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        if matrix.shape != (n, self.dim):
+            raise ValueError(f"Expected embeddings of shape ({n}, {self.dim}), got {matrix.shape}")
+        return matrix
+
+    def _write_meta(self):
+        path = self.directory / _META_FILE
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STORE_VERSION, 'rows': self.rows, 'dim': self.dim,
+                       'checkpoint': self.checkpoint}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Commit (also for an empty store) and close the column files."""
+        if self._files:
+            if self.dim is not None or self.rows == 0:
+                self._write_meta()
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ResultStore:
+    """
+    Read a result store lazily through memory maps.
+
+    Numeric columns and embeddings are read-only np.memmap views; labels
+    are loaded on first use.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        meta = read_meta(self.directory)
+        if meta is None:
+            raise FileNotFoundError(f"No result store in {self.directory}")
+        self.rows = meta['rows']
+        self.dim = meta['dim'] or 0
+        self._labels = None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _memmap(self, name: str, dtype: str, shape: tuple) -> np.ndarray:
+        if self.rows == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.directory / name, dtype=dtype, mode='r', shape=shape)
+
+    @property
+    def distance(self) -> np.ndarray:
+        """Distance per row (NaN where it failed)."""
+        return self._memmap(_SCALAR_COLUMNS['distance'], '<f8', (self.rows,))
+
+    @property
+    def typo_rate(self) -> np.ndarray:
+        """Typo rate per row (NaN where unknown)."""
+        return self._memmap(_SCALAR_COLUMNS['typo_rate'], '<f8', (self.rows,))
+
+    def embeddings(self, which: str = 'original') -> np.ndarray:
+        """(rows, dim) float32 embeddings of the 'original' or 'final' sentences."""
+        if which not in _EMBEDDING_COLUMNS:
+            raise ValueError(f"Unknown embedding column: {which}. Use 'original' or 'final'")
+        return self._memmap(_EMBEDDING_COLUMNS[which], '<f4', (self.rows, self.dim))
+
+    def _load_labels(self) -> List[list]:
+        if self._labels is None:
+            with open(self.directory / _LABELS_FILE, encoding='utf-8') as f:
+                self._labels = [json.loads(line) for _, line in zip(range(self.rows), f)]
+        return self._labels
+
+    @property
+    def ids(self) -> list:
+        return [label[0] for label in self._load_labels()]
+
+    @property
+    def domains(self) -> list:
+        return [label[1] for label in self._load_labels()]
+
+    def select(self, rows=None, columns: Sequence[str] = ('id', 'typo_rate', 'domain', 'distance')) -> dict:
+        """
+        Read some columns for a subset of rows.
+
+        Args:
+            rows: Row indices, a slice, or a boolean mask (all rows if None)
+            columns: Any of id, typo_rate, domain, distance, original, final
+
+        Returns:
+            Dict of column name to array (lists for id and domain)
+        """
+        index = slice(None) if rows is None else rows
+        positions = np.arange(self.rows)[index]
+        selected = {}
+        for column in columns:
+            if column in _SCALAR_COLUMNS:
+                selected[column] = np.asarray(getattr(self, column)[index])
+            elif column in _EMBEDDING_COLUMNS:
+                selected[column] = np.asarray(self.embeddings(column)[index])
+            elif column in ('id', 'domain'):
+                labels = self._load_labels()
+                selected[column] = [labels[i][0 if column == 'id' else 1] for i in positions]
+            else:
+                raise ValueError(f"Unknown column: {column}")
+        return selected
+
+    def to_results(self, rows=None) -> List[dict]:
+        """
+        Result dicts (id, typo_rate, domain, distance) for generate_statistics
+        and create_visualizations, without loading the model.
+        """
+        columns = self.select(rows)
+        return [
+            {'id': pair_id, 'typo_rate': _from_float(rate), 'domain': domain, 'distance': _from_float(distance)}
+            for pair_id, rate, domain, distance in zip(
+                columns['id'], columns['typo_rate'], columns['domain'], columns['distance'])
+        ]
+
+
+def export_table(store: ResultStore, path) -> str:
+    """
+    Write the whole store to one Parquet (.parquet, needs pyarrow) or .npz file.
+
+    Returns:
+        The path written
+
+    Raises:
+        ImportError: If a .parquet path is given and pyarrow is not installed
+    """
+    path = Path(path)
+    columns = store.select(columns=('id', 'typo_rate', 'domain', 'distance', 'original', 'final'))
+
+    if path.suffix == '.parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow. Install with: pip install pyarrow") from None
+
+        def vectors(matrix):
+            return pa.FixedSizeListArray.from_arrays(pa.array(matrix.reshape(-1), pa.float32()), store.dim)
+
+        table = pa.table({
+            'id': pa.array([str(i) for i in columns['id']]),
+            'typo_rate': pa.array(columns['typo_rate'], from_pandas=True),
+            'domain': pa.array(columns['domain'], pa.string()),
+            'distance': pa.array(columns['distance'], from_pandas=True),
+            'original_embedding': vectors(columns['original']),
+            'final_embedding': vectors(columns['final']),
+        })
+        pq.write_table(table, path)
+    else:
+        np.savez(
+            path,
+            id=np.array([str(i) for i in columns['id']]),
+            typo_rate=columns['typo_rate'],
+            domain=np.array(['' if d is None else d for d in columns['domain']]),
+            distance=columns['distance'],
+            original_embedding=columns['original'],
+            final_embedding=columns['final'],
+        )
+        if path.suffix != '.npz':
+            path = path.with_name(path.name + '.npz')
+    return str(path)
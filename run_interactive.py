@@ -38,7 +38,7 @@ except ImportError:
     USE_MODEL_LOADER = False
     from sentence_transformers import SentenceTransformer
 
-from scipy.spatial.distance import cosine
+from distance_kernels import cosine_distance
 import numpy as np
 
 print("="*80)
@@ -79,6 +79,13 @@ else:
         print("\n💡 Run setup to fix: python3 setup.py")
         sys.exit(1)
 
+# Serve repeated examples from the in-process memo and persistent embedding cache
+if USE_MODEL_LOADER:
+    from embedding_cache import CachedEncoder, get_embedding_cache, get_embedding_memo
+    _cache, _memo = get_embedding_cache(), get_embedding_memo()
+    if _cache is not None or _memo is not None:
+        model = CachedEncoder(model, _cache, memo=_memo)
+
 def compute_semantic_distance(text1, text2):
     """Compute semantic distance between two texts"""
     # Generate embeddings
@@ -86,7 +93,7 @@ def compute_semantic_distance(text1, text2):
     emb2 = model.encode(text2, convert_to_numpy=True)
     
     # Calculate cosine distance
-    distance = cosine(emb1, emb2)
+    distance = cosine_distance(emb1, emb2)
     return distance
 
 def interpret_distance(distance):
@@ -0,0 +1,272 @@
+"""
+Memory-mapped safetensors weights for the embedding model.
+
+`pytorch_model.bin` is a pickle: every process that loads it deserializes
+the whole file and keeps a private copy of the weights. `model.safetensors`
+is a flat header + raw tensor bytes, so the weights can be memory-mapped
+straight from the file. All processes on a host that map the same file share
+one page-cache copy instead of holding N private copies.
+
+This module:
+1. Converts pytorch_model.bin to model.safetensors once (first load)
+2. Reads the safetensors header without any third-party package
+3. Builds the transformer straight from the file mapping: transformers
+   creates its modules on the meta device (low_cpu_mem_usage) and assigns
+   the mapped tensors given as state_dict, so the weights are neither
+   randomly initialized nor read into a private copy first
+4. On sentence-transformers < 2.3 (no model_kwargs), loads normally and
+   re-points the parameters at the mapping afterwards, which shares memory
+   across processes but does not avoid the load-time copy
+
+Environment Variables:
+    MODEL_MMAP_WEIGHTS: Set to "0" to keep the default (private copy) loading
+"""
+
+import inspect
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+SAFETENSORS_FILENAME = 'model.safetensors'
+PYTORCH_BIN_FILENAME = 'pytorch_model.bin'
+
+# Weight files accepted for a local model, in order of preference
+WEIGHT_FILENAMES = (SAFETENSORS_FILENAME, PYTORCH_BIN_FILENAME)
+
+# safetensors dtype codes -> torch dtype attribute names
+_DTYPES = {
+    'F64': 'float64',
+    'F32': 'float32',
+    'F16': 'float16',
+    'BF16': 'bfloat16',
+    'I64': 'int64',
+    'I32': 'int32',
+    'I16': 'int16',
+    'I8': 'int8',
+    'U8': 'uint8',
+    'BOOL': 'bool',
+}
+
+
+def is_mmap_enabled() -> bool:
+    """Check if memory-mapped weights are enabled."""
+    return os.environ.get('MODEL_MMAP_WEIGHTS', '1') != '0'
+
+
+def find_weights_file(model_path: Path) -> Optional[Path]:
+    """Return the preferred weights file in a model directory, or None."""
+    for filename in WEIGHT_FILENAMES:
+        candidate = Path(model_path) / filename
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def has_model_weights(model_path: Path) -> bool:
+    """Check for either model.safetensors or pytorch_model.bin."""
+    return find_weights_file(model_path) is not None
+
+
+def convert_to_safetensors(model_path: Path, verbose: bool = True) -> Optional[Path]:
+    """
+    Write model.safetensors next to pytorch_model.bin if it is missing.
+
+    Args:
+        model_path: Local model directory
+        verbose: Whether to print status messages
+
+    Returns:
+        Path to model.safetensors, or None if there is nothing to convert
+    """
+    model_path = Path(model_path)
+    target = model_path / SAFETENSORS_FILENAME
+    if target.exists():
+        return target
+
+    source = model_path / PYTORCH_BIN_FILENAME
+    if not source.exists():
+        return None
+
+    import torch
+    from safetensors.torch import save_file
+
+    if verbose:
+        print(f"🔧 Converting {PYTORCH_BIN_FILENAME} to {SAFETENSORS_FILENAME} (one-time)...")
+
+    state_dict = torch.load(str(source), map_location='cpu', weights_only=True)
+    # safetensors refuses tensors that share storage (e.g. tied embeddings)
+    state_dict = {name: tensor.contiguous().clone() for name, tensor in state_dict.items()}
+
+    # Write to a temporary file so an interrupted conversion is never mistaken
+    # for a complete one on the next load
+    tmp_target = target.with_suffix('.safetensors.tmp')
+    save_file(state_dict, str(tmp_target), metadata={'format': 'pt'})
+    os.replace(tmp_target, target)
+
+    if verbose:
+        print(f"✅ Wrote {target}")
+    return target
+
+
+def read_safetensors_header(path: Path) -> Tuple[Dict[str, dict], int]:
+    """
+    Read the JSON header of a safetensors file.
+
+    Returns:
+        (tensor entries keyed by name, byte offset where tensor data starts)
+    """
+    with open(path, 'rb') as f:
+        (header_size,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size).decode('utf-8'))
+    header.pop('__metadata__', None)
+    return header, 8 + header_size
+
+
+def mmap_state_dict(path: Path) -> dict:
+    """
+    Build a state dict whose tensors are views into a mapping of the file.
+
+    The mapping is copy-on-write (mmap.ACCESS_COPY): pages are shared with
+    every other process mapping the same file until one of them writes, which
+    inference never does. The returned tensors keep the mapping alive.
+    """
+    import torch
+
+    header, data_start = read_safetensors_header(path)
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    state_dict = {}
+    for name, entry in header.items():
+        dtype = getattr(torch, _DTYPES[entry['dtype']])
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        begin, end = entry['data_offsets']
+        if end == begin:
+            state_dict[name] = torch.empty(entry['shape'], dtype=dtype)
+            continue
+        flat = torch.frombuffer(mapping, dtype=dtype, count=(end - begin) // itemsize,
+                                offset=data_start + begin)
+        state_dict[name] = flat.view(entry['shape'])
+    return state_dict
+
+
+def attach_mmap_weights(module, path: Path) -> int:
+    """
+    Point a torch module's parameters and buffers at memory-mapped tensors.
+
+    Tensors are matched by state-dict name (with or without a leading model
+    prefix such as "bert.") and only replaced when shape and dtype match, so
+    anything unexpected simply keeps its regular copy.
+
+    Args:
+        module: Loaded torch module (e.g. the transformer inside SentenceTransformer)
+        path: model.safetensors for the same weights
+
+    Returns:
+        Number of tensors now backed by the mapping
+    """
+    mapped = mmap_state_dict(path)
+    attached = 0
+
+    for name, tensor in list(module.named_parameters()) + list(module.named_buffers()):
+        source = mapped.get(name)
+        if source is None:
+            # Checkpoints saved from a task model carry a prefix, e.g. "bert."
+            source = next((t for k, t in mapped.items() if k.endswith('.' + name)), None)
+        if source is None or source.shape != tensor.shape or source.dtype != tensor.dtype:
+            continue
+        if source.device != tensor.device:
+            continue
+        tensor.data = source
+        attached += 1
+
+    return attached
+
+
+def mmap_model_kwargs(model_path: Path) -> dict:
+    """
+    from_pretrained() kwargs that build the transformer from mapped weights.
+
+    Returns:
+        {'state_dict', 'low_cpu_mem_usage'}, or {} if disabled or there is
+        no model.safetensors
+    """
+    if not is_mmap_enabled():
+        return {}
+    weights = Path(model_path) / SAFETENSORS_FILENAME
+    if not weights.exists():
+        return {}
+    return {'state_dict': mmap_state_dict(weights), 'low_cpu_mem_usage': True}
+
+
+def load_with_mmap_weights(sentence_transformer_cls, model_path: Path, device: Optional[str] = None,
+                           verbose: bool = True):
+    """
+    Load a SentenceTransformer whose transformer weights live in the file mapping.
+
+    Falls back to a regular load followed by use_mmap_weights() when this
+    sentence-transformers has no model_kwargs, and to a plain load if
+    building from the mapping fails.
+
+    Args:
+        sentence_transformer_cls: The SentenceTransformer class
+        model_path: Local model directory
+        device: Torch device; auto-selected if None
+        verbose: Whether to print status messages
+
+    Returns:
+        Loaded model
+    """
+    supports_kwargs = 'model_kwargs' in inspect.signature(sentence_transformer_cls.__init__).parameters
+    if supports_kwargs:
+        try:
+            model_kwargs = mmap_model_kwargs(model_path)
+            if model_kwargs:
+                model = sentence_transformer_cls(str(model_path), device=device, model_kwargs=model_kwargs)
+                if verbose:
+                    print(f"🗺️  Built model from {len(model_kwargs['state_dict'])} memory-mapped "
+                          f"weight tensors in {SAFETENSORS_FILENAME}")
+                return model
+        except Exception as e:
+            if verbose:
+                print(f"⚠️  Loading from memory-mapped weights failed, loading a private copy: {e}")
+        return sentence_transformer_cls(str(model_path), device=device)
+
+    model = sentence_transformer_cls(str(model_path), device=device)
+    try:
+        use_mmap_weights(model, model_path, verbose=verbose)
+    except Exception as e:
+        if verbose:
+            print(f"⚠️  Memory-mapping weights failed, keeping private copy: {e}")
+    return model
+
+
+def use_mmap_weights(model, model_path: Path, verbose: bool = True) -> int:
+    """
+    Back a loaded SentenceTransformer's transformer weights with the file mapping.
+
+    Used for sentence-transformers < 2.3: the weights have already been read
+    into private memory, which is released once the parameters point at the
+    mapping.
+
+    Returns:
+        Number of tensors attached (0 if disabled or not applicable)
+    """
+    if not is_mmap_enabled():
+        return 0
+
+    weights = Path(model_path) / SAFETENSORS_FILENAME
+    if not weights.exists():
+        return 0
+
+    transformer = getattr(model[0], 'auto_model', None) if hasattr(model, '__getitem__') else None
+    if transformer is None:
+        return 0
+
+    attached = attach_mmap_weights(transformer, weights)
+    if verbose:
+        print(f"🗺️  Memory-mapped {attached} weight tensors from {weights.name}")
+    return attached
@@ -2,16 +2,42 @@
 Batch calculation of semantic distances for all 21 sentences.
 Generates visualizations and statistical analysis.
 """
+import contextlib
+import hashlib
+import itertools
+import json
 import sys
+import time
 from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.colors import LogNorm
 
-# Add embeddings skill to path
+# Add project root to path
 base_dir = Path(__file__).parent.parent  # Go up to project root
-sys.path.append(str(base_dir / '.claude' / 'skills' / 'embeddings'))
-
-from embedding_utils import compute_embedding, cosine_distance
+sys.path.insert(0, str(base_dir))
+
+from distance_kernels import paired_cosine_distances
+from drift_stats import (
+    DEFAULT_RESAMPLES,
+    factorize,
+    group_bootstrap_ci,
+    group_stats,
+    pairwise_permutation_tests,
+    result_distances,
+    results_column
+)
+from embedding_batching import compute_embeddings_batch, deduplicate
+from embedding_cache import cached_encode, get_embedding_cache, get_embedding_memo
+from pair_sources import DEFAULT_CHUNK_PAIRS, FORMATS, iter_pair_chunks, iter_pairs
+from result_store import ResultStore, ResultStoreWriter, export_table
+from streaming_stats import StreamingGroupStats
+
+# Above this many valid points, plots are drawn from binned aggregates
+LARGE_N_POINTS = 5000
+DISTANCE_BINS = 100
+PREVIEW_DPI = 72
+PUBLICATION_DPI = 300
 
 # All 21 sentence pairs (Original, Final English Translation)
 sentences = [
@@ -172,116 +198,526 @@ sentences = [
 ]
 
 
-def calculate_all_distances():
-    """Calculate distances for all sentence pairs."""
-    print("Calculating semantic distances for all 21 sentences...")
+def calculate_all_distances(workers=None, normalize=False, pairs=None,
+                            chunk_size=DEFAULT_CHUNK_PAIRS, store=None, stats=None,
+                            keep_results=True):
+    """
+    Calculate distances for all sentence pairs.
+
+    Pairs are processed in chunks of chunk_size, each in three stages: the
+    chunk's distinct sentences are gathered, encoded in one batched call,
+    and all its pairs are scored with one vectorized cosine distance. Only
+    one chunk of texts and embeddings is in memory at a time. A sentence
+    that cannot be encoded gives its pairs distance None. Embeddings are
+    served from the persistent embedding cache when present (see
+    embedding_cache.py), so a warm run does no model forward passes. New
+    embeddings are flushed to the cache after every chunk, so they do not
+    pile up in memory and the cache's size cap applies during the run.
+
+    With a store, every chunk is committed together with a checkpoint (the
+    run settings and a digest of each finished chunk's input). A store
+    reopened with overwrite=False resumes the run: finished chunks are read
+    again only to verify their digests, and their distances come from the
+    store, so the output matches an uninterrupted run.
+
+    Args:
+        workers: Number of worker processes sharing one loaded model, or
+            'auto' to size the pool from the available CPUs
+            (see parallel_encoding). None or 1 runs in-process.
+        normalize: Also treat sentences that differ only in whitespace or
+            Unicode composition as duplicates
+        pairs: Iterable of pair dicts, e.g. from pair_sources.iter_pairs()
+            (defaults to the built-in 21 sentences)
+        chunk_size: Pairs encoded per batch
+        store: Optional result_store.ResultStoreWriter; each chunk's rows
+            and both embeddings are appended to it
+        stats: Optional streaming_stats.StreamingGroupStats updated with
+            each chunk's distances by typo rate
+        keep_results: Return the result dicts; False keeps memory constant
+            for unbounded inputs (use stats and/or store instead)
+
+    Returns:
+        Result dicts with a distance each (empty if keep_results is False)
+
+    Raises:
+        ValueError: If resuming and the input, chunk size, normalization or
+            model differ from the checkpointed run
+    """
+    verbose = pairs is None
+    if pairs is None:
+        pairs = sentences
+        print("Calculating semantic distances for all 21 sentences...")
+    else:
+        print("Calculating semantic distances for streamed sentence pairs...")
     print("=" * 80)
 
+    cache = get_embedding_cache()
+    timings = dict.fromkeys(('gather', 'encode', 'score'), 0.0)
+    num_texts = num_unique = num_pairs = 0
     results = []
+    checkpoint, done_digests = _start_checkpoint(store, chunk_size, normalize)
+    done_distances = ResultStore(store.directory).distance if done_digests else None
+
+    with contextlib.ExitStack() as stack:
+        pool = None
+        if workers is not None and workers != 1:
+            largest_chunk = min(chunk_size, len(pairs)) if hasattr(pairs, '__len__') else chunk_size
+            pool = stack.enter_context(_open_pool(workers, largest_chunk))
+
+        chunks = iter_pair_chunks(pairs, chunk_size)
+        for chunk_number in itertools.count():
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            digest = _chunk_digest(chunk)
+            if chunk_number < len(done_digests):
+                _restore_chunk(chunk, chunk_number, digest, done_digests, done_distances, num_pairs)
+                num_pairs += len(chunk)
+                _collect_chunk(chunk, results, stats, keep_results)
+                timings['gather'] += time.perf_counter() - start
+                continue
+            unique, pair_index = _deduplicate_pairs(chunk, normalize)
+            num_texts += 2 * len(chunk)
+            num_unique += len(unique)
+            timings['gather'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            if pool is not None:
+                embeddings = _encode_unique_prefork(unique, pool, cache)
+            else:
+                embeddings = _encode_unique(unique, cache)
+            if cache is not None:
+                # Persist per chunk so staged vectors stay bounded and the size cap applies
+                cache.flush()
+            timings['encode'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            distances = _score_pairs(embeddings, pair_index)
+            timings['score'] += time.perf_counter() - start
+
+            for sent_pair, distance in zip(chunk, distances):
+                if verbose:
+                    print(f"\nSentence {sent_pair['id']} ({sent_pair['typo_rate']}% typo rate), "
+                          f"Domain: {sent_pair['domain']}")
+                    if distance is None:
+                        print("ERROR: distance calculation failed")
+                    else:
+                        print(f"Distance: {distance:.6f}")
+                sent_pair['distance'] = distance
+            num_pairs += len(chunk)
+            _collect_chunk(chunk, results, stats, keep_results)
+            if store is not None:
+                # The checkpoint only advances once the chunk's rows are committed
+                committed = dict(checkpoint, chunks=checkpoint['chunks'] + [digest])
+                store.append(chunk, [embeddings[i] for i in pair_index[:, 0]],
+                             [embeddings[i] for i in pair_index[:, 1]], checkpoint=committed)
+                checkpoint = committed
+            if not verbose:
+                print(f"   {num_pairs:,} pairs scored")
+
+        if chunk_number < len(done_digests):
+            raise ValueError(f"Cannot resume: the input has {chunk_number} chunks but the checkpoint "
+                             f"has {len(done_digests)}. Rerun without --resume.")
+
+    print(f"\nDeduplicated {num_texts} sentences to {num_unique} unique "
+          f"({num_texts - num_unique} duplicates skipped)")
+    _report_cache(cache)
+    _report_timings(timings, num_pairs)
+    print("\n" + "=" * 80)
+    print("Calculation complete!")
 
-    for i, sent_pair in enumerate(sentences, 1):
-        print(f"\nProcessing Sentence {sent_pair['id']} ({sent_pair['typo_rate']}% typo rate)...")
-        print(f"Domain: {sent_pair['domain']}")
+    return results
 
-        try:
-            emb1 = compute_embedding(sent_pair['original'])
-            emb2 = compute_embedding(sent_pair['final'])
-            distance = cosine_distance(emb1, emb2)
 
-            sent_pair['distance'] = distance
-            results.append(sent_pair)
+def _chunk_digest(chunk):
+    """SHA-256 of a chunk's input fields, to detect changed input on resume."""
+    digest = hashlib.sha256()
+    for pair in chunk:
+        fields = [pair.get('id'), pair.get('typo_rate'), pair.get('domain'), pair['original'], pair['final']]
+        digest.update(json.dumps(fields, ensure_ascii=False).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
 
-            print(f"Distance: {distance:.6f}")
 
-        except Exception as e:
-            print(f"ERROR: {e}")
-            sent_pair['distance'] = None
-            results.append(sent_pair)
+def _model_fingerprint():
+    from embedding_cache import model_fingerprint
+    from model_loader import get_default_model_path
+    return model_fingerprint(get_default_model_path())
 
-    print("\n" + "=" * 80)
-    print("Calculation complete!")
 
-    return results
+def _start_checkpoint(store, chunk_size, normalize):
+    """
+    Checkpoint record for this run, and the chunk digests already committed.
+
+    A store opened for appending must come from a run with the same
+    settings and model; otherwise its rows could not be reused.
+    """
+    if store is None:
+        return None, []
+
+    settings = {'chunk_size': chunk_size, 'normalize': normalize, 'model': _model_fingerprint()}
+    previous = store.checkpoint
+    if store.rows == 0 or not previous:
+        return dict(settings, chunks=[]), []
+
+    for key, value in settings.items():
+        if previous.get(key) != value:
+            raise ValueError(f"Cannot resume: {key} changed since the checkpoint "
+                             f"({previous.get(key)!r} -> {value!r}). Rerun without --resume.")
+    print(f"♻️  Resuming after {store.rows:,} committed pairs ({len(previous['chunks'])} chunks)")
+    return dict(settings, chunks=list(previous['chunks'])), previous['chunks']
+
+
+def _restore_chunk(chunk, chunk_number, digest, done_digests, done_distances, offset):
+    """Verify a committed chunk's input and take its distances from the store."""
+    if digest != done_digests[chunk_number]:
+        raise ValueError(f"Cannot resume: input chunk {chunk_number} changed since the checkpoint. "
+                         f"Rerun without --resume.")
+    for sent_pair, distance in zip(chunk, done_distances[offset:offset + len(chunk)]):
+        sent_pair['distance'] = None if np.isnan(distance) else float(distance)
+
+
+def _collect_chunk(chunk, results, stats, keep_results):
+    """Keep a scored chunk's result dicts and/or fold it into streaming statistics."""
+    if stats is not None:
+        stats.update(result_distances(chunk), results_column(chunk, 'typo_rate'))
+    if keep_results:
+        results.extend(chunk)
+
+
+def _deduplicate_pairs(pairs, normalize=False):
+    """Unique sentences across pairs, and each pair's (original, final) indices into them."""
+    texts = [t for s in pairs for t in (s['original'], s['final'])]
+    unique, inverse = deduplicate(texts, normalize=normalize)
+    return unique, inverse.reshape(-1, 2)
+
+
+def _open_pool(workers, chunk_size):
+    """Worker pool kept open across chunks; 'auto' is sized for one chunk of pairs."""
+    from parallel_encoding import PreforkPool, plan_workers
 
+    if workers == 'auto':
+        num_workers, threads_per_worker = plan_workers(2 * chunk_size)
+    else:
+        num_workers, threads_per_worker = int(workers), None
+    return PreforkPool(num_workers=num_workers, threads_per_worker=threads_per_worker)
 
-def generate_statistics(results):
-    """Generate statistical summaries."""
+
+def _encode_unique(unique, cache=None):
+    """
+    Embed unique sentences in one batched call, through the memo and cache.
+
+    If the batch fails, sentences are retried one at a time so a bad input
+    only gets None for itself.
+    """
+    memo = get_embedding_memo()
+    try:
+        return cached_encode(unique, compute_embeddings_batch, cache, flush=False, memo=memo)
+    except Exception as e:
+        print(f"⚠️  Batch encoding failed ({e}); retrying one sentence at a time")
+
+    embeddings = []
+    for text in unique:
+        try:
+            embeddings.append(cached_encode([text], compute_embeddings_batch, cache,
+                                            flush=False, memo=memo)[0])
+        except Exception as e:
+            print(f"ERROR: could not encode {text[:40]!r}: {e}")
+            embeddings.append(None)
+    return embeddings
+
+
+def _encode_unique_prefork(unique, pool, cache=None):
+    """Embed uncached sentences with an open pre-fork pool; failed sentences get None."""
+    from parallel_encoding import embeddings_for_shard
+
+    # Encode only uncached texts in the workers; the parent owns the cache
+    embeddings = cache.get_many(unique) if cache is not None else [None] * len(unique)
+    missing = [t for t, e in zip(unique, embeddings) if e is None]
+    if missing:
+        computed = dict(zip(missing, pool.map_shards(embeddings_for_shard, missing)))
+        embeddings = [computed.get(t) if e is None else e for t, e in zip(unique, embeddings)]
+        if cache is not None:
+            ok = [t for t in missing if computed[t] is not None]
+            cache.put_many(ok, [computed[t] for t in ok])
+    return embeddings
+
+
+def _score_pairs(embeddings, pair_index):
+    """Cosine distance for every pair in one vectorized call; None where an embedding is missing."""
+    distances = [None] * len(pair_index)
+    ok = [i for i, (i1, i2) in enumerate(pair_index)
+          if embeddings[i1] is not None and embeddings[i2] is not None]
+    if ok:
+        scores = paired_cosine_distances(
+            np.stack([embeddings[pair_index[i, 0]] for i in ok]),
+            np.stack([embeddings[pair_index[i, 1]] for i in ok])
+        )
+        for i, score in zip(ok, scores):
+            distances[i] = float(score)
+    return distances
+
+
+def _report_cache(cache):
+    """Persist any remaining embeddings and print cache hit/miss counters."""
+    if cache is None:
+        return
+    cache.flush()
+    stats = cache.stats()
+    print(f"\nEmbedding cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['entries']} entries)")
+
+
+def _report_timings(timings, num_pairs):
+    """Print per-stage wall times and overall throughput."""
+    total = sum(timings.values())
+    stages = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in timings.items())
+    rate = num_pairs / total if total > 0 else float('inf')
+    print(f"\nTimings: {stages}; {num_pairs} pairs in {total:.3f}s ({rate:,.1f} pairs/s)")
+
+
+def generate_statistics(results, by='typo_rate', n_resamples=0, seed=None):
+    """
+    Generate statistical summaries.
+
+    Groups with a single vectorized pass (see drift_stats.group_stats).
+
+    Args:
+        results: Result dicts with a distance (None for failed pairs)
+        by: Result field to group by (typo_rate, domain, ...)
+        n_resamples: Bootstrap resamples for 95% CIs of each group's mean,
+            and permutations for tests against the previous group (0 = skip)
+        seed: Seed for the resampling
+
+    Returns:
+        {key: {'avg', 'std', 'n', 'distances', 'min', 'max', 'median', 'p25', 'p75'}}
+        with keys in sorted order. With n_resamples, each group also has
+        'ci_low', 'ci_high' and 'p_vs_previous' (None for the first group).
+    """
+    distances = result_distances(results)
+    all_distances = distances[~np.isnan(distances)]
+    _print_overall(len(all_distances), np.mean(all_distances), np.std(all_distances),
+                   np.min(all_distances), np.max(all_distances), np.median(all_distances))
+
+    suffix = _print_group_header(by)
+    group_stats_by_key = {}
+    for key, stats in group_stats(distances, results_column(results, by)).items():
+        group_stats_by_key[key] = dict(_summary_row(stats), distances=stats['values'])
+        print(f"  {key}{suffix}: {stats['mean']:.6f} (±{stats['std']:.6f}, n={stats['n']})")
+
+    if n_resamples and group_stats_by_key:
+        _add_uncertainty(group_stats_by_key, distances, results_column(results, by), n_resamples,
+                         seed, suffix)
+
+    return group_stats_by_key
+
+
+def generate_streaming_statistics(stats, by='typo_rate'):
+    """
+    Generate statistical summaries from streaming statistics.
+
+    The same summary as generate_statistics(), for runs that did not keep
+    their distances (see calculate_all_distances(keep_results=False)).
+
+    Args:
+        stats: streaming_stats.StreamingGroupStats
+        by: Name of the field stats was grouped by, for the printed labels
+
+    Returns:
+        {key: {'avg', 'std', 'n', 'min', 'max', 'median', 'p25', 'p75'}} with
+        keys in sorted order. There is no 'distances' entry, and the median
+        and quartiles come from the quantile sketch (within 0.5%).
+    """
+    overall = streaming_overall_summary(stats)
+    _print_overall(overall['n'], overall['mean'], overall['std'], overall['min'], overall['max'],
+                   overall['median'])
+
+    suffix = _print_group_header(by)
+    group_stats_by_key = {}
+    for key, summary in stats.summary().items():
+        group_stats_by_key[key] = _summary_row(summary)
+        print(f"  {key}{suffix}: {summary['mean']:.6f} (±{summary['std']:.6f}, n={summary['n']})")
+    return group_stats_by_key
+
+
+def streaming_overall_summary(stats):
+    """
+    Overall summary of streaming statistics, for save_detailed_results(overall=...).
+
+    An empty stream (no input, or every pair failed) gets NaN statistics
+    and n=0 instead of RunningStats.summary()'s ValueError.
+    """
+    if stats.overall.n:
+        return stats.overall.summary()
+    return {**dict.fromkeys(('mean', 'std', 'min', 'max', 'median'), float('nan')), 'n': 0}
+
+
+def _summary_row(stats):
+    """One group of drift_stats/streaming_stats output in generate_statistics() form."""
+    return {
+        'avg': stats['mean'],
+        'std': stats['std'],
+        'n': stats['n'],
+        'min': stats['min'],
+        'max': stats['max'],
+        'median': stats['median'],
+        'p25': stats['p25'],
+        'p75': stats['p75'],
+    }
+
+
+def _print_overall(n, mean, std, minimum, maximum, median):
     print("\n" + "=" * 80)
     print("STATISTICAL SUMMARY")
     print("=" * 80)
+    print(f"\nOverall Statistics (n={n}):")
+    print(f"  Mean Distance: {mean:.6f}")
+    print(f"  Std Dev: {std:.6f}")
+    print(f"  Min Distance: {minimum:.6f}")
+    print(f"  Max Distance: {maximum:.6f}")
+    print(f"  Median: {median:.6f}")
 
-    # Filter out any failed calculations
-    valid_results = [r for r in results if r['distance'] is not None]
-
-    # Overall statistics
-    all_distances = [r['distance'] for r in valid_results]
-    print(f"\nOverall Statistics (n={len(all_distances)}):")
-    print(f"  Mean Distance: {np.mean(all_distances):.6f}")
-    print(f"  Std Dev: {np.std(all_distances):.6f}")
-    print(f"  Min Distance: {np.min(all_distances):.6f}")
-    print(f"  Max Distance: {np.max(all_distances):.6f}")
-    print(f"  Median: {np.median(all_distances):.6f}")
 
-    # By typo rate
+def _print_group_header(by):
+    """Print the per-group heading and return the key suffix ('%' for typo rates)."""
+    label = "Typo Rate" if by == 'typo_rate' else by.replace('_', ' ').title()
     print("\n" + "-" * 80)
-    print("Average Distance by Typo Rate:")
+    print(f"Average Distance by {label}:")
     print("-" * 80)
-
-    typo_rates = [20, 25, 30, 35, 40, 45, 50]
-    typo_rate_stats = {}
-
-    for rate in typo_rates:
-        rate_results = [r for r in valid_results if r['typo_rate'] == rate]
-        if rate_results:
-            distances = [r['distance'] for r in rate_results]
-            avg_dist = np.mean(distances)
-            std_dist = np.std(distances)
-            typo_rate_stats[rate] = {
-                'avg': avg_dist,
-                'std': std_dist,
-                'n': len(distances),
-                'distances': distances
-            }
-            print(f"  {rate}%: {avg_dist:.6f} (±{std_dist:.6f}, n={len(distances)})")
-
-    return typo_rate_stats
+    return "%" if by == 'typo_rate' else ""
+
+
+def _add_uncertainty(group_stats_by_key, distances, keys, n_resamples, seed, suffix=""):
+    """Add bootstrap CIs and permutation p-values against the previous group."""
+    rng = np.random.default_rng(seed)
+    intervals = group_bootstrap_ci(distances, keys, n_resamples=n_resamples, seed=rng)
+    tests = pairwise_permutation_tests(distances, keys, n_permutations=n_resamples, seed=rng)
+    previous = {key_b: test['p_value'] for (_, key_b), test in tests.items()}
+
+    print(f"\n95% bootstrap CIs of the mean ({n_resamples:,} resamples), "
+          f"permutation p vs previous group:")
+    for key, stats in group_stats_by_key.items():
+        stats['ci_low'] = intervals[key]['low']
+        stats['ci_high'] = intervals[key]['high']
+        stats['p_vs_previous'] = previous.get(key)
+        p_text = "" if stats['p_vs_previous'] is None else f", p={stats['p_vs_previous']:.4f}"
+        print(f"  {key}{suffix}: [{stats['ci_low']:.6f}, {stats['ci_high']:.6f}]{p_text}")
+
+
+def plot_aggregate(results=None, stream_stats=None, bins=DISTANCE_BINS):
+    """
+    Per-typo-rate distance histograms on one shared grid, for plotting large runs.
+
+    Binning is one vectorized pass over the distances (or over the quantile
+    sketch buckets of a streaming run), so everything drawn from it has a
+    fixed size however many pairs there are.
+
+    Args:
+        results: Result dicts with a distance (None for failed pairs)
+        stream_stats: streaming_stats.StreamingGroupStats, used when results is None
+        bins: Distance bins
+
+    Returns:
+        Dict with 'rates' (sorted), 'edges' (bins + 1,), 'counts'
+        (rates, bins), and overall 'n', 'mean' and 'median'
+    """
+    if results is not None:
+        distances = result_distances(results)
+        all_distances = distances[~np.isnan(distances)]
+        codes, rates = factorize(results_column(results, 'typo_rate'))
+        valid = (codes >= 0) & ~np.isnan(distances)
+        codes, distances = codes[valid], distances[valid]
+        low, high = (all_distances.min(), all_distances.max()) if len(all_distances) else (0.0, 1.0)
+        overall = {'n': len(all_distances), 'mean': float(np.mean(all_distances)) if len(all_distances) else np.nan,
+                   'median': float(np.median(all_distances)) if len(all_distances) else np.nan}
+    else:
+        overall = streaming_overall_summary(stream_stats)
+        low, high = (overall['min'], overall['max']) if overall['n'] else (0.0, 1.0)
+        rates = list(stream_stats.summary(percentiles=()))
+
+    if high <= low:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+
+    if results is not None:
+        bin_index = np.clip(((distances - low) / (high - low) * bins).astype(np.intp), 0, bins - 1)
+        counts = np.bincount(codes * bins + bin_index, minlength=len(rates) * bins).reshape(len(rates), bins)
+    else:
+        counts = np.array([stream_stats.groups[rate].sketch.histogram(edges) for rate in rates],
+                          dtype=np.int64).reshape(len(rates), bins)
+
+    present = counts.sum(axis=1) > 0
+    return {
+        'rates': [rate for rate, keep in zip(rates, present) if keep],
+        'edges': edges,
+        'counts': counts[present],
+        'n': overall['n'],
+        'mean': overall['mean'],
+        'median': overall['median'],
+    }
 
 
-def create_visualizations(results, typo_rate_stats):
-    """Create matplotlib visualizations."""
+def create_visualizations(results, typo_rate_stats, aggregate=None, preview=None, stream_stats=None):
+    """
+    Create matplotlib visualizations.
+
+    Up to LARGE_N_POINTS valid results are drawn point by point. Larger runs
+    are drawn from plot_aggregate() instead: a 2D histogram of distance by
+    typo rate replaces the scatter, the distance histogram is drawn from
+    precomputed counts, and each rate gets a violin from its binned density
+    and a box from its precomputed quartiles. Rendering time then stays
+    roughly constant as N grows.
+
+    Args:
+        results: Result dicts, or None for a streaming run (see stream_stats)
+        typo_rate_stats: Output of generate_statistics() or
+            generate_streaming_statistics()
+        aggregate: True or False to force or disable the aggregated path
+            (None: aggregate above LARGE_N_POINTS points or without results)
+        preview: Also save a fast PREVIEW_DPI copy next to the
+            PUBLICATION_DPI render (None: only for the aggregated path)
+        stream_stats: streaming_stats.StreamingGroupStats, used when
+            results is None
+
+    Returns:
+        Path of the publication render
+    """
     print("\n" + "=" * 80)
     print("GENERATING VISUALIZATIONS")
     print("=" * 80)
 
-    # Filter valid results
-    valid_results = [r for r in results if r['distance'] is not None]
+    if aggregate is None:
+        aggregate = results is None or sum(r['distance'] is not None for r in results) > LARGE_N_POINTS
+    if preview is None:
+        preview = aggregate
+    avg_rates = sorted(typo_rate_stats.keys())
+    avg_distances = [typo_rate_stats[rate]['avg'] for rate in avg_rates]
 
     # Create figure with multiple subplots
     fig = plt.figure(figsize=(16, 12))
-
-    # 1. Main plot: Distance vs Typo Rate with all points
     ax1 = plt.subplot(2, 2, 1)
-    typo_rates = [r['typo_rate'] for r in valid_results]
-    distances = [r['distance'] for r in valid_results]
+    ax2 = plt.subplot(2, 2, 2)
+    ax3 = plt.subplot(2, 2, 3)
+    ax4 = plt.subplot(2, 2, 4)
 
-    ax1.scatter(typo_rates, distances, alpha=0.6, s=100, c='steelblue', edgecolors='navy', linewidths=1.5)
+    if aggregate:
+        start = time.perf_counter()
+        summary = plot_aggregate(results, stream_stats)
+        print(f"Aggregated {summary['n']:,} distances in {time.perf_counter() - start:.2f}s")
+        _draw_aggregated_panels(fig, ax1, ax3, ax4, summary, typo_rate_stats)
+    else:
+        _draw_point_panels(ax1, ax3, ax4, results, typo_rate_stats)
 
-    # Add trend line
-    avg_rates = sorted(typo_rate_stats.keys())
-    avg_distances = [typo_rate_stats[rate]['avg'] for rate in avg_rates]
+    # 1. Trend line over the points or 2D histogram
     ax1.plot(avg_rates, avg_distances, 'r-', linewidth=2.5, marker='o', markersize=8, label='Average')
-
     ax1.set_xlabel('Typo Rate (%)', fontsize=12, fontweight='bold')
     ax1.set_ylabel('Cosine Distance', fontsize=12, fontweight='bold')
-    ax1.set_title('Semantic Drift vs. Typo Rate\n(All 21 Sentences)', fontsize=14, fontweight='bold')
     ax1.grid(True, alpha=0.3, linestyle='--')
     ax1.legend(fontsize=10)
     ax1.set_xlim(15, 55)
 
     # 2. Average distance by typo rate with error bars
-    ax2 = plt.subplot(2, 2, 2)
-    avg_rates = sorted(typo_rate_stats.keys())
-    avg_distances = [typo_rate_stats[rate]['avg'] for rate in avg_rates]
     std_distances = [typo_rate_stats[rate]['std'] for rate in avg_rates]
 
     ax2.errorbar(avg_rates, avg_distances, yerr=std_distances,
@@ -299,11 +735,6 @@ def create_visualizations(results, typo_rate_stats):
     ax2.set_xlim(15, 55)
 
     # 3. Distribution histogram
-    ax3 = plt.subplot(2, 2, 3)
-    ax3.hist(distances, bins=15, color='teal', alpha=0.7, edgecolor='black', linewidth=1.2)
-    ax3.axvline(np.mean(distances), color='red', linestyle='--', linewidth=2, label=f'Mean: {np.mean(distances):.4f}')
-    ax3.axvline(np.median(distances), color='orange', linestyle='--', linewidth=2, label=f'Median: {np.median(distances):.4f}')
-
     ax3.set_xlabel('Cosine Distance', fontsize=12, fontweight='bold')
     ax3.set_ylabel('Frequency', fontsize=12, fontweight='bold')
     ax3.set_title('Distribution of Semantic Distances\n(All Sentences)', fontsize=14, fontweight='bold')
@@ -311,45 +742,146 @@ def create_visualizations(results, typo_rate_stats):
     ax3.grid(True, alpha=0.3, axis='y', linestyle='--')
 
     # 4. Box plot by typo rate
-    ax4 = plt.subplot(2, 2, 4)
-    box_data = [typo_rate_stats[rate]['distances'] for rate in sorted(typo_rate_stats.keys())]
-    box_labels = [f"{rate}%" for rate in sorted(typo_rate_stats.keys())]
-
-    bp = ax4.boxplot(box_data, labels=box_labels, patch_artist=True,
-                     boxprops=dict(facecolor='lightblue', alpha=0.7),
-                     medianprops=dict(color='red', linewidth=2),
-                     whiskerprops=dict(linewidth=1.5),
-                     capprops=dict(linewidth=1.5))
-
+    ax4.set_xticks(range(1, len(avg_rates) + 1), [f"{rate}%" for rate in avg_rates])
     ax4.set_xlabel('Typo Rate', fontsize=12, fontweight='bold')
     ax4.set_ylabel('Cosine Distance', fontsize=12, fontweight='bold')
-    ax4.set_title('Distance Distribution by Typo Rate\n(Box Plot)', fontsize=14, fontweight='bold')
     ax4.grid(True, alpha=0.3, axis='y', linestyle='--')
 
     plt.tight_layout()
 
-    # Save figure
+    # Save figure: the preview first, so it is available while the full render runs
     output_path = base_dir / 'results' / 'semantic_drift_analysis.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    if preview:
+        preview_path = output_path.with_name(f"{output_path.stem}_preview.png")
+        start = time.perf_counter()
+        plt.savefig(preview_path, dpi=PREVIEW_DPI, bbox_inches='tight')
+        print(f"\nPreview saved to: {preview_path} ({time.perf_counter() - start:.2f}s)")
+    plt.savefig(output_path, dpi=PUBLICATION_DPI, bbox_inches='tight')
     print(f"\nVisualization saved to: {output_path}")
 
     return str(output_path)
 
 
-def save_detailed_results(results, typo_rate_stats):
-    """Save detailed numerical results to markdown."""
+def _draw_point_panels(ax1, ax3, ax4, results, typo_rate_stats):
+    """Scatter, histogram and box plot drawn from every result."""
+    valid_results = [r for r in results if r['distance'] is not None]
+    typo_rates = [r['typo_rate'] for r in valid_results]
+    distances = [r['distance'] for r in valid_results]
+
+    ax1.scatter(typo_rates, distances, alpha=0.6, s=100, c='steelblue', edgecolors='navy', linewidths=1.5)
+    ax1.set_title(f'Semantic Drift vs. Typo Rate\n(All {len(valid_results)} Sentences)',
+                  fontsize=14, fontweight='bold')
+
+    ax3.hist(distances, bins=15, color='teal', alpha=0.7, edgecolor='black', linewidth=1.2)
+    ax3.axvline(np.mean(distances), color='red', linestyle='--', linewidth=2, label=f'Mean: {np.mean(distances):.4f}')
+    ax3.axvline(np.median(distances), color='orange', linestyle='--', linewidth=2, label=f'Median: {np.median(distances):.4f}')
+
+    box_data = [typo_rate_stats[rate]['distances'] for rate in sorted(typo_rate_stats.keys())]
+    ax4.boxplot(box_data, patch_artist=True,
+                boxprops=dict(facecolor='lightblue', alpha=0.7),
+                medianprops=dict(color='red', linewidth=2),
+                whiskerprops=dict(linewidth=1.5),
+                capprops=dict(linewidth=1.5))
+    ax4.set_title('Distance Distribution by Typo Rate\n(Box Plot)', fontsize=14, fontweight='bold')
+
+
+def _draw_aggregated_panels(fig, ax1, ax3, ax4, summary, typo_rate_stats):
+    """2D histogram, precomputed histogram, and violins with quantile boxes."""
+    rates, edges, counts = summary['rates'], summary['edges'], summary['counts']
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    # 2D histogram: one column of distance bins per typo rate
+    positions = np.asarray(rates, dtype=np.float64)
+    half_width = (np.min(np.diff(positions)) if len(positions) > 1 else 5.0) * 0.4
+    for position, column in zip(positions, counts):
+        mesh = ax1.pcolormesh([position - half_width, position + half_width], edges,
+                              np.ma.masked_equal(column[:, None], 0), cmap='Blues',
+                              norm=LogNorm(vmin=1, vmax=max(1, counts.max())), shading='flat')
+    if len(positions):
+        fig.colorbar(mesh, ax=ax1, label='Pairs')
+    ax1.set_title(f"Semantic Drift vs. Typo Rate\n(All {summary['n']:,} Sentences, 2D Histogram)",
+                  fontsize=14, fontweight='bold')
+
+    ax3.stairs(counts.sum(axis=0), edges, fill=True, color='teal', alpha=0.7)
+    ax3.stairs(counts.sum(axis=0), edges, color='black', linewidth=1.2)
+    ax3.axvline(summary['mean'], color='red', linestyle='--', linewidth=2, label=f"Mean: {summary['mean']:.4f}")
+    ax3.axvline(summary['median'], color='orange', linestyle='--', linewidth=2,
+                label=f"Median: {summary['median']:.4f}")
+
+    # Violins from binned densities, boxes from quartiles; whiskers span min to max
+    slots = range(1, len(typo_rate_stats) + 1)
+    density = {rate: column for rate, column in zip(rates, counts)}
+    violins = [{'coords': centers, 'vals': density[rate], 'mean': stats['avg'], 'median': stats['median'],
+                'min': stats['min'], 'max': stats['max']}
+               for rate, stats in sorted(typo_rate_stats.items()) if rate in density]
+    violin_slots = [slot for slot, rate in zip(slots, sorted(typo_rate_stats)) if rate in density]
+    if violins:
+        parts = ax4.violin(violins, positions=violin_slots, widths=0.8,
+                           showmeans=False, showextrema=False, showmedians=False)
+        for body in parts['bodies']:
+            body.set_facecolor('lightblue')
+            body.set_alpha(0.5)
+    boxes = [{'med': stats['median'], 'q1': stats['p25'], 'q3': stats['p75'],
+              'whislo': stats['min'], 'whishi': stats['max'], 'fliers': []}
+             for _, stats in sorted(typo_rate_stats.items())]
+    if boxes:
+        ax4.bxp(boxes, positions=slots, widths=0.25, showfliers=False, patch_artist=True,
+                boxprops=dict(facecolor='steelblue', alpha=0.8),
+                medianprops=dict(color='red', linewidth=2))
+    ax4.set_title('Distance Distribution by Typo Rate\n(Violins and Quartiles)', fontsize=14, fontweight='bold')
+
+
+def load_results_from_store(store_dir):
+    """Read result rows back from a columnar result store (no model needed)."""
+    store = ResultStore(store_dir)
+    print(f"Loaded {len(store):,} results from {store_dir}")
+    return store.to_results()
+
+
+def stream_statistics_from_store(store_dir, stats, chunk_size=DEFAULT_CHUNK_PAIRS):
+    """Fold a result store's distances into streaming statistics, one chunk at a time."""
+    store = ResultStore(store_dir)
+    distances, typo_rates = store.distance, store.typo_rate
+    for start in range(0, len(store), chunk_size):
+        rates = typo_rates[start:start + chunk_size].tolist()
+        stats.update(distances[start:start + chunk_size],
+                     [None if np.isnan(r) else int(r) if r.is_integer() else r for r in rates])
+    print(f"Streamed {len(store):,} results from {store_dir}")
+    return stats
+
+
+def save_detailed_results(results, typo_rate_stats, overall=None):
+    """
+    Save detailed numerical results to markdown.
+
+    Args:
+        results: Result dicts, or None for a streaming run (the individual
+            distances table is then left out)
+        typo_rate_stats: Output of generate_statistics() or
+            generate_streaming_statistics()
+        overall: Overall summary dict (n, mean, median, std, min, max), e.g.
+            streaming_overall_summary(); computed from results
+            if None
+    """
     output_path = base_dir / 'results' / 'quantitative_analysis.md'
+    if overall is None:
+        all_distances = [r['distance'] for r in results if r['distance'] is not None]
+        overall = {'n': len(all_distances), 'mean': np.mean(all_distances), 'median': np.median(all_distances),
+                   'std': np.std(all_distances), 'min': np.min(all_distances), 'max': np.max(all_distances)}
 
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write("# Quantitative Analysis Results\n\n")
         f.write("## Individual Sentence Distances\n\n")
-        f.write("| ID | Typo% | Domain | Cosine Distance | Similarity % |\n")
-        f.write("|----|-------|--------|-----------------|-------------|\n")
+        if results is None:
+            f.write("Not kept in streaming mode; see the result store for per-pair distances.\n")
+        else:
+            f.write("| ID | Typo% | Domain | Cosine Distance | Similarity % |\n")
+            f.write("|----|-------|--------|-----------------|-------------|\n")
 
-        for r in results:
-            if r['distance'] is not None:
-                similarity = (1 - r['distance']) * 100
-                f.write(f"| {r['id']} | {r['typo_rate']}% | {r['domain']} | {r['distance']:.6f} | {similarity:.2f}% |\n")
+            for r in results:
+                if r['distance'] is not None:
+                    similarity = (1 - r['distance']) * 100
+                    f.write(f"| {r['id']} | {r['typo_rate']}% | {r['domain']} | {r['distance']:.6f} | {similarity:.2f}% |\n")
 
         f.write("\n## Summary Statistics by Typo Rate\n\n")
         f.write("| Typo Rate | Avg Distance | Std Dev | Avg Similarity | N |\n")
@@ -360,37 +892,110 @@ def save_detailed_results(results, typo_rate_stats):
             avg_sim = (1 - stats['avg']) * 100
             f.write(f"| {rate}% | {stats['avg']:.6f} | {stats['std']:.6f} | {avg_sim:.2f}% | {stats['n']} |\n")
 
-        all_distances = [r['distance'] for r in results if r['distance'] is not None]
         f.write("\n## Overall Statistics\n\n")
-        f.write(f"- **Total Sentences**: {len(all_distances)}\n")
-        f.write(f"- **Mean Distance**: {np.mean(all_distances):.6f}\n")
-        f.write(f"- **Median Distance**: {np.median(all_distances):.6f}\n")
-        f.write(f"- **Std Deviation**: {np.std(all_distances):.6f}\n")
-        f.write(f"- **Min Distance**: {np.min(all_distances):.6f}\n")
-        f.write(f"- **Max Distance**: {np.max(all_distances):.6f}\n")
-        f.write(f"- **Mean Similarity**: {(1-np.mean(all_distances))*100:.2f}%\n")
+        f.write(f"- **Total Sentences**: {overall['n']}\n")
+        f.write(f"- **Mean Distance**: {overall['mean']:.6f}\n")
+        f.write(f"- **Median Distance**: {overall['median']:.6f}\n")
+        f.write(f"- **Std Deviation**: {overall['std']:.6f}\n")
+        f.write(f"- **Min Distance**: {overall['min']:.6f}\n")
+        f.write(f"- **Max Distance**: {overall['max']:.6f}\n")
+        f.write(f"- **Mean Similarity**: {(1-overall['mean'])*100:.2f}%\n")
+
+        rates = sorted(typo_rate_stats.keys())
+        if rates and 'ci_low' in typo_rate_stats[rates[0]]:
+            f.write("\n## Uncertainty\n\n")
+            f.write("95% percentile bootstrap intervals of each rate's mean distance, and two-sided "
+                    "permutation p-values (difference of means) against the previous rate. "
+                    "p-values are not adjusted for multiple comparisons.\n\n")
+            f.write("| Typo Rate | Avg Distance | 95% CI | p vs Previous | N |\n")
+            f.write("|-----------|--------------|--------|---------------|---|\n")
+            for rate in rates:
+                stats = typo_rate_stats[rate]
+                p_value = '-' if stats['p_vs_previous'] is None else f"{stats['p_vs_previous']:.4f}"
+                f.write(f"| {rate}% | {stats['avg']:.6f} | [{stats['ci_low']:.6f}, {stats['ci_high']:.6f}] "
+                        f"| {p_value} | {stats['n']} |\n")
 
     print(f"\nDetailed results saved to: {output_path}")
     return str(output_path)
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Batch semantic distance analysis')
+    parser.add_argument('--workers', type=lambda v: v if v == 'auto' else int(v), default=None,
+                        help="Worker processes sharing one loaded model, or 'auto' "
+                             "(default: in-process)")
+    parser.add_argument('--normalize', action='store_true',
+                        help='Also merge sentences differing only in whitespace or Unicode form')
+    parser.add_argument('--input', type=Path, default=None,
+                        help='Stream pairs from a file or sentence_XX directory (typo rates '
+                             'for a directory come from its sentence_pairs_for_analysis.txt; '
+                             'default: the built-in 21 sentences)')
+    parser.add_argument('--format', choices=FORMATS, default=None,
+                        help='Input format (detected from --input if omitted)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_PAIRS,
+                        help=f'Pairs encoded per batch (default: {DEFAULT_CHUNK_PAIRS})')
+    parser.add_argument('--store', type=Path, default=base_dir / 'results' / 'distance_store',
+                        help='Columnar result store with embeddings (default: results/distance_store)')
+    parser.add_argument('--from-store', action='store_true',
+                        help='Skip encoding; rebuild statistics and plots from --store')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run from the checkpoint in --store')
+    parser.add_argument('--bootstrap', type=int, default=DEFAULT_RESAMPLES,
+                        help=f'Resamples for bootstrap CIs and permutation tests per typo rate '
+                             f'(default: {DEFAULT_RESAMPLES}; 0 disables)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for the bootstrap and permutation tests')
+    parser.add_argument('--export', type=Path, default=None,
+                        help='Also export the store as one .parquet (needs pyarrow) or .npz file')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Keep statistics incrementally instead of all results in memory '
+                             '(no bootstrap CIs or per-pair table; plots are aggregated)')
+    parser.add_argument('--preview', action='store_true',
+                        help=f'Also save a {PREVIEW_DPI} dpi preview plot (always done for '
+                             f'runs over {LARGE_N_POINTS:,} pairs)')
+    args = parser.parse_args()
+
     print("\n" + "=" * 80)
     print("MULTI-HOP TRANSLATION SEMANTIC DRIFT EXPERIMENT")
     print("Batch Quantitative Analysis")
     print("=" * 80)
 
-    # Calculate all distances
-    results = calculate_all_distances()
-
-    # Generate statistics
-    typo_rate_stats = generate_statistics(results)
-
-    # Create visualizations
-    viz_path = create_visualizations(results, typo_rate_stats)
-
-    # Save detailed results
-    results_path = save_detailed_results(results, typo_rate_stats)
+    # Calculate all distances, or reuse a previous run's store
+    stream_stats = StreamingGroupStats() if args.streaming else None
+    if args.from_store and args.streaming:
+        results = None
+        stream_statistics_from_store(args.store, stream_stats, args.chunk_size)
+    elif args.from_store:
+        results = load_results_from_store(args.store)
+    else:
+        pairs = iter_pairs(args.input, args.format) if args.input else None
+        with ResultStoreWriter(args.store, overwrite=not args.resume) as writer:
+            results = calculate_all_distances(workers=args.workers, normalize=args.normalize,
+                                              pairs=pairs, chunk_size=args.chunk_size, store=writer,
+                                              stats=stream_stats, keep_results=not args.streaming)
+        print(f"Result store saved to: {args.store}")
+        if args.streaming:
+            results = None
+    if args.export:
+        print(f"Exported results to: {export_table(ResultStore(args.store), args.export)}")
+
+    if args.streaming:
+        typo_rate_stats = generate_streaming_statistics(stream_stats)
+        viz_path = create_visualizations(None, typo_rate_stats, preview=args.preview or None,
+                                         stream_stats=stream_stats)
+        results_path = save_detailed_results(None, typo_rate_stats,
+                                             overall=streaming_overall_summary(stream_stats))
+    else:
+        # Generate statistics
+        typo_rate_stats = generate_statistics(results, n_resamples=args.bootstrap, seed=args.seed)
+
+        # Create visualizations
+        viz_path = create_visualizations(results, typo_rate_stats, preview=args.preview or None)
+
+        # Save detailed results
+        results_path = save_detailed_results(results, typo_rate_stats)
 
     print("\n" + "=" * 80)
     print("ANALYSIS COMPLETE!")
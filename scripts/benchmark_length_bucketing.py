@@ -0,0 +1,121 @@
+"""
+Benchmark encoding throughput on mixed-length corpora with fixed-size
+batches versus length-bucketed, token-budgeted batches.
+
+The corpus mixes the three kinds of input the project sees:
+- short chat lines (~6 words)
+- the experiment's technical sentences (~20-30 words, from data/experiment_raw_data)
+- long stress inputs ("This is a very long sentence. " * 50)
+
+For each strategy the benchmark reports sentences/second and padding
+efficiency (real tokens / padded tokens actually sent to the model).
+
+Usage:
+    python3 scripts/benchmark_length_bucketing.py
+    python3 scripts/benchmark_length_bucketing.py --size 4000 --budgets 4096 8192 16384 --output results/length_bucketing.json
+"""
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+SHORT = [
+    "hello world what a god dey",
+    "how far my guy",
+    "the cat sat on the mat",
+    "good morning to you all",
+]
+LONG = ["This is a very long sentence. " * 50]
+
+
+def build_corpus(size, seed=0, mix=(0.6, 0.3, 0.1)):
+    """Shuffle short, medium and long inputs in the given proportions."""
+    data_dir = base_dir / 'data' / 'experiment_raw_data'
+    medium = [p.read_text(encoding='utf-8').strip() for p in sorted(data_dir.glob('sentence_*.txt'))]
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        pool = rng.choices([SHORT, medium, LONG], weights=mix)[0]
+        # Vary the text so nothing can be deduplicated
+        corpus.append(f"{rng.choice(pool)} {rng.randrange(10 ** 6)}")
+    return corpus
+
+
+def fixed_batches(n, batch_size):
+    return [list(range(i, min(i + batch_size, n))) for i in range(0, n, batch_size)]
+
+
+def padding_efficiency(batches, lengths):
+    real = sum(lengths[i] for batch in batches for i in batch)
+    padded = sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+    return real / padded
+
+
+def time_batches(model, corpus, batches, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for batch in batches:
+            model.encode([corpus[i] for i in batch], batch_size=len(batch), convert_to_numpy=True)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    import argparse
+    from embedding_batching import make_length_buckets, token_lengths
+
+    parser = argparse.ArgumentParser(description='Benchmark length-bucketed batching')
+    parser.add_argument('--size', type=int, default=2000, help='Corpus size')
+    parser.add_argument('--batch-size', type=int, default=32, help='Fixed batch size baseline')
+    parser.add_argument('--budgets', type=int, nargs='+', default=[4096, 8192, 16384],
+                        help='Token budgets to try')
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch')
+    parser.add_argument('--repeats', type=int, default=2)
+    parser.add_argument('--output', type=Path, default=None, help='Also write results as JSON')
+    args = parser.parse_args()
+
+    from model_loader import load_model
+    model = load_model(verbose=False, fail_on_error=True, backend=args.backend)
+
+    corpus = build_corpus(args.size)
+    lengths = token_lengths(model, corpus)
+    model.encode(corpus[:8], convert_to_numpy=True)  # warm up
+
+    strategies = [(f"fixed batch={args.batch_size}", fixed_batches(len(corpus), args.batch_size))]
+    for budget in args.budgets:
+        strategies.append((f"bucketed tokens={budget}", make_length_buckets(lengths, budget)))
+
+    rows = []
+    for name, batches in strategies:
+        print(f"Running {name}...")
+        rows.append({
+            'strategy': name,
+            'batches': len(batches),
+            'padding_efficiency': padding_efficiency(batches, lengths),
+            'sentences_per_second': time_batches(model, corpus, batches, args.repeats),
+        })
+
+    print("\n" + "=" * 80)
+    print(f"LENGTH BUCKETING BENCHMARK ({args.size} mixed-length inputs, {args.backend})")
+    print("=" * 80)
+    print(f"{'Strategy':<26} {'Batches':>8} {'Padding eff.':>13} {'Sentences/s':>12}")
+    print("-" * 80)
+    for row in rows:
+        print(f"{row['strategy']:<26} {row['batches']:>8} {row['padding_efficiency']:>12.1%} "
+              f"{row['sentences_per_second']:>12.1f}")
+    print("=" * 80)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark cold-load time and per-process memory with and without
+memory-mapped safetensors weights.
+
+For each worker count (default 1, 4, 16) and each loading mode, N fresh
+processes load the model at the same time, encode one sentence, and report:
+- Cold load time (load_model call, including imports)
+- RSS: resident memory, counts shared pages in every process
+- PSS: proportional set size, divides shared pages between processes
+
+Total PSS across workers is the real host memory cost. With mmap, weight
+pages are shared, so total PSS grows much more slowly than N x RSS.
+
+Usage:
+    python3 scripts/benchmark_model_memory.py
+    python3 scripts/benchmark_model_memory.py --workers 1 4 16 --output results/model_memory.json
+
+Linux only (reads /proc/self/smaps_rollup).
+"""
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+
+def read_memory_kb():
+    """Return (rss_kb, pss_kb) for the current process."""
+    rss_kb = pss_kb = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Rss:'):
+                rss_kb = int(line.split()[1])
+            elif line.startswith('Pss:'):
+                pss_kb = int(line.split()[1])
+    return rss_kb, pss_kb
+
+
+def _worker(mmap_enabled, ready, release, results):
+    os.environ['MODEL_MMAP_WEIGHTS'] = '1' if mmap_enabled else '0'
+
+    start = time.perf_counter()
+    from model_loader import load_model
+    model = load_model(verbose=False, fail_on_error=False)
+    load_time = time.perf_counter() - start
+
+    if model is not None:
+        model.encode("Warm up the model")
+
+    # Measure only once every worker holds its model, so PSS reflects sharing
+    ready.wait()
+    rss_kb, pss_kb = read_memory_kb()
+    results.put({'load_time_s': load_time, 'rss_mb': rss_kb / 1024, 'pss_mb': pss_kb / 1024,
+                 'loaded': model is not None})
+    release.wait()
+
+
+def run_scenario(num_workers, mmap_enabled):
+    """Start num_workers processes together and collect their measurements."""
+    ctx = mp.get_context('spawn')
+    ready = ctx.Barrier(num_workers)
+    release = ctx.Barrier(num_workers + 1)
+    results = ctx.Queue()
+
+    workers = [ctx.Process(target=_worker, args=(mmap_enabled, ready, release, results))
+               for _ in range(num_workers)]
+    for w in workers:
+        w.start()
+
+    samples = [results.get(timeout=600) for _ in range(num_workers)]
+    release.wait()
+    for w in workers:
+        w.join()
+
+    return {
+        'workers': num_workers,
+        'mmap': mmap_enabled,
+        'loaded': all(s['loaded'] for s in samples),
+        'mean_load_time_s': sum(s['load_time_s'] for s in samples) / num_workers,
+        'mean_rss_mb': sum(s['rss_mb'] for s in samples) / num_workers,
+        'mean_pss_mb': sum(s['pss_mb'] for s in samples) / num_workers,
+        'total_pss_mb': sum(s['pss_mb'] for s in samples),
+    }
+
+
+def print_report(rows):
+    print("\n" + "=" * 80)
+    print("MODEL MEMORY BENCHMARK")
+    print("=" * 80)
+    print(f"{'Workers':>7} {'Mode':>8} {'Load (s)':>9} {'RSS/proc':>10} {'PSS/proc':>10} {'Total PSS':>10}")
+    print("-" * 80)
+    for row in rows:
+        mode = 'mmap' if row['mmap'] else 'private'
+        print(f"{row['workers']:>7} {mode:>8} {row['mean_load_time_s']:>9.2f} "
+              f"{row['mean_rss_mb']:>8.0f}MB {row['mean_pss_mb']:>8.0f}MB {row['total_pss_mb']:>8.0f}MB")
+    print("=" * 80)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark model load time and memory per worker')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--output', type=Path, default=None, help='Also write results as JSON')
+    args = parser.parse_args()
+
+    if not Path('/proc/self/smaps_rollup').exists():
+        print("This benchmark needs /proc/self/smaps_rollup (Linux 4.14+)")
+        sys.exit(1)
+
+    rows = []
+    for num_workers in args.workers:
+        for mmap_enabled in (False, True):
+            print(f"Running {num_workers} worker(s), mmap={'on' if mmap_enabled else 'off'}...")
+            rows.append(run_scenario(num_workers, mmap_enabled))
+
+    print_report(rows)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark multi-process encoding against the single-process path.
+
+For each worker count the benchmark encodes the same mixed-length corpus
+with parallel_encoding.compute_embeddings and with one process using every
+core as torch threads, and reports texts/second and the speedup.
+
+Each layout runs in a fresh interpreter: the single-process run starts the
+parent's OpenMP thread pool, after which forking is unsafe.
+
+Usage:
+    python3 scripts/benchmark_parallel_encoding.py
+    python3 scripts/benchmark_parallel_encoding.py --size 20000 --workers auto 8 16 32 --output results/parallel_encoding.json
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+_MEASURE = """
+import json, sys
+sys.path.insert(0, {base_dir!r})
+sys.path.insert(0, {scripts_dir!r})
+from benchmark_length_bucketing import build_corpus
+from model_loader import load_model
+from parallel_encoding import measure_speedup
+model = load_model(verbose=False, fail_on_error=True, backend={backend!r})
+workers = {workers!r}
+result = measure_speedup(build_corpus({size}), num_workers=workers if workers == 'auto' else int(workers),
+                         model=model)
+print(json.dumps(result))
+"""
+
+
+def run_layout(workers, size, backend):
+    """Measure one worker count in a fresh interpreter."""
+    code = _MEASURE.format(base_dir=str(base_dir), scripts_dir=str(base_dir / 'scripts'),
+                           backend=backend, workers=workers, size=size)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark multi-process encoding')
+    parser.add_argument('--size', type=int, default=4000, help='Corpus size')
+    parser.add_argument('--workers', nargs='+', default=['auto'],
+                        help="Worker counts to try ('auto' sizes the pool automatically)")
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch')
+    parser.add_argument('--output', type=Path, default=None, help='Also write results as JSON')
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        print(f"Running workers={workers}...")
+        rows.append(run_layout(workers, args.size, args.backend))
+
+    print("\n" + "=" * 80)
+    print(f"PARALLEL ENCODING BENCHMARK ({args.size} mixed-length inputs, {args.backend}, "
+          f"{rows[0]['cpus']} CPUs)")
+    print("=" * 80)
+    print(f"{'Workers':>8} {'Threads/worker':>15} {'Single texts/s':>15} {'Pool texts/s':>13} {'Speedup':>8}")
+    print("-" * 80)
+    for row in rows:
+        print(f"{row['num_workers']:>8} {row['threads_per_worker']:>15} "
+              f"{row['single_process_texts_per_second']:>15.1f} "
+              f"{row['parallel_texts_per_second']:>13.1f} {row['speedup']:>7.2f}x")
+    print("=" * 80)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
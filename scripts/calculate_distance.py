@@ -6,6 +6,11 @@ Translation is handled by Claude agents.
 
 Uses fault-tolerant model loading to handle SSL errors and offline mode.
 If the model is not found, run: python3 setup.py
+
+If an embedding daemon is running (python3 embedding_daemon.py), the
+distance is computed by the warm daemon and torch is never imported here.
+Otherwise the model is loaded in-process. Set EMBEDDING_DAEMON=0 to skip
+the daemon.
 """
 import sys
 import os
@@ -26,8 +31,18 @@ if env_file.exists():
                 key, value = line.split('=', 1)
                 os.environ.setdefault(key.strip(), value.strip())
 
-# Import utilities (they will use fault-tolerant loader internally)
-from embedding_utils import compute_embedding, cosine_distance
+# Thin client for the warm embedding daemon (standard library only)
+from embedding_daemon import DaemonUnavailableError, is_daemon_enabled, remote_distance
+
+
+def _calculate_distance_in_process(sentence1, sentence2):
+    """Load the model in this process and compute the distance."""
+    # Imported lazily: embedding_utils pulls in torch and sentence-transformers
+    from embedding_utils import compute_embedding, cosine_distance
+
+    emb1 = compute_embedding(sentence1)
+    emb2 = compute_embedding(sentence2)
+    return cosine_distance(emb1, emb2)
 
 
 def calculate_distance(sentence1, sentence2):
@@ -41,11 +56,15 @@ def calculate_distance(sentence1, sentence2):
     Returns:
         float: Cosine distance between the two sentences
     """
+    if is_daemon_enabled() and isinstance(sentence1, str) and isinstance(sentence2, str):
+        try:
+            return remote_distance(sentence1, sentence2)
+        except DaemonUnavailableError:
+            pass  # No daemon running, fall back to in-process loading
+
     try:
-        emb1 = compute_embedding(sentence1)
-        emb2 = compute_embedding(sentence2)
-        distance = cosine_distance(emb1, emb2)
-        return distance
+        distance = _calculate_distance_in_process(sentence1, sentence2)
+        return float(distance)
     except Exception as e:
         print(f"ERROR: {e}", file=sys.stderr)
         return -1.0
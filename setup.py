@@ -4,9 +4,9 @@ Automated setup script for Multi-Agent Translation Semantic Drift Experiment.
 
 This script:
 1. Checks for required dependencies
-2. Attempts to download the embedding model
+2. Downloads only the model files the backend needs (parallel, resumable)
 3. Handles SSL certificate errors automatically
-4. Falls back to Git LFS clone if needed
+4. Falls back to the HuggingFace API or a Git LFS clone if needed
 5. Validates the installation
 6. Provides clear user guidance
 
@@ -16,8 +16,12 @@ Run this before first use:
 Or with options:
     python3 setup.py --force      # Force re-download
     python3 setup.py --check-only # Just check status
+    python3 setup.py --backend onnx  # Fetch the ONNX weights instead
+
+Set HF_ENDPOINT to download from a HuggingFace mirror.
 """
 
+import importlib.util
 import os
 import sys
 import subprocess
@@ -81,12 +85,11 @@ def check_pip_packages() -> Tuple[bool, list]:
         'scipy',
     ]
     
-    missing = []
-    for package in required:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing.append(package)
+    # find_spec only locates the package; importing torch here would cost seconds
+    missing = [
+        package for package in required
+        if importlib.util.find_spec(package.replace('-', '_')) is None
+    ]
     
     if missing:
         print_warning(f"Missing packages: {', '.join(missing)}")
@@ -190,12 +193,15 @@ def check_model_exists(model_path: Path) -> bool:
     # Check for essential files
     required_files = [
         'config.json',
-        'pytorch_model.bin',
         'tokenizer.json',
         'modules.json'
     ]
+    # Any weights format works; model_loader converts .bin to safetensors
+    weight_files = ['model.safetensors', 'pytorch_model.bin', 'onnx/model.onnx']
     
     missing = [f for f in required_files if not (model_path / f).exists()]
+    if not any((model_path / f).exists() for f in weight_files):
+        missing.append(' or '.join(weight_files))
     
     if missing:
         print_warning(f"Model directory exists but missing files: {', '.join(missing)}")
@@ -248,6 +254,35 @@ def download_model_via_git(model_path: Path) -> bool:
         return False
 
 
+def download_model_via_http(model_path: Path, backend: str = 'torch') -> Tuple[bool, bool]:
+    """
+    Download only the files the backend needs (see model_fetch.py).
+    
+    Parallel range requests, resumable after interruption, checksum-verified.
+    
+    Returns:
+        (success: bool, ssl_error: bool)
+    """
+    from model_fetch import FetchError, fetch_model, get_endpoint
+    
+    print_info(f"Fetching {backend} model files from {get_endpoint()}...")
+    
+    try:
+        fetch_model(model_path, backend=backend)
+        print_success("Model downloaded and verified!")
+        return True, False
+    except FetchError as e:
+        error_str = str(e).lower()
+        is_ssl = any(kw in error_str for kw in ['ssl', 'certificate', 'cert'])
+        
+        if is_ssl:
+            print_warning("SSL certificate error detected")
+        else:
+            print_warning(f"Selective download failed: {e}")
+            print_info("Rerun setup to resume; finished chunks are kept")
+        return False, is_ssl
+
+
 def download_model_via_python(model_path: Path) -> Tuple[bool, bool]:
     """
     Try to download model via Python API.
@@ -285,14 +320,17 @@ def download_model_via_python(model_path: Path) -> Tuple[bool, bool]:
             return False, False
 
 
-def validate_model(model_path: Path) -> bool:
+def validate_model(model_path: Path, backend: str = 'torch') -> bool:
     """Validate that the model works."""
     print_info("Validating model...")
     
     try:
-        from sentence_transformers import SentenceTransformer
-        
-        model = SentenceTransformer(str(model_path))
+        if backend == 'onnx':
+            from onnx_backend import load_onnx_model
+            model = load_onnx_model(model_path, verbose=False)
+        else:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(str(model_path))
         
         # Test encoding
         test_text = "Hello world"
@@ -379,6 +417,8 @@ def main():
     parser.add_argument('--force', action='store_true', help='Force re-download even if model exists')
     parser.add_argument('--check-only', action='store_true', help='Only check status, do not install')
     parser.add_argument('--skip-validation', action='store_true', help='Skip model validation')
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch',
+                        help='Which model weights to download (default: torch)')
     args = parser.parse_args()
     
     print_header("🚀 MULTI-AGENT TRANSLATION PROJECT SETUP")
@@ -425,7 +465,7 @@ def main():
         
         if not args.skip_validation:
             print_step(5, "Validating model...")
-            if not validate_model(model_path):
+            if not validate_model(model_path, backend=args.backend):
                 print_error("Model validation failed")
                 print_info("Try re-running with --force to re-download")
                 sys.exit(1)
@@ -442,9 +482,12 @@ def main():
         print_warning("Removing existing model (--force)")
         shutil.rmtree(model_path, ignore_errors=True)
     
-    # Try Python API first (faster if works)
+    # Selective HTTP fetch first (smallest download, resumable)
     print_step(5, "Downloading model...")
-    success, ssl_error = download_model_via_python(model_path)
+    success, ssl_error = download_model_via_http(model_path, backend=args.backend)
+    
+    if not success and not ssl_error:
+        success, ssl_error = download_model_via_python(model_path)
     
     # If SSL error, try Git clone
     if not success and ssl_error:
@@ -459,7 +502,7 @@ def main():
     # Step 6: Validate
     if not args.skip_validation:
         print_step(6, "Validating model...")
-        if not validate_model(model_path):
+        if not validate_model(model_path, backend=args.backend):
             print_error("Model validation failed")
             sys.exit(1)
     
@@ -128,6 +128,8 @@ def show_finding():
     print("45%        |     0.481       |  Slight increase")
     print("50%        |     0.451       |  Still moderate")
     print("="*80)
+    print("\n⚠️  Only 3 sentences per rate: check the bootstrap CIs and permutation")
+    print("   p-values under 'Uncertainty' in results/quantitative_analysis.md")
     print("\n💡 WHY? LLMs act as error correctors!")
     print("   • Low typos (<25%): Easy to correct")
     print("   • Medium typos (30%): Creates ambiguity (peak drift)")
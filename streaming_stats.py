@@ -0,0 +1,284 @@
+"""
+Streaming drift statistics in constant memory per group.
+
+generate_statistics() needs every distance in memory. For continuous or
+unbounded runs, StreamingGroupStats keeps per group:
+- count, mean and variance, updated per batch with Welford's algorithm in
+  its batched form (Chan et al.), plus min and max
+- a QuantileSketch for the median and percentiles
+
+QuantileSketch is a log-bucketed histogram (the DDSketch construction):
+a value x > 0 is counted in bucket ceil(log_gamma(x)) with
+gamma = (1 + a) / (1 - a), and every quantile it returns is within
+relative error a (default 0.5%) of a true sample value at that rank. Its
+size depends only on the range of the values (about 1,500 buckets for
+distances between 1e-6 and 2), not on how many arrive. Unlike t-digest,
+merging is exact: bucket counts add, so sketches built by separate
+workers merge into the same sketch as one built from all the values, in
+any order.
+
+Moments merge exactly too, up to floating-point rounding, so per-worker
+StreamingGroupStats can be combined with merge().
+
+Example:
+    >>> from streaming_stats import StreamingGroupStats
+    >>> stats = StreamingGroupStats()
+    >>> for batch in batches:
+    ...     stats.update(batch_distances, by=batch_typo_rates)
+    >>> stats.merge(other_worker_stats)
+    >>> stats.summary()[30]['median'], stats.overall.summary()['mean']
+"""
+
+import math
+from typing import Dict, Sequence
+
+import numpy as np
+
+from drift_stats import DEFAULT_PERCENTILES, factorize
+
+DEFAULT_RELATIVE_ACCURACY = 0.005
+
+# Values closer to zero than this share one zero bucket
+DEFAULT_MIN_VALUE = 1e-9
+
+
+class _BucketStore:
+    """Dense bucket counts for a contiguous, growing range of bucket keys."""
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _extend(self, low: int, high: int):
+        if len(self.counts) == 0:
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype=np.int64)
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + len(self.counts) - 1)
+        if new_low < self.offset or new_high >= self.offset + len(self.counts):
+            counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+            counts[self.offset - new_low:self.offset - new_low + len(self.counts)] = self.counts
+            self.offset, self.counts = new_low, counts
+
+    def add(self, keys: np.ndarray):
+        if len(keys) == 0:
+            return
+        self._extend(int(keys.min()), int(keys.max()))
+        self.counts += np.bincount(keys - self.offset, minlength=len(self.counts))
+
+    def merge(self, other: '_BucketStore'):
+        if len(other.counts) == 0:
+            return
+        self._extend(other.offset, other.offset + len(other.counts) - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + len(other.counts)] += other.counts
+
+    def keys(self) -> np.ndarray:
+        return np.arange(self.offset, self.offset + len(self.counts))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees.
+
+    Memory depends on the range of the values, not on their count; see the
+    module docstring.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 min_value: float = DEFAULT_MIN_VALUE):
+        """
+        Args:
+            relative_accuracy: Maximum relative error of returned quantiles
+            min_value: Values with |x| below this are counted as zero
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be between 0 and 1, got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive = _BucketStore()
+        self._negative = _BucketStore()
+        self.zero_count = 0
+        self.count = 0
+
+    def _keys(self, magnitudes: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def update(self, values: Sequence[float]):
+        """Add a batch of values (NaN entries are ignored)."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        values = values[~np.isnan(values)]
+        positive = values > self.min_value
+        negative = values < -self.min_value
+        self._positive.add(self._keys(values[positive]))
+        self._negative.add(self._keys(-values[negative]))
+        self.zero_count += int(len(values) - positive.sum() - negative.sum())
+        self.count += len(values)
+
+    def merge(self, other: 'QuantileSketch'):
+        """Add another sketch's counts; the result is independent of merge order."""
+        if (other.relative_accuracy, other.min_value) != (self.relative_accuracy, self.min_value):
+            raise ValueError("Cannot merge sketches with different relative_accuracy or min_value")
+        self._positive.merge(other._positive)
+        self._negative.merge(other._negative)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def _bucket_values(self, keys: np.ndarray) -> np.ndarray:
+        # Within relative_accuracy of every value in bucket (gamma^(k-1), gamma^k]
+        return 2.0 * np.power(self._gamma, keys) / (self._gamma + 1)
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Values at the given quantiles (0 to 1), by rank q * (count - 1).
+
+        Raises:
+            ValueError: If the sketch is empty
+        """
+        if self.count == 0:
+            raise ValueError("Cannot take quantiles of an empty sketch")
+        values = np.concatenate([
+            -self._bucket_values(self._negative.keys())[::-1],
+            [0.0],
+            self._bucket_values(self._positive.keys()),
+        ])
+        counts = np.concatenate([self._negative.counts[::-1], [self.zero_count], self._positive.counts])
+        ranks = np.asarray(qs, dtype=np.float64) * (self.count - 1)
+        return values[np.searchsorted(np.cumsum(counts), ranks, side='right')]
+
+    def histogram(self, edges: Sequence[float]) -> np.ndarray:
+        """Counts per bin of the given edges, placing each bucket at its representative value."""
+        values = np.concatenate([-self._bucket_values(self._negative.keys()), [0.0],
+                                 self._bucket_values(self._positive.keys())])
+        weights = np.concatenate([self._negative.counts, [self.zero_count], self._positive.counts])
+        edges = np.asarray(edges, dtype=np.float64)
+        # Representative values may overshoot the data range by the relative error
+        values = np.clip(values, edges[0], edges[-1])
+        return np.histogram(values, bins=edges, weights=weights)[0].astype(np.int64)
+
+
+class RunningStats:
+    """Count, mean, variance, min, max and quantiles of a stream of values."""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def _combine(self, n: int, mean: float, m2: float):
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def update(self, values: Sequence[float]):
+        """Add a batch of values (NaN entries are ignored)."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        mean = float(values.mean())
+        self._combine(len(values), mean, float(np.square(values - mean).sum()))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.sketch.update(values)
+
+    def merge(self, other: 'RunningStats'):
+        """Add another RunningStats, e.g. from a different worker."""
+        if other.n == 0:
+            return
+        self._combine(other.n, other.mean, other._m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self) -> float:
+        """Population variance (ddof=0), like np.var."""
+        return self._m2 / self.n if self.n else math.nan
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation (ddof=0), like np.std."""
+        return math.sqrt(self.variance)
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> dict:
+        """
+        Returns:
+            Dict with n, mean, std, min, max, median and 'p<q>' entries,
+            like one group of drift_stats.group_stats() without 'values'.
+            Quantiles are approximate (see QuantileSketch).
+        """
+        if self.n == 0:
+            raise ValueError("No values")
+        quantiles = self.sketch.quantiles([0.5] + [q / 100.0 for q in percentiles])
+        # Bucket values can overshoot the extremes by the relative error
+        quantiles = np.clip(quantiles, self.min, self.max)
+        summary = {'n': self.n, 'mean': self.mean, 'std': self.std, 'min': self.min, 'max': self.max,
+                   'median': float(quantiles[0])}
+        for q, value in zip(percentiles, quantiles[1:]):
+            summary[f"p{q:g}"] = float(value)
+        return summary
+
+
+class StreamingGroupStats:
+    """
+    RunningStats per group and overall, updated batch by batch.
+
+    Memory is constant per group however many values arrive.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.groups: Dict = {}
+        self.overall = RunningStats(relative_accuracy)
+
+    def update(self, values: Sequence[float], by: Sequence):
+        """
+        Add a batch.
+
+        Args:
+            values: One value per row (NaN rows are skipped)
+            by: One key per row (rows with a None/NaN key count only
+                towards the overall statistics)
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        codes, keys = factorize(by)
+        if len(codes) != len(values):
+            raise ValueError(f"Got {len(values)} values but {len(codes)} keys")
+        self.overall.update(values)
+
+        valid = (codes >= 0) & ~np.isnan(values)
+        codes, values = codes[valid], values[valid]
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(keys))
+        for key, group_values in zip(keys, np.split(values[order], np.cumsum(counts)[:-1])):
+            if len(group_values):
+                self._group(key).update(group_values)
+
+    def _group(self, key) -> RunningStats:
+        if key not in self.groups:
+            self.groups[key] = RunningStats(self.relative_accuracy)
+        return self.groups[key]
+
+    def merge(self, other: 'StreamingGroupStats'):
+        """Add another worker's statistics."""
+        self.overall.merge(other.overall)
+        for key, stats in other.groups.items():
+            self._group(key).merge(stats)
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+        """
+        Returns:
+            {key: RunningStats.summary()} in sorted key order, like
+            drift_stats.group_stats() without 'values'
+        """
+        _, keys = factorize(list(self.groups))
+        return {key: self.groups[key].summary(percentiles) for key in keys}
@@ -0,0 +1,173 @@
+"""
+Unit tests for async_encoder.py
+
+Tests cover:
+- Coalescing concurrent coroutine and thread requests into batches
+- Results fanned out to the right callers
+- Batch size and wait window limits
+- Per-request error isolation and shutdown
+- Model load failures and close() racing submit()
+"""
+import pytest
+import sys
+import asyncio
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from async_encoder import MicroBatchEncoder
+
+
+class RecordingModel:
+    """Encodes each text as [len(text), first char code]; records batch sizes."""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        if 'BAD' in texts:
+            raise ValueError("bad input")
+        with self._lock:
+            self.batch_sizes.append(len(texts))
+        return np.array([[len(t), ord(t[0]) if t else 0] for t in texts], dtype=np.float32)
+
+
+def expected(text):
+    return np.array([len(text), ord(text[0])], dtype=np.float32)
+
+
+class TestAsyncEmbedding:
+    """Tests for the asyncio API."""
+
+    def test_concurrent_coroutines_share_batches(self):
+        """Many concurrent awaits should run as a few batches, results in place."""
+        model = RecordingModel()
+        texts = [f"sentence {i}" for i in range(40)]
+
+        async def run(encoder):
+            return await asyncio.gather(*(encoder.embed(t) for t in texts))
+
+        with MicroBatchEncoder(model, max_batch_size=64, max_wait_ms=50) as encoder:
+            results = asyncio.run(run(encoder))
+
+        for text, vector in zip(texts, results):
+            np.testing.assert_array_equal(vector, expected(text))
+        assert sum(model.batch_sizes) == 40
+        assert len(model.batch_sizes) < 40
+
+    def test_embed_many_order(self):
+        """embed_many should return results in input order."""
+        with MicroBatchEncoder(RecordingModel(), max_wait_ms=10) as encoder:
+            results = asyncio.run(encoder.embed_many(["a", "bb", "ccc"]))
+        assert [r[0] for r in results] == [1, 2, 3]
+
+
+class TestThreadedEmbedding:
+    """Tests for the blocking API used from threads."""
+
+    def test_threads_coalesce(self):
+        """Concurrent threads should share forward passes."""
+        model = RecordingModel()
+        texts = [f"thread text {i}" for i in range(32)]
+        with MicroBatchEncoder(model, max_batch_size=16, max_wait_ms=50) as encoder:
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                results = list(pool.map(encoder.encode, texts))
+
+        for text, vector in zip(texts, results):
+            np.testing.assert_array_equal(vector, expected(text))
+        assert max(model.batch_sizes) <= 16
+        assert len(model.batch_sizes) < 32
+
+    def test_duplicates_encoded_once(self):
+        """Identical concurrent texts should be encoded once per batch."""
+        model = RecordingModel()
+        with MicroBatchEncoder(model, max_wait_ms=50) as encoder:
+            futures = [encoder.submit("same") for _ in range(10)]
+            results = [f.result(5) for f in futures]
+        assert sum(model.batch_sizes) < 10
+        assert all(np.array_equal(r, expected("same")) for r in results)
+
+    def test_bad_input_isolated(self):
+        """A failing text should only fail its own request."""
+        with MicroBatchEncoder(RecordingModel(), max_wait_ms=50) as encoder:
+            good, bad = encoder.submit("fine"), encoder.submit("BAD")
+            np.testing.assert_array_equal(good.result(5), expected("fine"))
+            with pytest.raises(ValueError):
+                bad.result(5)
+
+    def test_close_drains_queue(self):
+        """Requests queued before close should still complete."""
+        encoder = MicroBatchEncoder(RecordingModel(), max_wait_ms=0)
+        futures = [encoder.submit(f"t{i}") for i in range(20)]
+        encoder.close(timeout=5)
+        assert all(f.result(0)[0] == len(f"t{i}") for i, f in enumerate(futures))
+        with pytest.raises(RuntimeError):
+            encoder.submit("late")
+
+    def test_model_load_failure_fails_requests(self):
+        """A model that cannot load should fail pending requests, not hang them."""
+        from unittest.mock import patch
+        from model_loader import ModelLoadError
+
+        def exit_like_load_model():
+            raise SystemExit(1)
+
+        with patch('model_loader.get_model', exit_like_load_model):
+            with MicroBatchEncoder(max_wait_ms=10) as encoder:
+                futures = [encoder.submit(f"t{i}") for i in range(3)]
+                for future in futures:
+                    with pytest.raises(ModelLoadError):
+                        future.result(5)
+                assert encoder._thread.is_alive()
+
+    def test_base_exception_fails_whole_batch(self):
+        """A BaseException from encode should fail the batch and keep the worker alive."""
+
+        class ExitingModel(RecordingModel):
+            def encode(self, texts, batch_size=32, convert_to_numpy=True):
+                if 'EXIT' in texts:
+                    raise SystemExit(2)
+                return super().encode(texts, batch_size, convert_to_numpy)
+
+        with MicroBatchEncoder(ExitingModel(), max_wait_ms=0) as encoder:
+            with pytest.raises(SystemExit):
+                encoder.submit("EXIT").result(5)
+            np.testing.assert_array_equal(encoder.encode("after", timeout=5), expected("after"))
+
+    def test_submit_racing_close(self):
+        """Every accepted request should resolve even when close() races submit()."""
+        encoder = MicroBatchEncoder(RecordingModel(), max_wait_ms=0)
+        accepted = []
+
+        def submit_many():
+            for i in range(200):
+                try:
+                    accepted.append(encoder.submit(f"t{i}"))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=submit_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        encoder.close(timeout=5)
+        for thread in threads:
+            thread.join()
+        assert all(f.result(5) is not None for f in accepted)
+
+    def test_stats(self):
+        """stats() should count requests and batches."""
+        with MicroBatchEncoder(RecordingModel(), max_wait_ms=20) as encoder:
+            encoder.encode_many(["a", "b", "c"])
+            stats = encoder.stats()
+        assert stats['requests'] == 3
+        assert stats['batches'] >= 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -6,6 +6,7 @@ Tests cover:
 - Batch processing logic
 - Statistical calculations
 - Visualization generation (mocked)
+- Checkpointed, resumable runs (encoder mocked)
 - Integration with embedding_utils
 """
 import pytest
@@ -25,7 +26,10 @@ from batch_calculate_distances import (
     sentences,
     calculate_all_distances,
     generate_statistics,
+    generate_streaming_statistics,
+    streaming_overall_summary,
     create_visualizations,
+    plot_aggregate,
     save_detailed_results
 )
 
@@ -199,6 +203,15 @@ class TestGenerateStatistics:
         # Should still compute statistics on remaining valid results
         assert isinstance(stats, dict)
 
+    def test_sentence_files_report_per_rate(self):
+        """A run over the sentence_XX files should report every typo rate, 3 pairs each."""
+        from pair_sources import iter_pairs
+        results = [{'id': p['id'], 'typo_rate': p['typo_rate'], 'domain': None, 'distance': 0.4}
+                   for p in iter_pairs(base_dir / 'data' / 'experiment_raw_data')]
+        stats = generate_statistics(results)
+        assert list(stats) == [20, 25, 30, 35, 40, 45, 50]
+        assert all(rate_stats['n'] == 3 for rate_stats in stats.values())
+
 
 class TestCreateVisualizationsMocked:
     """Tests for visualization generation (with mocked matplotlib)."""
@@ -253,6 +266,88 @@ class TestCreateVisualizationsMocked:
         assert 'semantic_drift_analysis.png' in output_path
 
 
+class TestLargeNVisualizations:
+    """Tests for the aggregated rendering path."""
+
+    @staticmethod
+    def many_results(n=6000):
+        rng = np.random.default_rng(0)
+        rates = rng.choice([20, 25, 30], size=n)
+        distances = rng.gamma(2.0, 0.2, size=n)
+        return [{'id': i, 'typo_rate': int(rate), 'domain': 'X', 'distance': float(distance)}
+                for i, (rate, distance) in enumerate(zip(rates, distances))]
+
+    def test_aggregate_counts(self):
+        """Binned counts should cover every valid distance once, per rate."""
+        results = self.many_results(1000)
+        results[0]['distance'] = None
+        summary = plot_aggregate(results, bins=20)
+        assert summary['rates'] == [20, 25, 30]
+        assert summary['counts'].shape == (3, 20)
+        assert summary['counts'].sum() == summary['n'] == 999
+        assert summary['counts'][1].sum() == sum(1 for r in results[1:] if r['typo_rate'] == 25)
+
+    def test_aggregate_from_streaming_stats(self):
+        """A streaming run should bin its sketches into the same shape."""
+        from streaming_stats import StreamingGroupStats
+        results = self.many_results(1000)
+        stats = StreamingGroupStats()
+        stats.update([r['distance'] for r in results], [r['typo_rate'] for r in results])
+        summary = plot_aggregate(stream_stats=stats, bins=20)
+        np.testing.assert_array_equal(summary['counts'].sum(axis=1),
+                                      plot_aggregate(results, bins=20)['counts'].sum(axis=1))
+
+    @patch('batch_calculate_distances.plt')
+    def test_large_n_aggregates_with_preview(self, mock_plt):
+        """Above LARGE_N_POINTS, no raw scatter or boxplot and a preview plus the full render."""
+        results = self.many_results()
+        create_visualizations(results, generate_statistics(results))
+        assert mock_plt.subplot.call_count == 4
+        assert mock_plt.savefig.call_count == 2
+        ax = mock_plt.subplot.return_value
+        ax.scatter.assert_not_called()
+        ax.boxplot.assert_not_called()
+        ax.bxp.assert_called_once()
+        ax.violin.assert_called_once()
+
+    def test_renders_files(self):
+        """The aggregated path should write both images with real matplotlib."""
+        import matplotlib
+        matplotlib.use('Agg')
+        results = self.many_results()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch('batch_calculate_distances.base_dir', Path(tmpdir)):
+                (Path(tmpdir) / 'results').mkdir()
+                create_visualizations(results, generate_statistics(results))
+                names = sorted(p.name for p in (Path(tmpdir) / 'results').iterdir())
+        assert names == ['semantic_drift_analysis.png', 'semantic_drift_analysis_preview.png']
+
+    def render(self, results, typo_rate_stats, stream_stats=None):
+        import matplotlib
+        matplotlib.use('Agg')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch('batch_calculate_distances.base_dir', Path(tmpdir)):
+                (Path(tmpdir) / 'results').mkdir()
+                create_visualizations(results, typo_rate_stats, stream_stats=stream_stats)
+                return sorted(p.name for p in (Path(tmpdir) / 'results').iterdir())
+
+    def test_pairs_without_typo_rates(self):
+        """Rate-less pairs (sentence files, JSONL/CSV without typo_rate) should still render."""
+        results = self.many_results()
+        for r in results:
+            r['typo_rate'] = None
+        assert generate_statistics(results) == {}
+        assert 'semantic_drift_analysis.png' in self.render(results, {})
+
+    def test_empty_stream(self):
+        """A streaming run with no scored pairs should still render."""
+        from streaming_stats import StreamingGroupStats
+        summary = plot_aggregate(stream_stats=StreamingGroupStats(), bins=10)
+        assert summary['n'] == 0 and np.isnan(summary['mean'])
+        assert summary['edges'][0] == 0.0 and summary['edges'][-1] == 1.0
+        assert 'semantic_drift_analysis.png' in self.render(None, {}, StreamingGroupStats())
+
+
 class TestSaveDetailedResults:
     """Tests for saving detailed results to markdown."""
 
@@ -311,6 +406,122 @@ class TestSaveDetailedResults:
                 assert '---' in content
 
 
+def fake_embeddings_batch(texts):
+    """Deterministic bag-of-words vectors standing in for the model."""
+    vectors = []
+    for text in texts:
+        vector = np.zeros(16, dtype=np.float32)
+        for word in text.split():
+            vector[sum(word.encode('utf-8')) % 16] += 1.0
+        vectors.append(vector)
+    return vectors
+
+
+@patch('batch_calculate_distances._model_fingerprint', return_value='test-model')
+@patch('batch_calculate_distances.get_embedding_memo', return_value=None)
+@patch('batch_calculate_distances.get_embedding_cache', return_value=None)
+@patch('batch_calculate_distances.compute_embeddings_batch', side_effect=fake_embeddings_batch)
+class TestCheckpointedRuns:
+    """Tests for committing chunks and resuming interrupted runs."""
+
+    def pairs(self, n=10):
+        return [{'id': i, 'typo_rate': 20, 'domain': 'Test',
+                 'original': f"sentence {i} about topic {i % 3}", 'final': f"sentence {i} on topic {i % 4}"}
+                for i in range(n)]
+
+    def run(self, store_dir, pairs, resume=False, chunk_size=3):
+        from result_store import ResultStoreWriter
+        with ResultStoreWriter(store_dir, overwrite=not resume) as writer:
+            return calculate_all_distances(pairs=iter(pairs), chunk_size=chunk_size, store=writer)
+
+    def test_resume_matches_uninterrupted_run(self, *mocks):
+        """A crashed then resumed run should give the same results and store files."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            full_dir, part_dir = Path(tmpdir) / 'full', Path(tmpdir) / 'part'
+            expected = self.run(full_dir, self.pairs())
+
+            from result_store import ResultStoreWriter
+            real_append = ResultStoreWriter.append
+            calls = []
+
+            def crash_on_third(writer, *args, **kwargs):
+                calls.append(1)
+                if len(calls) == 3:
+                    raise MemoryError("simulated OOM")
+                return real_append(writer, *args, **kwargs)
+
+            with patch.object(ResultStoreWriter, 'append', crash_on_third):
+                with pytest.raises(MemoryError):
+                    self.run(part_dir, self.pairs())
+
+            encoded_before = mocks[0].call_count
+            results = self.run(part_dir, self.pairs(), resume=True)
+            assert results == expected
+            # Only the two unfinished chunks (4 of 10 pairs) were encoded again
+            assert sum(len(c.args[0]) for c in mocks[0].call_args_list[encoded_before:]) == 8
+            for name in ('distance.f64', 'original.f32', 'final.f32', 'labels.jsonl', 'meta.json'):
+                assert (full_dir / name).read_bytes() == (part_dir / name).read_bytes()
+
+    def test_changed_input_rejected(self, *mocks):
+        """Resuming over different input should fail instead of mixing results."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.run(tmpdir, self.pairs())
+            changed = self.pairs()
+            changed[1]['final'] = "something else entirely"
+            with pytest.raises(ValueError, match="changed"):
+                self.run(tmpdir, changed, resume=True)
+
+    def test_changed_settings_rejected(self, *mocks):
+        """Resuming with another chunk size should fail."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.run(tmpdir, self.pairs())
+            with pytest.raises(ValueError, match="chunk_size"):
+                self.run(tmpdir, self.pairs(), resume=True, chunk_size=4)
+
+    def test_cache_flushed_per_chunk(self, *mocks):
+        """Staged cache vectors should never exceed one chunk's sentences."""
+        from embedding_cache import EmbeddingCache
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = EmbeddingCache(Path(tmpdir) / 'cache')
+            real_put_many = cache.put_many
+            pending_sizes = []
+
+            def recording_put_many(texts, vectors):
+                real_put_many(texts, vectors)
+                pending_sizes.append(len(cache._pending))
+
+            cache.put_many = recording_put_many
+            mocks[1].return_value = cache
+            pairs = [{'id': i, 'typo_rate': 20, 'domain': 'Test',
+                      'original': f"original sentence number {i}", 'final': f"final sentence number {i}"}
+                     for i in range(30)]
+            calculate_all_distances(pairs=iter(pairs), chunk_size=3, keep_results=False)
+            assert len(pending_sizes) == 10
+            assert max(pending_sizes) <= 6
+            assert len(cache._pending) == 0 and len(cache) == 60
+
+    def test_streaming_run_keeps_no_results(self, *mocks):
+        """keep_results=False should return nothing but fill the streaming statistics."""
+        from result_store import ResultStoreWriter
+        from streaming_stats import StreamingGroupStats
+        pairs = self.pairs()
+        for i, pair in enumerate(pairs):
+            pair['typo_rate'] = 20 + 5 * (i % 2)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            expected = generate_statistics(self.run(Path(tmpdir) / 'full', [dict(p) for p in pairs]))
+            stats = StreamingGroupStats()
+            with ResultStoreWriter(Path(tmpdir) / 'streamed') as writer:
+                results = calculate_all_distances(pairs=iter(pairs), chunk_size=3, store=writer,
+                                                  stats=stats, keep_results=False)
+        assert results == []
+        streamed = generate_streaming_statistics(stats)
+        assert list(streamed) == [20, 25]
+        for rate in streamed:
+            assert streamed[rate]['n'] == expected[rate]['n']
+            assert streamed[rate]['avg'] == pytest.approx(expected[rate]['avg'])
+            assert streamed[rate]['std'] == pytest.approx(expected[rate]['std'])
+
+
 class TestIntegrationWithEmbeddingUtils:
     """Integration tests with embedding_utils."""
 
@@ -398,6 +609,90 @@ class TestEdgeCases:
         assert rates == [20, 25, 30, 35, 40, 45, 50]
 
 
+class TestUncertainty:
+    """Tests for bootstrap intervals and permutation tests in the summary."""
+
+    @staticmethod
+    def fake_results():
+        rng = np.random.default_rng(0)
+        return [{'id': i, 'typo_rate': rate, 'domain': 'X', 'distance': float(rng.normal(rate / 100, 0.02))}
+                for i, rate in enumerate([20, 25, 30] * 10)]
+
+    def test_intervals_added(self):
+        """n_resamples should add a CI around each mean and p-values after the first rate."""
+        stats = generate_statistics(self.fake_results(), n_resamples=500, seed=0)
+        for rate, rate_stats in stats.items():
+            assert rate_stats['ci_low'] < rate_stats['avg'] < rate_stats['ci_high']
+        assert stats[20]['p_vs_previous'] is None
+        assert stats[30]['p_vs_previous'] < 0.01
+
+    def test_markdown_uncertainty_section(self):
+        """The Uncertainty section should be written only when CIs were computed."""
+        results = self.fake_results()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch('batch_calculate_distances.base_dir', Path(tmpdir)):
+                (Path(tmpdir) / 'results').mkdir()
+                output_file = Path(save_detailed_results(results, generate_statistics(results)))
+                assert '## Uncertainty' not in output_file.read_text(encoding='utf-8')
+
+                save_detailed_results(results, generate_statistics(results, n_resamples=200, seed=0))
+                content = output_file.read_text(encoding='utf-8')
+                assert '## Uncertainty' in content
+                assert '| 25% |' in content.split('## Uncertainty')[1]
+
+
+class TestStreamingStatistics:
+    """Tests for summaries from streaming statistics."""
+
+    def test_matches_generate_statistics(self):
+        """Streaming summaries should match generate_statistics, quantiles within 0.5%."""
+        from streaming_stats import StreamingGroupStats
+        results = TestUncertainty.fake_results()
+        stats = StreamingGroupStats()
+        for start in range(0, len(results), 7):
+            chunk = results[start:start + 7]
+            stats.update([r['distance'] for r in chunk], [r['typo_rate'] for r in chunk])
+
+        expected = generate_statistics(results)
+        streamed = generate_streaming_statistics(stats)
+        assert list(streamed) == list(expected)
+        for rate, rate_stats in streamed.items():
+            assert 'distances' not in rate_stats
+            for field in ('avg', 'std', 'min', 'max'):
+                assert rate_stats[field] == pytest.approx(expected[rate][field])
+            assert rate_stats['n'] == expected[rate]['n']
+
+    def test_markdown_without_results(self):
+        """A streaming report should have the summary tables but no per-pair table."""
+        from streaming_stats import StreamingGroupStats
+        results = TestUncertainty.fake_results()
+        stats = StreamingGroupStats()
+        stats.update([r['distance'] for r in results], [r['typo_rate'] for r in results])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch('batch_calculate_distances.base_dir', Path(tmpdir)):
+                (Path(tmpdir) / 'results').mkdir()
+                path = save_detailed_results(None, generate_streaming_statistics(stats),
+                                             overall=stats.overall.summary())
+                content = Path(path).read_text(encoding='utf-8')
+        assert '| 25% |' in content
+        assert '- **Total Sentences**: 30' in content
+        assert '| ID | Typo% |' not in content
+
+    def test_empty_stream(self):
+        """A run where no pair was scored should report n=0 instead of crashing."""
+        from streaming_stats import StreamingGroupStats
+        stats = StreamingGroupStats()
+        assert generate_streaming_statistics(stats) == {}
+        overall = streaming_overall_summary(stats)
+        assert overall['n'] == 0 and np.isnan(overall['mean'])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch('batch_calculate_distances.base_dir', Path(tmpdir)):
+                (Path(tmpdir) / 'results').mkdir()
+                path = save_detailed_results(None, {}, overall=overall)
+                content = Path(path).read_text(encoding='utf-8')
+        assert '- **Total Sentences**: 0' in content
+
+
 class TestStatisticalProperties:
     """Tests for statistical properties of results."""
 
@@ -0,0 +1,159 @@
+"""
+Unit tests for distance_kernels.py
+
+Tests cover:
+- Paired and all-pairs kernels against per-pair scipy references
+- float32 output and shape handling
+- Metric dispatch and semantic_similarity with a fake model
+"""
+import pytest
+import sys
+import numpy as np
+from pathlib import Path
+from scipy.spatial.distance import cdist, cosine, euclidean
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from distance_kernels import (
+    compute_distances,
+    cosine_distance,
+    euclidean_distance,
+    paired_cosine_distances,
+    paired_euclidean_distances,
+    pairwise_cosine_distances,
+    pairwise_euclidean_distances,
+    semantic_similarity
+)
+
+
+@pytest.fixture
+def embeddings():
+    rng = np.random.default_rng(42)
+    return (rng.standard_normal((50, 384)).astype(np.float32),
+            rng.standard_normal((50, 384)).astype(np.float32))
+
+
+class FakeModel:
+    """Deterministic bag-of-characters encoder."""
+
+    def encode(self, texts, convert_to_numpy=True):
+        vectors = np.zeros((len(texts), 384), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for ch in text.encode('utf-8'):
+                vectors[row, ch % 384] += 1.0
+            vectors[row, 383] += 1.0
+        return vectors
+
+
+class TestPairedKernels:
+    """Tests for row-paired kernels."""
+
+    def test_cosine_matches_scipy(self, embeddings):
+        """Each entry should equal scipy's per-pair cosine distance."""
+        a, b = embeddings
+        expected = [cosine(x, y) for x, y in zip(a, b)]
+        np.testing.assert_allclose(paired_cosine_distances(a, b), expected, atol=1e-5)
+
+    def test_euclidean_matches_scipy(self, embeddings):
+        """Each entry should equal scipy's per-pair euclidean distance."""
+        a, b = embeddings
+        expected = [euclidean(x, y) for x, y in zip(a, b)]
+        np.testing.assert_allclose(paired_euclidean_distances(a, b), expected, rtol=1e-5)
+
+    def test_float32_output(self, embeddings):
+        """Results should stay float32."""
+        a, b = embeddings
+        assert paired_cosine_distances(a, b).dtype == np.float32
+        assert paired_euclidean_distances(a, b).dtype == np.float32
+
+    def test_identical_and_opposite(self):
+        """Identical rows give 0, opposite rows give 2."""
+        v = np.array([[1.0, 2.0, 3.0]], dtype=np.float32)
+        assert paired_cosine_distances(v, v)[0] == pytest.approx(0.0, abs=1e-6)
+        assert paired_cosine_distances(v, -v)[0] == pytest.approx(2.0, abs=1e-6)
+
+    def test_zero_vector(self):
+        """A zero vector should give distance 1, not NaN."""
+        zero = np.zeros((1, 3), dtype=np.float32)
+        assert paired_cosine_distances(zero, np.ones((1, 3)))[0] == pytest.approx(1.0)
+
+    def test_shape_mismatch(self):
+        """Paired inputs must line up."""
+        with pytest.raises(ValueError):
+            paired_cosine_distances(np.ones((2, 3)), np.ones((3, 3)))
+
+
+class TestPairwiseKernels:
+    """Tests for all-pairs kernels."""
+
+    def test_cosine_matches_cdist(self, embeddings):
+        """The matrix should match scipy's cdist."""
+        a, b = embeddings
+        np.testing.assert_allclose(pairwise_cosine_distances(a, b[:20]),
+                                   cdist(a, b[:20], 'cosine'), atol=1e-5)
+
+    def test_euclidean_matches_cdist(self, embeddings):
+        """The matrix should match scipy's cdist."""
+        a, b = embeddings
+        np.testing.assert_allclose(pairwise_euclidean_distances(a, b[:20]),
+                                   cdist(a, b[:20], 'euclidean'), rtol=1e-4)
+
+    def test_self_distances(self, embeddings):
+        """Without b, rows are compared with each other; the diagonal is ~0."""
+        a, _ = embeddings
+        distances = pairwise_euclidean_distances(a)
+        assert distances.shape == (50, 50)
+        assert np.all(np.diag(distances) < 1e-2)
+
+
+class TestDispatch:
+    """Tests for compute_distances and the scalar helpers."""
+
+    def test_vectors_give_float(self, embeddings):
+        """Two 1-D vectors should give a Python float."""
+        a, b = embeddings
+        assert isinstance(cosine_distance(a[0], b[0]), float)
+        assert euclidean_distance(a[0], a[0]) == pytest.approx(0.0, abs=1e-5)
+
+    def test_matrices_give_vector(self, embeddings):
+        """Two matrices should give one distance per row."""
+        a, b = embeddings
+        assert cosine_distance(a, b).shape == (50,)
+
+    def test_pairwise_flag(self, embeddings):
+        """pairwise=True should return the full matrix."""
+        a, b = embeddings
+        assert compute_distances(a, b[:5], pairwise=True).shape == (50, 5)
+
+    def test_unknown_metric(self, embeddings):
+        """Unknown metrics should raise ValueError."""
+        a, b = embeddings
+        with pytest.raises(ValueError, match="Unknown distance metric"):
+            compute_distances(a, b, distance_metric='manhattan')
+
+
+class TestSemanticSimilarity:
+    """Tests for semantic_similarity with a fake model."""
+
+    def test_single_pair(self):
+        """Strings give a float; identical strings give ~0."""
+        assert semantic_similarity("Test", "Test", model=FakeModel()) == pytest.approx(0.0, abs=1e-6)
+
+    def test_batch_matches_single(self):
+        """Lists should give the same distances as one call per pair."""
+        originals, finals = ["Hello world", "Cat"], ["Hello there", "Dog"]
+        batch = semantic_similarity(originals, finals, distance_metric='euclidean', model=FakeModel())
+        single = [semantic_similarity(x, y, distance_metric='euclidean', model=FakeModel())
+                  for x, y in zip(originals, finals)]
+        np.testing.assert_allclose(batch, single, rtol=1e-6)
+
+    def test_invalid_metric(self):
+        """Unknown metrics should raise before encoding."""
+        with pytest.raises(ValueError, match="Unknown distance metric"):
+            semantic_similarity("Hello", "World", distance_metric='invalid', model=FakeModel())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
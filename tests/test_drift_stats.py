@@ -0,0 +1,212 @@
+"""
+Unit tests for drift_stats.py
+
+Tests cover:
+- Group-by statistics against per-group NumPy reference values
+- Key factorization with missing and mixed keys
+- Multi-column grouping
+- Bootstrap intervals and permutation tests, exact and binned
+"""
+import pytest
+import sys
+import numpy as np
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from drift_stats import (
+    bootstrap_ci,
+    bootstrap_distribution,
+    factorize,
+    group_bootstrap_ci,
+    group_stats,
+    pairwise_permutation_tests,
+    permutation_test,
+    result_distances,
+    results_column
+)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    values = rng.random(5000)
+    rates = rng.choice([20, 25, 30, 35, 40, 45, 50], size=5000)
+    domains = rng.choice(['Physics', 'Biology', 'Music'], size=5000)
+    return values, rates, domains
+
+
+class TestGroupStats:
+    """Tests for group_stats."""
+
+    def test_matches_numpy_per_group(self, data):
+        """Every statistic should equal NumPy on the group's rows."""
+        values, rates, _ = data
+        stats = group_stats(values, rates, percentiles=(10, 25, 75, 90))
+        assert list(stats) == [20, 25, 30, 35, 40, 45, 50]
+        for rate, group in stats.items():
+            expected = values[rates == rate]
+            assert group['n'] == len(expected)
+            assert group['mean'] == pytest.approx(expected.mean())
+            assert group['std'] == pytest.approx(expected.std())
+            assert group['min'] == expected.min() and group['max'] == expected.max()
+            assert group['median'] == pytest.approx(np.median(expected))
+            for q in (10, 25, 75, 90):
+                assert group[f"p{q}"] == pytest.approx(np.percentile(expected, q))
+            np.testing.assert_array_equal(group['values'], np.sort(expected))
+
+    def test_skips_nan_values_and_missing_keys(self):
+        """NaN values and None keys should be left out."""
+        values = [0.1, np.nan, 0.3, 0.5, 0.7]
+        keys = [20, 20, None, 30, 30]
+        stats = group_stats(values, keys)
+        assert stats[20]['n'] == 1 and stats[30]['n'] == 2
+        assert stats[30]['mean'] == pytest.approx(0.6)
+
+    def test_single_row_group(self):
+        """A group of one should have zero std and equal percentiles."""
+        stats = group_stats([0.4], ['only'])
+        assert stats['only']['std'] == 0.0
+        assert stats['only']['median'] == stats['only']['p75'] == 0.4
+
+    def test_empty(self):
+        """No valid rows should give no groups."""
+        assert group_stats([np.nan], [20]) == {}
+
+    def test_multi_column_keys(self, data):
+        """A list of key columns should group by tuples."""
+        values, rates, domains = data
+        stats = group_stats(values, [rates, domains])
+        assert (30, 'Music') in stats
+        mask = (rates == 30) & (domains == 'Music')
+        assert stats[(30, 'Music')]['n'] == mask.sum()
+        assert stats[(30, 'Music')]['mean'] == pytest.approx(values[mask].mean())
+
+    def test_length_mismatch(self):
+        """Values and keys of different lengths should be rejected."""
+        with pytest.raises(ValueError):
+            group_stats([0.1, 0.2], [20])
+
+
+class TestFactorize:
+    """Tests for factorize and the result helpers."""
+
+    def test_mixed_keys_sorted(self):
+        """Numbers should sort before strings; None should get code -1."""
+        codes, uniques = factorize([30, 'b', None, 20, 'a', 30])
+        assert uniques == [20, 30, 'a', 'b']
+        assert list(codes) == [1, 3, -1, 0, 2, 1]
+
+    def test_float_nan_missing(self):
+        """NaN keys in a float column should be missing."""
+        codes, uniques = factorize(np.array([20.0, np.nan, 25.0]))
+        assert uniques == [20.0, 25.0] and list(codes) == [0, -1, 1]
+
+    def test_result_helpers(self):
+        """Result dicts should convert to columns with NaN for failures."""
+        results = [{'typo_rate': 20, 'distance': 0.1}, {'typo_rate': 25, 'distance': None}]
+        assert results_column(results, 'typo_rate') == [20, 25]
+        assert results_column(results, 'domain') == [None, None]
+        distances = result_distances(results)
+        assert distances[0] == 0.1 and np.isnan(distances[1])
+
+
+class TestBootstrap:
+    """Tests for bootstrap_distribution and bootstrap_ci."""
+
+    def test_seed_reproducible(self):
+        """The same seed should give the same resamples."""
+        values = np.random.default_rng(1).random(200)
+        first = bootstrap_distribution(values, n_resamples=500, seed=7)
+        np.testing.assert_array_equal(first, bootstrap_distribution(values, n_resamples=500, seed=7))
+        assert not np.array_equal(first, bootstrap_distribution(values, n_resamples=500, seed=8))
+
+    def test_interval_matches_standard_error(self):
+        """The mean's interval should cover the estimate with width near 2 x 1.96 SE."""
+        values = np.random.default_rng(2).normal(0.4, 0.1, size=2000)
+        ci = bootstrap_ci(values, n_resamples=2000, seed=0)
+        assert ci['low'] < ci['estimate'] < ci['high']
+        assert ci['se'] == pytest.approx(values.std() / np.sqrt(len(values)), rel=0.1)
+        assert ci['high'] - ci['low'] == pytest.approx(2 * 1.96 * ci['se'], rel=0.1)
+
+    def test_small_blocks_same_distribution(self):
+        """A tiny max_block_elements should still produce every resample."""
+        values = np.random.default_rng(3).random(100)
+        distribution = bootstrap_distribution(values, 'median', n_resamples=300, seed=0,
+                                              max_block_elements=150)
+        assert distribution.shape == (300,)
+        assert values.min() <= distribution.min() and distribution.max() <= values.max()
+
+    def test_binned_agrees_with_exact(self):
+        """Binned intervals should match exact ones to within Monte Carlo error."""
+        values = np.random.default_rng(4).gamma(2.0, 0.1, size=50_000)
+        for statistic in ('mean', 'median'):
+            exact = bootstrap_ci(values, statistic, n_resamples=400, seed=0, method='exact')
+            binned = bootstrap_ci(values, statistic, n_resamples=4000, seed=0, method='binned')
+            assert binned['se'] == pytest.approx(exact['se'], rel=0.15)
+            assert binned['low'] == pytest.approx(exact['low'], abs=exact['se'] / 2)
+            assert binned['high'] == pytest.approx(exact['high'], abs=exact['se'] / 2)
+
+    def test_binned_callable_rejected(self):
+        """The binned method should refuse statistics it cannot summarize."""
+        with pytest.raises(ValueError):
+            bootstrap_distribution([0.1, 0.2], np.std, method='binned')
+
+    def test_empty_sample(self):
+        """A sample of only NaN should be rejected."""
+        with pytest.raises(ValueError):
+            bootstrap_ci([np.nan])
+
+    def test_group_intervals(self, data):
+        """Every group should get an interval around its own mean."""
+        values, rates, _ = data
+        intervals = group_bootstrap_ci(values, rates, n_resamples=500, seed=0)
+        assert list(intervals) == [20, 25, 30, 35, 40, 45, 50]
+        for rate, ci in intervals.items():
+            assert ci['estimate'] == pytest.approx(values[rates == rate].mean())
+            assert ci['low'] < ci['estimate'] < ci['high']
+
+
+class TestPermutation:
+    """Tests for permutation_test and pairwise_permutation_tests."""
+
+    def test_same_distribution_not_significant(self):
+        """Two samples from one distribution should give a large p-value."""
+        rng = np.random.default_rng(5)
+        result = permutation_test(rng.random(300), rng.random(300), n_permutations=2000, seed=0)
+        assert result['p_value'] > 0.05
+        assert 0 < result['p_value'] <= 1
+
+    def test_shift_detected(self):
+        """A clear shift should give the smallest possible p-value."""
+        rng = np.random.default_rng(6)
+        a, b = rng.normal(0.6, 0.05, 200), rng.normal(0.4, 0.05, 200)
+        result = permutation_test(a, b, n_permutations=999, seed=0)
+        assert result['p_value'] == pytest.approx(1 / 1000)
+        assert permutation_test(a, b, n_permutations=999, alternative='less', seed=0)['p_value'] > 0.9
+
+    def test_binned_agrees_with_exact(self):
+        """Binned and exact p-values should agree for mean and median."""
+        rng = np.random.default_rng(7)
+        a, b = rng.gamma(2.0, 0.1, 20_000), rng.gamma(2.0, 0.1, 20_000) + 0.002
+        for statistic in ('mean', 'median'):
+            exact = permutation_test(a, b, statistic, n_permutations=400, seed=0, method='exact')
+            binned = permutation_test(a, b, statistic, n_permutations=4000, seed=0, method='binned')
+            assert binned['p_value'] == pytest.approx(exact['p_value'], abs=0.08)
+
+    def test_adjacent_pairs(self, data):
+        """By default each group should be tested against the next one."""
+        values, rates, _ = data
+        tests = pairwise_permutation_tests(values, rates, n_permutations=200, seed=0)
+        assert list(tests) == [(20, 25), (25, 30), (30, 35), (35, 40), (40, 45), (45, 50)]
+
+    def test_unknown_alternative(self):
+        """An unknown alternative should be rejected."""
+        with pytest.raises(ValueError):
+            permutation_test([0.1], [0.2], alternative='both')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
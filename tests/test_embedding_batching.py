@@ -0,0 +1,220 @@
+"""
+Unit tests for embedding_batching.py
+
+Tests cover:
+- Token-budgeted, length-sorted bucket formation
+- Token length measurement with and without a tokenizer
+- Output order and equivalence with unbucketed encoding
+- Streaming into a memmap, including resume after a crash
+- Exact and normalized duplicate elimination
+"""
+import pytest
+import sys
+import numpy as np
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from embedding_batching import (
+    compute_embeddings_batch,
+    deduplicate,
+    embed_to_memmap,
+    encode_length_bucketed,
+    iter_embeddings,
+    make_length_buckets,
+    normalization_key,
+    token_lengths
+)
+
+
+class FakeModel:
+    """Bag-of-words encoder that records the batches it receives."""
+
+    max_seq_length = 256
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        vectors = np.zeros((len(texts), 16), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                vectors[row, hash(word) % 16] += 1.0
+        return vectors
+
+
+class FakeTokenizer:
+    """Hugging Face style tokenizer: one token per character."""
+
+    def __call__(self, texts, add_special_tokens=True, truncation=True, max_length=None):
+        return {'input_ids': [list(range(len(t) + 2)) for t in texts]}
+
+
+MIXED = ["hi there", "This is a very long sentence. " * 50, "a medium length sentence about science",
+         "ok", "another fairly long technical sentence with quite a few words in it"]
+
+
+class TestMakeLengthBuckets:
+    """Tests for make_length_buckets."""
+
+    def test_covers_every_index_once(self):
+        """Every input should land in exactly one batch."""
+        lengths = [5, 100, 7, 50, 3, 250, 8]
+        batches = make_length_buckets(lengths, max_tokens=200)
+        assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+
+    def test_respects_token_budget(self):
+        """Padded size of every multi-input batch should fit the budget."""
+        lengths = [5, 100, 7, 50, 3, 60, 8, 9, 12, 40]
+        for batch in make_length_buckets(lengths, max_tokens=120):
+            assert len(batch) == 1 or len(batch) * max(lengths[i] for i in batch) <= 120
+
+    def test_groups_similar_lengths(self):
+        """Short inputs should batch together, long ones separately."""
+        lengths = [10, 200, 10, 200, 10]
+        batches = make_length_buckets(lengths, max_tokens=400)
+        assert sorted(map(sorted, batches)) == [[0, 2, 4], [1, 3]]
+
+    def test_oversized_input_gets_own_batch(self):
+        """An input over the budget is still encoded, alone."""
+        assert make_length_buckets([500, 5], max_tokens=100) == [[0], [1]]
+
+    def test_max_batch_size(self):
+        """The batch size cap applies even under the budget."""
+        batches = make_length_buckets([1] * 10, max_tokens=1000, max_batch_size=4)
+        assert [len(b) for b in batches] == [4, 4, 2]
+
+
+class TestTokenLengths:
+    """Tests for token_lengths."""
+
+    def test_uses_tokenizer_and_truncates(self):
+        """Lengths come from the tokenizer, capped at max_seq_length."""
+        model = FakeModel()
+        model.tokenizer = FakeTokenizer()
+        assert token_lengths(model, ["abc", "x" * 1000]) == [5, 256]
+
+    def test_fallback_without_tokenizer(self):
+        """Without a tokenizer, longer texts still measure longer."""
+        short, long = token_lengths(FakeModel(), ["two words", "many " * 40])
+        assert 0 < short < long
+
+
+class TestEncodeLengthBucketed:
+    """Tests for encode_length_bucketed and compute_embeddings_batch."""
+
+    def test_matches_unbucketed(self):
+        """Results should equal one plain encode, in input order."""
+        expected = FakeModel().encode(MIXED)
+        result = encode_length_bucketed(FakeModel(), MIXED, max_tokens=64)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_batches_sorted_by_length(self):
+        """Batches should be formed longest first."""
+        model = FakeModel()
+        encode_length_bucketed(model, MIXED, max_tokens=64)
+        first_lengths = [len(b[0].split()) for b in model.batches]
+        assert first_lengths == sorted(first_lengths, reverse=True)
+        assert len(model.batches) > 1
+
+    def test_returns_list(self):
+        """compute_embeddings_batch keeps its list-of-arrays contract."""
+        result = compute_embeddings_batch(["one", "two"], model=FakeModel())
+        assert isinstance(result, list) and len(result) == 2
+        assert compute_embeddings_batch([], model=FakeModel()) == []
+
+    def test_workers_option(self):
+        """The multi-process path should return the same embeddings in order."""
+        texts = [f"worker text {i}" for i in range(12)]
+        result = compute_embeddings_batch(texts, model=FakeModel(), workers=3)
+        np.testing.assert_array_equal(np.stack(result), FakeModel().encode(texts))
+
+
+class TestDeduplication:
+    """Tests for deduplicate and its use in compute_embeddings_batch."""
+
+    def test_exact_duplicates(self):
+        """Duplicates should map back to the first occurrence."""
+        unique, inverse = deduplicate(["a", "b", "a", "c", "b"])
+        assert unique == ["a", "b", "c"]
+        assert [unique[j] for j in inverse] == ["a", "b", "a", "c", "b"]
+
+    def test_normalized_duplicates(self):
+        """Whitespace and Unicode composition differences merge only when asked."""
+        texts = ["caf\u00e9  au lait", "cafe\u0301 au lait ", "caf\u00e9 au lait"]
+        assert len(deduplicate(texts)[0]) == 3
+        unique, inverse = deduplicate(texts, normalize=True)
+        assert unique == [texts[0]] and list(inverse) == [0, 0, 0]
+        assert normalization_key(texts[1]) == "caf\u00e9 au lait"
+
+    def test_encodes_each_text_once(self):
+        """compute_embeddings_batch should encode unique texts and scatter results."""
+        model = FakeModel()
+        texts = ["same text", "other", "same text", "same text"]
+        result = compute_embeddings_batch(texts, model=model, verbose=True)
+        assert sum(len(b) for b in model.batches) == 2
+        np.testing.assert_array_equal(np.stack(result), FakeModel().encode(texts))
+        result[0][0] = -1.0
+        assert result[2][0] != -1.0
+
+
+class CrashingModel(FakeModel):
+    """Fails once after a given number of encode calls."""
+
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        if len(self.batches) == self.fail_after:
+            self.fail_after = None
+            raise RuntimeError("simulated crash")
+        return super().encode(texts, batch_size, convert_to_numpy)
+
+
+def corpus(n):
+    return (f"sentence number {i} with words {'x ' * (i % 7)}" for i in range(n))
+
+
+class TestStreaming:
+    """Tests for iter_embeddings and embed_to_memmap."""
+
+    def test_iter_embeddings_blocks(self):
+        """Blocks should cover a generator in order with the right offsets."""
+        blocks = list(iter_embeddings(corpus(10), model=FakeModel(), chunk_size=4))
+        assert [start for start, _ in blocks] == [0, 4, 8]
+        stacked = np.concatenate([block for _, block in blocks])
+        np.testing.assert_array_equal(stacked, FakeModel().encode(list(corpus(10))))
+
+    def test_embed_to_memmap(self, tmp_path):
+        """The memmap should hold every embedding in input order."""
+        path = tmp_path / 'embeddings.f32'
+        matrix = embed_to_memmap(corpus(25), path, num_rows=25, model=FakeModel(), chunk_size=8)
+        assert matrix.shape == (25, 16) and matrix.dtype == np.float32
+        np.testing.assert_array_equal(matrix, FakeModel().encode(list(corpus(25))))
+        assert path.stat().st_size == 25 * 16 * 4
+
+    def test_resume_after_crash(self, tmp_path):
+        """A rerun should only encode the chunks the crashed run did not finish."""
+        path = tmp_path / 'embeddings.f32'
+        with pytest.raises(RuntimeError):
+            embed_to_memmap(corpus(25), path, num_rows=25, model=CrashingModel(fail_after=2),
+                            chunk_size=8, max_tokens=10 ** 6)
+
+        model = FakeModel()
+        matrix = embed_to_memmap(corpus(25), path, num_rows=25, model=model,
+                                 chunk_size=8, max_tokens=10 ** 6)
+        assert sum(len(b) for b in model.batches) == 25 - 16
+        np.testing.assert_array_equal(matrix, FakeModel().encode(list(corpus(25))))
+
+    def test_row_count_mismatch(self, tmp_path):
+        """Too few texts for num_rows should be an error."""
+        with pytest.raises(ValueError):
+            embed_to_memmap(corpus(5), tmp_path / 'e.f32', num_rows=10, model=FakeModel())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
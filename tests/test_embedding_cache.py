@@ -0,0 +1,347 @@
+"""
+Unit tests for embedding_cache.py
+
+Tests cover:
+- Hits, misses and persistence across cache instances
+- Automatic invalidation when model weights change
+- Size cap with least-recently-used eviction
+- CachedEncoder keeping the SentenceTransformer encode() contract
+- In-process LRU memo with a byte budget
+"""
+import pytest
+import sys
+import hashlib
+import multiprocessing
+import os
+import threading
+import numpy as np
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from embedding_cache import (
+    CachedEncoder,
+    EmbeddingCache,
+    EmbeddingMemo,
+    cached_encode,
+    memoize_embedding,
+    memoize_embeddings_batch,
+    model_fingerprint,
+    open_cache
+)
+
+DIM = 8
+
+
+def fake_embedding(text):
+    rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+    return rng.standard_normal(DIM).astype(np.float32)
+
+
+class CountingModel:
+    """Fake model counting every text it encodes."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        if isinstance(sentences, str):
+            self.encoded.append(sentences)
+            return fake_embedding(sentences)
+        self.encoded.extend(sentences)
+        return np.array([fake_embedding(t) for t in sentences], dtype=np.float32).reshape(-1, DIM)
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    path = tmp_path / 'model'
+    path.mkdir()
+    (path / 'model.safetensors').write_bytes(b'weights-v1')
+    return path
+
+
+class TestEmbeddingCache:
+    """Tests for EmbeddingCache."""
+
+    def test_miss_then_hit(self, tmp_path):
+        """A stored embedding should be returned unchanged."""
+        cache = EmbeddingCache(tmp_path / 'c')
+        assert cache.get('hello') is None
+        cache.put('hello', fake_embedding('hello'))
+        cache.flush()
+        np.testing.assert_array_equal(cache.get('hello'), fake_embedding('hello'))
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_persists_across_instances(self, tmp_path):
+        """A new instance should read what an earlier one flushed."""
+        cache = EmbeddingCache(tmp_path / 'c')
+        cache.put_many(['a', 'b'], [fake_embedding('a'), fake_embedding('b')])
+        cache.flush()
+
+        reopened = EmbeddingCache(tmp_path / 'c')
+        assert len(reopened) == 2
+        np.testing.assert_array_equal(reopened.get('b'), fake_embedding('b'))
+
+    def test_exact_text_keys(self, tmp_path):
+        """Texts differing only in whitespace or case are separate entries."""
+        cache = EmbeddingCache(tmp_path / 'c')
+        cache.put('Hello', fake_embedding('Hello'))
+        assert 'Hello' in cache
+        assert 'hello' not in cache and 'Hello ' not in cache
+
+    def test_dimension_mismatch(self, tmp_path):
+        """Mixing embedding sizes should be rejected."""
+        cache = EmbeddingCache(tmp_path / 'c')
+        cache.put('a', np.zeros(DIM))
+        with pytest.raises(ValueError):
+            cache.put('b', np.zeros(DIM + 1))
+
+    def test_eviction_keeps_recently_used(self, tmp_path):
+        """Over the cap, least recently used rows should be evicted."""
+        cache = EmbeddingCache(tmp_path / 'c', max_bytes=10 * DIM * 4)
+        texts = [f"text {i}" for i in range(10)]
+        cache.put_many(texts, [fake_embedding(t) for t in texts])
+        cache.flush()
+
+        cache.get('text 0')  # now the most recently used
+        cache.put('new', fake_embedding('new'))
+        cache.flush()
+
+        assert cache.stats()['bytes'] <= cache.max_bytes
+        assert cache.stats()['evictions'] > 0
+        assert 'text 0' in cache and 'new' in cache
+        assert len(cache) == 8
+        np.testing.assert_array_equal(EmbeddingCache(tmp_path / 'c').get('text 0'),
+                                      fake_embedding('text 0'))
+
+    def test_truncated_vectors_reset(self, tmp_path):
+        """A vectors file shorter than the index should be ignored."""
+        cache = EmbeddingCache(tmp_path / 'c')
+        cache.put('a', fake_embedding('a'))
+        cache.flush()
+        cache.vectors_path.write_bytes(b'')
+        assert len(EmbeddingCache(tmp_path / 'c')) == 0
+
+
+def stable_embedding(text):
+    """Like fake_embedding, but identical in every process (no hash randomization)."""
+    return np.frombuffer(hashlib.sha256(text.encode('utf-8')).digest()[:DIM], dtype=np.uint8).astype(np.float32)
+
+
+def write_from_process(directory, prefix, count):
+    cache = EmbeddingCache(directory)
+    for i in range(count):
+        text = f"{prefix} {i}"
+        cache.put(text, stable_embedding(text))
+        cache.flush()
+
+
+class TestConcurrentWriters:
+    """Tests for several processes sharing one cache directory."""
+
+    def test_second_writer_appends_after_first(self, tmp_path):
+        """Two instances opened before either flushed should not overwrite each other."""
+        first, second = EmbeddingCache(tmp_path / 'c'), EmbeddingCache(tmp_path / 'c')
+        first.put('a', stable_embedding('a'))
+        first.flush()
+        second.put('b', stable_embedding('b'))
+        second.flush()
+
+        reopened = EmbeddingCache(tmp_path / 'c')
+        np.testing.assert_array_equal(reopened.get('a'), stable_embedding('a'))
+        np.testing.assert_array_equal(reopened.get('b'), stable_embedding('b'))
+        np.testing.assert_array_equal(second.get('a'), stable_embedding('a'))
+
+    def test_stale_reader_after_eviction(self, tmp_path):
+        """An instance whose index predates another's eviction should still read correct rows."""
+        reader = EmbeddingCache(tmp_path / 'c')
+        writer = EmbeddingCache(tmp_path / 'c', max_bytes=10 * DIM * 4)
+        texts = [f"text {i}" for i in range(10)]
+        writer.put_many(texts, [stable_embedding(t) for t in texts])
+        writer.flush()
+        reader = EmbeddingCache(tmp_path / 'c')
+
+        writer.put_many(['x', 'y'], [stable_embedding('x'), stable_embedding('y')])
+        writer.flush()
+        assert writer.stats()['evictions'] > 0
+        for text in texts:
+            np.testing.assert_array_equal(reader.get(text), stable_embedding(text))
+
+        reader.put('z', stable_embedding('z'))
+        reader.flush()
+        reopened = EmbeddingCache(tmp_path / 'c')
+        for text in ['x', 'y', 'z']:
+            np.testing.assert_array_equal(reopened.get(text), stable_embedding(text))
+
+    def test_parallel_processes(self, tmp_path):
+        """Processes flushing at the same time should keep every row correct."""
+        context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+        workers = [context.Process(target=write_from_process, args=(tmp_path / 'c', f"p{n}", 40))
+                   for n in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            assert worker.exitcode == 0
+
+        cache = EmbeddingCache(tmp_path / 'c')
+        assert len(cache) == 120
+        for n in range(3):
+            for i in range(40):
+                text = f"p{n} {i}"
+                np.testing.assert_array_equal(cache.get(text), stable_embedding(text))
+
+
+class TestInvalidation:
+    """Tests for model fingerprints."""
+
+    def test_fingerprint_changes_with_weights(self, model_dir):
+        """Rewriting the weights should change the fingerprint."""
+        before = model_fingerprint(model_dir)
+        (model_dir / 'model.safetensors').write_bytes(b'weights-v2-longer')
+        assert model_fingerprint(model_dir) != before
+
+    def test_fingerprint_depends_on_backend(self, model_dir):
+        """torch and onnx embeddings are cached separately."""
+        assert model_fingerprint(model_dir, 'torch') != model_fingerprint(model_dir, 'onnx')
+
+    def test_new_weights_start_empty_and_drop_old(self, model_dir, tmp_path):
+        """Opening after a weights change should not see or keep old entries."""
+        cache = open_cache(model_dir, cache_dir=tmp_path / 'cache')
+        cache.put('a', fake_embedding('a'))
+        cache.flush()
+        old_dir = cache.directory
+
+        (model_dir / 'model.safetensors').write_bytes(b'weights-v2-longer')
+        fresh = open_cache(model_dir, cache_dir=tmp_path / 'cache')
+        assert 'a' not in fresh
+        assert not old_dir.exists()
+
+
+class TestCachedEncoding:
+    """Tests for cached_encode and CachedEncoder."""
+
+    def test_warm_run_encodes_nothing(self, tmp_path):
+        """The second pass should do zero forward passes."""
+        model = CountingModel()
+        texts = ['one', 'two', 'one', 'three']
+        first = cached_encode(texts, model.encode, EmbeddingCache(tmp_path / 'c'))
+        assert model.encoded == ['one', 'two', 'three']
+
+        model.encoded = []
+        second = cached_encode(texts, model.encode, EmbeddingCache(tmp_path / 'c'))
+        assert model.encoded == []
+        for a, b in zip(first, second):
+            np.testing.assert_array_equal(a, b)
+
+    def test_encoder_contract(self, tmp_path):
+        """Strings give (dim,), lists give (N, dim), other attributes forward."""
+        encoder = CachedEncoder(CountingModel(), EmbeddingCache(tmp_path / 'c'))
+        assert encoder.encode('hi').shape == (DIM,)
+        assert encoder.encode(['hi', 'there']).shape == (2, DIM)
+        assert encoder.get_sentence_embedding_dimension() == DIM
+        assert encoder.model.encoded == ['hi', 'there']
+
+    def test_encoder_output_kwargs_bypass_cache(self, tmp_path):
+        """Kwargs that change the output should reach the model and never be served from the cache."""
+        class NormalizingModel(CountingModel):
+            def encode(self, texts, normalize_embeddings=False, **kwargs):
+                vectors = super().encode(texts, **kwargs)
+                if normalize_embeddings:
+                    vectors = vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+                return vectors
+
+        encoder = CachedEncoder(NormalizingModel(), EmbeddingCache(tmp_path / 'c'))
+        np.testing.assert_array_equal(encoder.encode(['hi'], batch_size=4)[0], fake_embedding('hi'))
+        normalized = encoder.encode(['hi'], normalize_embeddings=True)
+        assert np.linalg.norm(normalized[0]) == pytest.approx(1.0)
+        assert encoder.model.encoded == ['hi', 'hi']
+        assert 'hi' in encoder.cache and len(encoder.cache) == 1
+        np.testing.assert_array_equal(encoder.encode('hi', convert_to_numpy=True), fake_embedding('hi'))
+        assert encoder.model.encoded == ['hi', 'hi']
+
+
+class TestEmbeddingMemo:
+    """Tests for the in-process EmbeddingMemo."""
+
+    def test_byte_budget_evicts_lru(self):
+        """The memo should hold at most max_bytes, dropping the oldest first."""
+        memo = EmbeddingMemo(max_bytes=3 * DIM * 4)
+        for text in ['a', 'b', 'c']:
+            memo.put(text, fake_embedding(text))
+        memo.get('a')
+        memo.put('d', fake_embedding('d'))
+
+        info = memo.cache_info()
+        assert info.entries == 3 and info.currsize <= info.maxsize
+        assert memo.get('b') is None
+        assert memo.get('a') is not None
+
+    def test_returns_copies(self):
+        """Mutating a returned embedding must not change the memo."""
+        memo = EmbeddingMemo(max_bytes=1024)
+        memo.put('a', fake_embedding('a'))
+        memo.get('a')[:] = 0
+        np.testing.assert_array_equal(memo.get('a'), fake_embedding('a'))
+
+    def test_clear(self):
+        """cache_clear should drop entries and counters."""
+        memo = EmbeddingMemo(max_bytes=1024)
+        memo.put('a', fake_embedding('a'))
+        memo.get('a')
+        memo.cache_clear()
+        assert memo.cache_info() == (0, 0, 0, 0, 1024)
+
+    def test_memoize_embedding_matches_uncached(self):
+        """Memoized single-text calls equal direct calls and encode once."""
+        model = CountingModel()
+        compute = memoize_embedding(model.encode, EmbeddingMemo(max_bytes=1024))
+        for _ in range(5):
+            np.testing.assert_array_equal(compute('original'), fake_embedding('original'))
+        assert model.encoded == ['original']
+        assert compute.cache_info().hits == 4
+
+    def test_memoize_batch_only_encodes_new(self):
+        """Batch calls should pass only unseen texts to the model."""
+        model = CountingModel()
+        compute = memoize_embeddings_batch(model.encode, EmbeddingMemo(max_bytes=1024))
+        compute(['original', 'typo one'])
+        results = compute(['original', 'typo two'])
+        assert model.encoded == ['original', 'typo one', 'typo two']
+        np.testing.assert_array_equal(results[1], fake_embedding('typo two'))
+
+    def test_thread_safe(self):
+        """Concurrent puts and gets should keep the byte count consistent."""
+        memo = EmbeddingMemo(max_bytes=50 * DIM * 4)
+
+        def worker(offset):
+            for i in range(200):
+                text = f"t{(i + offset) % 80}"
+                if memo.get(text) is None:
+                    memo.put(text, fake_embedding(text))
+
+        threads = [threading.Thread(target=worker, args=(n * 7,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        info = memo.cache_info()
+        assert info.currsize == info.entries * DIM * 4 <= info.maxsize
+
+    def test_encoder_with_memo_only(self):
+        """CachedEncoder should work with a memo and no disk cache."""
+        encoder = CachedEncoder(CountingModel(), memo=EmbeddingMemo(max_bytes=1024))
+        encoder.encode('original')
+        encoder.encode(['original', 'typo'])
+        assert encoder.model.encoded == ['original', 'typo']
+        assert encoder.encode([]).shape[0] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,171 @@
+"""
+Unit tests for embedding_daemon.py
+
+Tests cover:
+- Request/response protocol over the Unix socket
+- Client fallback when no daemon is running
+- calculate_distance thin client mode
+"""
+import pytest
+import sys
+import threading
+import tempfile
+import numpy as np
+from pathlib import Path
+from unittest.mock import patch
+
+# Add project root, scripts and embeddings to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+sys.path.append(str(base_dir / 'scripts'))
+sys.path.append(str(base_dir / '.claude' / 'skills' / 'embeddings'))
+
+import embedding_daemon
+from embedding_daemon import (
+    DaemonUnavailableError,
+    EmbeddingDaemon,
+    is_daemon_running,
+    remote_distance,
+    remote_embed,
+    send_request
+)
+
+pytestmark = pytest.mark.skipif(not hasattr(embedding_daemon.socket, 'AF_UNIX'),
+                                reason="Unix domain sockets not available")
+
+
+class FakeModel:
+    """Deterministic stand-in for SentenceTransformer.encode."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, convert_to_numpy=True):
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            vec = np.zeros(384, dtype=np.float32)
+            for i, ch in enumerate(text.encode('utf-8')):
+                vec[(i * 31 + ch) % 384] += 1.0
+            vec[0] += 1.0  # Never all-zero
+            vectors.append(vec)
+        return np.stack(vectors)
+
+
+@pytest.fixture
+def running_daemon():
+    """Start a daemon with a fake model on a temporary socket."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = Path(tmpdir) / 'daemon.sock'
+        model = FakeModel()
+        server = EmbeddingDaemon(socket_path, model)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield socket_path, model
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join(timeout=5)
+
+
+class TestDaemonProtocol:
+    """Tests for the daemon request/response protocol."""
+
+    def test_ping(self, running_daemon):
+        """Daemon should answer pings."""
+        socket_path, _ = running_daemon
+        assert is_daemon_running(socket_path)
+
+    def test_embed_returns_vectors(self, running_daemon):
+        """Embed should return one 384-dim vector per text."""
+        socket_path, _ = running_daemon
+        embeddings = remote_embed(["Hello world", "Bonjour"], socket_path=socket_path)
+        assert len(embeddings) == 2
+        assert all(len(e) == 384 for e in embeddings)
+
+    def test_embed_matches_model(self, running_daemon):
+        """Embeddings should round-trip without loss."""
+        socket_path, model = running_daemon
+        remote = np.array(remote_embed(["Test sentence"], socket_path=socket_path), dtype=np.float32)
+        local = FakeModel().encode(["Test sentence"])
+        np.testing.assert_array_equal(remote, local)
+
+    def test_distance_identical_sentences(self, running_daemon):
+        """Identical sentences should have zero distance."""
+        socket_path, _ = running_daemon
+        assert abs(remote_distance("Same", "Same", socket_path=socket_path)) < 1e-6
+
+    def test_distance_uses_single_forward_pass(self, running_daemon):
+        """Both sentences should be encoded in one batch."""
+        socket_path, model = running_daemon
+        remote_distance("One", "Two", socket_path=socket_path)
+        assert model.calls == 1
+
+    def test_unknown_op_reports_error(self, running_daemon):
+        """Unknown operations should be rejected, not crash the daemon."""
+        socket_path, _ = running_daemon
+        with pytest.raises(DaemonUnavailableError, match="Unknown op"):
+            send_request({'op': 'bogus'}, socket_path=socket_path)
+        assert is_daemon_running(socket_path)
+
+    def test_invalid_texts_reports_error(self, running_daemon):
+        """Non-string input should be rejected."""
+        socket_path, _ = running_daemon
+        with pytest.raises(DaemonUnavailableError):
+            send_request({'op': 'embed', 'texts': [1, 2]}, socket_path=socket_path)
+
+
+class TestClientFallback:
+    """Tests for client behavior without a daemon."""
+
+    def test_missing_socket_raises(self):
+        """Client should raise when no socket exists."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with pytest.raises(DaemonUnavailableError):
+                remote_distance("a", "b", socket_path=Path(tmpdir) / 'missing.sock')
+
+    def test_is_daemon_running_false(self):
+        """Should report no daemon for a missing socket."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            assert not is_daemon_running(Path(tmpdir) / 'missing.sock')
+
+    def test_socket_path_env_override(self):
+        """EMBEDDING_DAEMON_SOCKET should override the default path."""
+        with patch.dict('os.environ', {'EMBEDDING_DAEMON_SOCKET': '/tmp/custom.sock'}):
+            assert embedding_daemon.get_default_socket_path() == Path('/tmp/custom.sock')
+
+
+class TestCalculateDistanceClientMode:
+    """Tests for calculate_distance using the daemon."""
+
+    def test_uses_daemon_when_running(self, running_daemon):
+        """calculate_distance should not load the model when a daemon answers."""
+        socket_path, model = running_daemon
+        from calculate_distance import calculate_distance
+
+        with patch.dict('os.environ', {'EMBEDDING_DAEMON_SOCKET': str(socket_path)}):
+            with patch('calculate_distance._calculate_distance_in_process') as in_process:
+                result = calculate_distance("Hello world", "Hello world")
+
+        in_process.assert_not_called()
+        assert isinstance(result, float)
+        assert abs(result) < 1e-6
+
+    def test_falls_back_without_daemon(self):
+        """calculate_distance should load in-process when no daemon is running."""
+        from calculate_distance import calculate_distance
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            missing = str(Path(tmpdir) / 'missing.sock')
+            with patch.dict('os.environ', {'EMBEDDING_DAEMON_SOCKET': missing}):
+                with patch('calculate_distance._calculate_distance_in_process',
+                           return_value=0.25) as in_process:
+                    result = calculate_distance("a", "b")
+
+        in_process.assert_called_once_with("a", "b")
+        assert result == 0.25
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,257 @@
+"""
+Unit tests for model_fetch.py
+
+Tests run end-to-end against a local http.server mirror with the Hub layout:
+- Manifest parsing and per-backend file selection
+- Parallel range downloads with checksum verification
+- Resuming an interrupted download
+- Rejecting corrupted files
+- Connections dropped mid-body surfacing as FetchError
+"""
+import pytest
+import sys
+import json
+import hashlib
+import os
+import re
+import socket
+import struct
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from model_fetch import (
+    FetchError,
+    fetch_manifest,
+    fetch_model,
+    file_checksum_ok,
+    select_files
+)
+
+REPO = 'sentence-transformers/all-MiniLM-L6-v2'
+CHUNK = 1024
+
+SMALL_FILES = {
+    'config.json': b'{"hidden_size": 384}',
+    'modules.json': b'[]',
+    'tokenizer.json': b'{"model": {}}',
+    'vocab.txt': b'[PAD]\n[UNK]\n',
+    '1_Pooling/config.json': b'{"pooling_mode_mean_tokens": true}',
+    'README.md': b'# not needed',
+}
+LARGE_FILES = {
+    'model.safetensors': os.urandom(10 * CHUNK + 17),
+    'pytorch_model.bin': os.urandom(3 * CHUNK),
+    'onnx/model.onnx': os.urandom(5 * CHUNK),
+    'tf_model.h5': os.urandom(4 * CHUNK),
+}
+
+
+class MirrorHandler(SimpleHTTPRequestHandler):
+    """Static file handler with single-range support and request logging."""
+
+    requests = []
+    fail_ranges_after = None
+    truncate_file = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        range_header = self.headers.get('Range')
+        type(self).requests.append((self.path, range_header))
+        if type(self).truncate_file and self.path.endswith(type(self).truncate_file):
+            return self.send_truncated(range_header)
+        if not range_header:
+            return super().do_GET()
+
+        limit = type(self).fail_ranges_after
+        ranged = sum(1 for _, r in type(self).requests if r)
+        if limit is not None and ranged > limit:
+            self.send_error(503)
+            return
+
+        path = Path(self.translate_path(self.path))
+        data = path.read_bytes()
+        start, end = map(int, re.match(r'bytes=(\d+)-(\d+)', range_header).groups())
+        body = data[start:end + 1]
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_truncated(self, range_header):
+        """Announce the full body, send half of it and reset the connection."""
+        data = Path(self.translate_path(self.path)).read_bytes()
+        if range_header:
+            start, end = map(int, re.match(r'bytes=(\d+)-(\d+)', range_header).groups())
+            data = data[start:end + 1]
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data[:len(data) // 2])
+        self.wfile.flush()
+        # Linger 0 makes close() send RST, like a proxy or server dropping the transfer
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        self.connection.close()
+        self.close_connection = True
+
+
+def git_blob_sha1(data):
+    return hashlib.sha1(f"blob {len(data)}\0".encode() + data).hexdigest()
+
+
+def build_mirror(root):
+    """Lay out files and the revision manifest like the Hub does."""
+    siblings = []
+    for name, data in SMALL_FILES.items():
+        siblings.append({'rfilename': name, 'size': len(data), 'blobId': git_blob_sha1(data)})
+    for name, data in LARGE_FILES.items():
+        siblings.append({'rfilename': name, 'size': len(data),
+                         'lfs': {'sha256': hashlib.sha256(data).hexdigest(), 'size': len(data)}})
+
+    for name, data in {**SMALL_FILES, **LARGE_FILES}.items():
+        path = root / REPO / 'resolve' / 'main' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    manifest_path = root / 'api' / 'models' / REPO / 'revision' / 'main'
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps({'siblings': siblings}))
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    root = tmp_path / 'mirror'
+    build_mirror(root)
+    MirrorHandler.requests = []
+    MirrorHandler.fail_ranges_after = None
+    MirrorHandler.truncate_file = None
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(MirrorHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv('HF_ENDPOINT', endpoint)
+    yield root
+    server.shutdown()
+    server.server_close()
+
+
+class TestManifest:
+    """Tests for manifest parsing and file selection."""
+
+    def test_fetch_manifest(self, mirror):
+        """Checksums should come from lfs for large files and blobId otherwise."""
+        manifest = fetch_manifest(REPO)
+        assert 'sha256' in manifest['model.safetensors']
+        assert 'git_sha1' in manifest['config.json']
+
+    def test_select_torch(self, mirror):
+        """Torch needs config files and safetensors only."""
+        files = select_files(fetch_manifest(REPO), 'torch')
+        assert 'model.safetensors' in files
+        assert not {'pytorch_model.bin', 'onnx/model.onnx', 'tf_model.h5', 'README.md'} & set(files)
+
+    def test_select_onnx(self, mirror):
+        """ONNX needs the ONNX graph and no torch weights."""
+        files = select_files(fetch_manifest(REPO), 'onnx')
+        assert 'onnx/model.onnx' in files
+        assert 'model.safetensors' not in files
+
+    def test_select_falls_back_to_bin(self):
+        """pytorch_model.bin is used when safetensors is not published."""
+        assert select_files({'pytorch_model.bin': {}}, 'torch') == ['pytorch_model.bin']
+
+    def test_select_missing_weights(self):
+        """A manifest without backend weights should fail clearly."""
+        with pytest.raises(FetchError):
+            select_files({'config.json': {}}, 'onnx')
+
+
+class TestFetchModel:
+    """End-to-end tests against the local mirror."""
+
+    def test_downloads_selected_files(self, mirror, tmp_path):
+        """Files should match the mirror byte for byte."""
+        target = tmp_path / 'model'
+        fetch_model(target, backend='torch', chunk_size=CHUNK, verbose=False)
+        assert (target / 'model.safetensors').read_bytes() == LARGE_FILES['model.safetensors']
+        assert (target / '1_Pooling' / 'config.json').read_bytes() == SMALL_FILES['1_Pooling/config.json']
+        assert not (target / 'tf_model.h5').exists()
+        assert not list(target.rglob('*.part*'))
+
+    def test_uses_range_requests(self, mirror, tmp_path):
+        """Large files should be fetched in chunk-sized ranges."""
+        fetch_model(tmp_path / 'model', chunk_size=CHUNK, verbose=False)
+        ranges = [r for p, r in MirrorHandler.requests if p.endswith('model.safetensors')]
+        assert len(ranges) == 11
+        assert all(r is not None for r in ranges)
+
+    def test_resumes_after_interruption(self, mirror, tmp_path):
+        """A second run should only request the chunks that are missing."""
+        target = tmp_path / 'model'
+        MirrorHandler.fail_ranges_after = 4
+        with pytest.raises(FetchError):
+            fetch_model(target, chunk_size=CHUNK, workers=1, verbose=False)
+        assert (target / 'model.safetensors.part').exists()
+
+        MirrorHandler.requests = []
+        MirrorHandler.fail_ranges_after = None
+        fetch_model(target, chunk_size=CHUNK, workers=1, verbose=False)
+        ranges = [r for p, r in MirrorHandler.requests if p.endswith('model.safetensors')]
+        assert len(ranges) == 11 - 4
+        assert (target / 'model.safetensors').read_bytes() == LARGE_FILES['model.safetensors']
+
+    def test_skips_verified_files(self, mirror, tmp_path):
+        """Rerunning with everything present should download nothing."""
+        target = tmp_path / 'model'
+        fetch_model(target, chunk_size=CHUNK, verbose=False)
+        MirrorHandler.requests = []
+        fetch_model(target, chunk_size=CHUNK, verbose=False)
+        assert all('/api/models/' in p for p, _ in MirrorHandler.requests)
+
+    def test_rejects_corrupt_file(self, mirror, tmp_path):
+        """A checksum mismatch should fail and leave no installed file."""
+        (mirror / REPO / 'resolve' / 'main' / 'config.json').write_bytes(b'{"tampered": 1}')
+        target = tmp_path / 'model'
+        with pytest.raises(FetchError, match='config.json'):
+            fetch_model(target, chunk_size=CHUNK, verbose=False)
+        assert not (target / 'config.json').exists()
+
+    def test_dropped_connection_in_range(self, mirror, tmp_path):
+        """A range response cut off mid-body should raise FetchError and keep the partial file."""
+        target = tmp_path / 'model'
+        MirrorHandler.truncate_file = 'model.safetensors'
+        with pytest.raises(FetchError, match='Connection lost'):
+            fetch_model(target, chunk_size=CHUNK, workers=1, verbose=False)
+        assert (target / 'model.safetensors.part').exists()
+        assert not (target / 'model.safetensors').exists()
+
+    def test_dropped_connection_whole_file(self, mirror, tmp_path):
+        """A whole-file response cut off mid-body should raise FetchError, not IncompleteRead."""
+        target = tmp_path / 'model'
+        MirrorHandler.truncate_file = 'config.json'
+        with pytest.raises(FetchError, match='Connection lost'):
+            fetch_model(target, chunk_size=len(LARGE_FILES['model.safetensors']), verbose=False)
+        assert not (target / 'config.json').exists()
+
+    def test_checksum_helper(self, tmp_path):
+        """git blob sha1 and sha256 entries should both verify."""
+        path = tmp_path / 'f'
+        path.write_bytes(b'abc')
+        assert file_checksum_ok(path, {'size': 3, 'git_sha1': git_blob_sha1(b'abc')})
+        assert file_checksum_ok(path, {'size': 3, 'sha256': hashlib.sha256(b'abc').hexdigest()})
+        assert not file_checksum_ok(path, {'size': 3, 'sha256': '0' * 64})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,287 @@
+"""
+Unit tests for model_loader.py
+
+Tests cover:
+- Lightweight helpers that must not load the model
+- Import-time cost (startup regression check)
+- Multi-model registry behind get_model()
+- Startup profiling mode
+"""
+import pytest
+import sys
+import subprocess
+import threading
+import time
+import types
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+import model_loader
+
+# Budget for `import model_loader` in a fresh interpreter. Importing
+# sentence-transformers (and torch with it) takes several seconds, so
+# anything near this limit means a heavy import crept back in.
+IMPORT_TIME_BUDGET_SECONDS = 0.5
+
+
+def run_in_fresh_interpreter(code):
+    """Run code in a new Python process from the project root."""
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True,
+        text=True,
+        timeout=60,
+        cwd=str(base_dir)
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+class TestStartupCost:
+    """Startup regression checks for `import model_loader`."""
+
+    def test_import_does_not_load_heavy_modules(self):
+        """Importing model_loader should not import torch or sentence-transformers."""
+        output = run_in_fresh_interpreter(
+            "import sys, model_loader\n"
+            "heavy = ['torch', 'transformers', 'sentence_transformers']\n"
+            "print(','.join(m for m in heavy if m in sys.modules))"
+        )
+        assert output == ''
+
+    def test_helpers_do_not_load_heavy_modules(self):
+        """Path and availability checks should stay import-free."""
+        output = run_in_fresh_interpreter(
+            "import sys, model_loader\n"
+            "model_loader.get_default_model_path()\n"
+            "model_loader.is_offline_mode()\n"
+            "model_loader.check_model_available()\n"
+            "print('torch' in sys.modules or 'sentence_transformers' in sys.modules)"
+        )
+        assert output == 'False'
+
+    def test_import_time_within_budget(self):
+        """`import model_loader` should stay well under the heavy-import cost."""
+        output = run_in_fresh_interpreter(
+            "import time\n"
+            "start = time.perf_counter()\n"
+            "import model_loader\n"
+            "print(time.perf_counter() - start)"
+        )
+        assert float(output) < IMPORT_TIME_BUDGET_SECONDS
+
+
+class TestLightweightHelpers:
+    """Tests for helpers that do not need the model."""
+
+    def test_model_path_env_override(self):
+        """MODEL_LOCAL_PATH should take precedence."""
+        with patch.dict('os.environ', {'MODEL_LOCAL_PATH': '/tmp/some-model'}):
+            assert model_loader.get_default_model_path() == Path('/tmp/some-model')
+
+    def test_offline_mode(self):
+        """HF_HUB_OFFLINE=1 should enable offline mode."""
+        with patch.dict('os.environ', {'HF_HUB_OFFLINE': '1'}):
+            assert model_loader.is_offline_mode()
+        with patch.dict('os.environ', {'HF_HUB_OFFLINE': '0'}):
+            assert not model_loader.is_offline_mode()
+
+    def test_is_ssl_error(self):
+        """SSL failures should be recognized from their message."""
+        assert model_loader.is_ssl_error(Exception("SSL: CERTIFICATE_VERIFY_FAILED"))
+        assert not model_loader.is_ssl_error(Exception("Connection reset"))
+
+    def test_missing_package_raises_model_load_error(self):
+        """Loading without sentence-transformers should raise ModelLoadError."""
+        with patch.object(model_loader, 'SENTENCE_TRANSFORMERS_AVAILABLE', False):
+            with pytest.raises(model_loader.ModelLoadError):
+                model_loader.load_model_from_local(Path('/nonexistent'), verbose=False)
+
+
+class FakeModel:
+    """Stand-in for a loaded model with a known size."""
+
+    def __init__(self, name, size_bytes=1000):
+        self.name = name
+        self.size_bytes = size_bytes
+
+
+def fake_load_model(load_delay=0.0, sizes=None):
+    """Build a load_model replacement that records its calls."""
+    calls = []
+    lock = threading.Lock()
+
+    def _load(model_name='all-MiniLM-L6-v2', local_path=None, verbose=True,
+              fail_on_error=True, backend='torch', device=None, **kwargs):
+        with lock:
+            calls.append((model_name, backend, device))
+        time.sleep(load_delay)
+        return FakeModel(model_name, (sizes or {}).get(model_name, 1000))
+
+    return _load, calls
+
+
+@pytest.fixture
+def registry():
+    """Fresh registry that reads model sizes from FakeModel.size_bytes."""
+    with patch.object(model_loader, 'estimate_model_bytes', lambda m: m.size_bytes):
+        yield model_loader.ModelRegistry()
+
+
+class TestModelRegistry:
+    """Tests for ModelRegistry."""
+
+    def test_same_key_returns_cached_model(self, registry):
+        """Repeated calls with the same arguments should not reload."""
+        load, calls = fake_load_model()
+        with patch.object(model_loader, 'load_model', load):
+            first = registry.get('model-a', local_path=Path('/m/a'))
+            second = registry.get('model-a', local_path=Path('/m/a'))
+        assert first is second
+        assert len(calls) == 1
+
+    def test_different_models_are_not_confused(self, registry):
+        """A different model name should load a different model."""
+        load, calls = fake_load_model()
+        with patch.object(model_loader, 'load_model', load):
+            model_a = registry.get('model-a', local_path=Path('/m/a'))
+            model_b = registry.get('model-b', local_path=Path('/m/b'))
+        assert model_a.name == 'model-a'
+        assert model_b.name == 'model-b'
+        assert len(calls) == 2
+
+    def test_backend_and_device_are_part_of_key(self, registry):
+        """Backends and devices should be cached separately."""
+        load, calls = fake_load_model()
+        with patch.object(model_loader, 'load_model', load):
+            registry.get('model-a', local_path=Path('/m/a'), backend='torch')
+            registry.get('model-a', local_path=Path('/m/a'), backend='onnx')
+            registry.get('model-a', local_path=Path('/m/a'), device='cpu')
+        assert len(calls) == 3
+
+    def test_concurrent_first_calls_load_once(self, registry):
+        """Concurrent first requests for one key should share a single load."""
+        load, calls = fake_load_model(load_delay=0.2)
+        results = []
+        with patch.object(model_loader, 'load_model', load):
+            threads = [
+                threading.Thread(target=lambda: results.append(
+                    registry.get('model-a', local_path=Path('/m/a'))))
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+
+    def test_lru_eviction_over_budget(self, registry):
+        """Least recently used models should be evicted when over budget."""
+        registry.set_memory_budget(2500)
+        load, calls = fake_load_model()
+        with patch.object(model_loader, 'load_model', load):
+            registry.get('model-a', local_path=Path('/m/a'))
+            registry.get('model-b', local_path=Path('/m/b'))
+            registry.get('model-a', local_path=Path('/m/a'))  # a is now most recent
+            registry.get('model-c', local_path=Path('/m/c'))  # evicts b
+        loaded = [info['model_name'] for info in registry.info()]
+        assert loaded == ['model-a', 'model-c']
+
+    def test_force_reload(self, registry):
+        """force_reload should load a fresh model."""
+        load, calls = fake_load_model()
+        with patch.object(model_loader, 'load_model', load):
+            first = registry.get('model-a', local_path=Path('/m/a'))
+            second = registry.get('model-a', local_path=Path('/m/a'), force_reload=True)
+        assert first is not second
+        assert len(calls) == 2
+
+    def test_info_reports_hits_and_load_time(self, registry):
+        """info() should report hit counts, load time and size estimate."""
+        load, _ = fake_load_model(load_delay=0.01, sizes={'model-a': 2 * 1024 * 1024})
+        with patch.object(model_loader, 'load_model', load):
+            for _ in range(3):
+                registry.get('model-a', local_path=Path('/m/a'))
+        info = registry.info()[0]
+        assert info['hits'] == 2
+        assert info['load_time_s'] >= 0.01
+        assert info['rss_estimate_mb'] == pytest.approx(2.0)
+        assert info['backend'] == 'torch'
+
+    def test_get_model_uses_registry(self):
+        """get_model should delegate to the process-wide registry."""
+        load, calls = fake_load_model()
+        with patch.object(model_loader, '_registry', model_loader.ModelRegistry()):
+            with patch.object(model_loader, 'load_model', load):
+                model_loader.get_model('model-a', local_path=Path('/m/a'))
+                model_loader.get_model('model-a', local_path=Path('/m/a'))
+                assert len(model_loader.get_loaded_models()) == 1
+        assert len(calls) == 1
+
+
+class TestStartupProfile:
+    """Tests for profile_startup (heavy packages replaced by stand-ins)."""
+
+    @pytest.fixture
+    def fake_packages(self):
+        transformers = types.ModuleType('transformers')
+        transformers.__version__ = '0.test'
+        transformers.AutoTokenizer = MagicMock()
+        transformers.AutoModel = MagicMock()
+        modules = {
+            'torch': types.ModuleType('torch'),
+            'transformers': transformers,
+            'sentence_transformers': types.ModuleType('sentence_transformers'),
+        }
+        with patch.dict(sys.modules, modules):
+            yield transformers
+
+    def test_reports_all_phases(self, fake_packages):
+        """Profile should contain every cold-start phase and steady-state stats."""
+        model = MagicMock()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.object(model_loader, 'load_model', return_value=model):
+                profile = model_loader.profile_startup(local_path=Path(tmpdir), steady_state_runs=5)
+
+        expected = ['import_torch', 'import_transformers', 'import_sentence_transformers',
+                    'model_load', 'first_encode']
+        assert list(profile['phases']) == expected
+        assert list(profile['model_load_breakdown']) == ['path_discovery', 'tokenizer_init', 'weight_load']
+        assert all(v >= 0 for v in profile['phases'].values())
+        assert profile['steady_state_encode']['runs'] == 5
+        assert model.encode.call_count == 6
+        assert profile['versions']['transformers'] == '0.test'
+
+    def test_profile_is_json_serializable(self, fake_packages):
+        """Profile should be writable as JSON."""
+        import json
+        with patch.object(model_loader, 'load_model', return_value=MagicMock()):
+            profile = model_loader.profile_startup(local_path=Path('/nonexistent'), steady_state_runs=2)
+        assert profile['model_load_breakdown']['tokenizer_init'] is None
+        json.dumps(profile)
+
+    def test_total_excludes_breakdown(self, fake_packages):
+        """total_cold_start should sum the top-level phases only, not model_load's breakdown."""
+        fake_packages.AutoModel.from_pretrained.side_effect = lambda path: time.sleep(0.05)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.object(model_loader, 'load_model', return_value=MagicMock()):
+                profile = model_loader.profile_startup(local_path=Path(tmpdir), steady_state_runs=1)
+        assert profile['model_load_breakdown']['weight_load'] >= 0.05
+        assert profile['total_cold_start'] == pytest.approx(sum(profile['phases'].values()))
+        assert profile['total_cold_start'] < 0.05
+
+    def test_load_failure_raises(self, fake_packages):
+        """A model that cannot load should raise ModelLoadError."""
+        with patch.object(model_loader, 'load_model', return_value=None):
+            with pytest.raises(model_loader.ModelLoadError):
+                model_loader.profile_startup(local_path=Path('/nonexistent'))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,145 @@
+"""
+Unit tests for model_tuning.py
+
+Tests cover:
+- Warmup encodes at several lengths and batch sizes
+- Auto-tuning picks the fastest thread/batch setting
+- Host profile save/load/apply
+- The tuned batch size reaching length-bucketed encoding as a token budget
+"""
+import pytest
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+import model_tuning
+from embedding_batching import encode_length_bucketed
+from model_tuning import (
+    apply_host_profile,
+    auto_tune,
+    default_thread_candidates,
+    load_host_profile,
+    save_host_profile,
+    warmup_model
+)
+
+
+class FakeModel:
+    """Records encode calls; larger batches are faster."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.calls.append((len(texts), batch_size))
+        time.sleep(0.0005 * len(texts) / batch_size)
+        return [[0.0] * 4 for _ in texts]
+
+
+@pytest.fixture
+def profile_path(tmp_path, monkeypatch):
+    path = tmp_path / 'host_profile.json'
+    monkeypatch.setenv('MODEL_HOST_PROFILE', str(path))
+    return path
+
+
+@pytest.fixture
+def thread_calls(monkeypatch):
+    """Capture thread configuration instead of touching torch."""
+    calls = []
+    monkeypatch.setattr(model_tuning, 'configure_torch_threads',
+                        lambda intra, inter=None: calls.append(intra))
+    return calls
+
+
+class TestWarmup:
+    """Tests for warmup_model."""
+
+    def test_covers_lengths_and_batches(self):
+        """Every length/batch combination should be encoded once."""
+        model = FakeModel()
+        warmup_model(model, lengths=(8, 64), batch_sizes=(1, 4))
+        assert model.calls == [(1, 1), (4, 4), (1, 1), (4, 4)]
+
+    def test_sentence_length(self):
+        """Warmup sentences should have the requested word count."""
+        assert len(model_tuning.make_warmup_sentence(37).split()) == 37
+
+
+class TestAutoTune:
+    """Tests for auto_tune."""
+
+    def test_thread_candidates(self):
+        """Powers of two up to the CPU count, ending at the CPU count."""
+        assert default_thread_candidates(6) == [1, 2, 4, 6]
+        assert default_thread_candidates(1) == [1]
+
+    def test_picks_fastest_batch(self, thread_calls):
+        """The largest batch is fastest for the fake model."""
+        best = auto_tune(FakeModel(), thread_candidates=[1, 2], batch_sizes=(1, 16),
+                         corpus_size=16, repeats=1)
+        assert best['batch_size'] == 16
+        assert best['max_tokens'] == 16 * max(model_tuning.token_lengths(FakeModel(), [
+            model_tuning.make_warmup_sentence(n) for n in model_tuning.TUNING_LENGTHS]))
+        assert best['inter_op_threads'] == 1
+        assert thread_calls[-1] == best['intra_op_threads']
+
+
+class TestHostProfile:
+    """Tests for host profile persistence."""
+
+    def test_missing_profile(self, profile_path):
+        """An untuned host has no profile."""
+        assert load_host_profile(Path('/models/x')) is None
+
+    def test_save_and_load(self, profile_path):
+        """Saved settings should round-trip per model path."""
+        save_host_profile(Path('/models/a'), {'intra_op_threads': 2, 'batch_size': 16})
+        save_host_profile(Path('/models/b'), {'intra_op_threads': 4, 'batch_size': 32})
+        assert load_host_profile(Path('/models/a'))['batch_size'] == 16
+        assert load_host_profile(Path('/models/b'))['batch_size'] == 32
+        assert load_host_profile(Path('/models/a'), backend='onnx') is None
+
+    def test_apply(self, profile_path, thread_calls):
+        """Applying should set threads and the model's tuned token budget."""
+        save_host_profile(Path('/models/a'), {'intra_op_threads': 3, 'batch_size': 64, 'max_tokens': 5000})
+        model = FakeModel()
+        assert apply_host_profile(model, Path('/models/a')) is not None
+        assert thread_calls == [3]
+        assert model.tuned_max_tokens == 5000
+
+    def test_apply_old_profile(self, profile_path, thread_calls):
+        """Profiles without max_tokens should derive it from the batch size."""
+        save_host_profile(Path('/models/a'), {'intra_op_threads': 3, 'batch_size': 64})
+        model = FakeModel()
+        apply_host_profile(model, Path('/models/a'))
+        assert model.tuned_max_tokens == model_tuning.batch_size_to_max_tokens(model, 64)
+
+    def test_budget_used_by_bucketed_encoding(self, profile_path, thread_calls, monkeypatch):
+        """encode_length_bucketed should size batches by the tuned budget unless overridden."""
+        monkeypatch.delenv('EMBEDDING_BATCH_TOKENS', raising=False)
+        save_host_profile(Path('/models/a'), {'intra_op_threads': 1, 'batch_size': 4, 'max_tokens': 40})
+        model = FakeModel()
+        apply_host_profile(model, Path('/models/a'))
+        texts = ['one two three four five six'] * 20   # 10 tokens each
+
+        encode_length_bucketed(model, texts)
+        assert [size for _, size in model.calls] == [4] * 5
+
+        model.calls = []
+        monkeypatch.setenv('EMBEDDING_BATCH_TOKENS', '100')
+        encode_length_bucketed(model, texts)
+        assert [size for _, size in model.calls] == [10] * 2
+
+    def test_corrupt_profile_ignored(self, profile_path):
+        """A corrupt profile file should be treated as empty."""
+        profile_path.write_text('{not json')
+        assert load_host_profile(Path('/models/a')) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
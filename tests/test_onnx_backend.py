@@ -0,0 +1,110 @@
+"""
+Unit tests for onnx_backend.py
+
+Tests cover:
+- Pooling and normalization helpers
+- Backend selection in model_loader
+- Equivalence with the torch backend on the 21 experiment pairs
+"""
+import pytest
+import sys
+import numpy as np
+from pathlib import Path
+
+# Add project root and scripts to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+sys.path.append(str(base_dir / 'scripts'))
+sys.path.append(str(base_dir / '.claude' / 'skills' / 'embeddings'))
+
+import model_loader
+from onnx_backend import get_onnx_model_path, is_onnx_available, l2_normalize, mean_pooling
+
+# Maximum allowed |d_onnx - d_torch| for the cosine distance of a pair.
+# ONNX Runtime fuses attention/layernorm kernels, so results differ from
+# torch only by float32 rounding (typically ~1e-6).
+DISTANCE_TOLERANCE = 1e-4
+
+
+def cosine_distance(vec1, vec2):
+    return float(1 - np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+
+
+class TestPoolingHelpers:
+    """Tests for the numpy pooling helpers."""
+
+    def test_mean_pooling_ignores_padding(self):
+        """Padded positions should not affect the mean."""
+        tokens = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]])
+        mask = np.array([[1, 1, 0]])
+        pooled = mean_pooling(tokens, mask)
+        np.testing.assert_allclose(pooled, [[2.0, 3.0]])
+
+    def test_mean_pooling_shape(self):
+        """Should return one vector per batch row."""
+        tokens = np.random.rand(4, 7, 384).astype(np.float32)
+        mask = np.ones((4, 7), dtype=np.int64)
+        assert mean_pooling(tokens, mask).shape == (4, 384)
+
+    def test_l2_normalize_unit_norm(self):
+        """Rows should have unit length."""
+        vectors = np.random.rand(5, 384).astype(np.float32)
+        norms = np.linalg.norm(l2_normalize(vectors), axis=1)
+        np.testing.assert_allclose(norms, 1.0, rtol=1e-5)
+
+    def test_onnx_path_inside_model_dir(self):
+        """The exported graph should be cached next to the model files."""
+        assert get_onnx_model_path(Path('/models/m')) == Path('/models/m/onnx/model.onnx')
+
+
+class TestBackendSelection:
+    """Tests for the backend option in model_loader."""
+
+    def test_invalid_backend_raises(self):
+        """Unknown backends should be rejected."""
+        with pytest.raises(ValueError, match="Unknown backend"):
+            model_loader.load_model(backend='tensorflow', verbose=False, fail_on_error=False)
+
+
+@pytest.mark.skipif(not is_onnx_available(), reason="onnxruntime/tokenizers not installed")
+@pytest.mark.skipif(not model_loader.check_model_available(), reason="local model not installed")
+class TestOnnxEquivalence:
+    """ONNX backend should match the torch backend."""
+
+    @pytest.fixture(scope='class')
+    def models(self):
+        torch_model = model_loader.load_model(verbose=False, backend='torch')
+        onnx_model = model_loader.load_model(verbose=False, backend='onnx')
+        return torch_model, onnx_model
+
+    def test_encode_single_shape(self, models):
+        """A single string should produce a 384-dim float32 vector."""
+        _, onnx_model = models
+        emb = onnx_model.encode("Hello world")
+        assert emb.shape == (384,)
+        assert emb.dtype == np.float32
+
+    def test_encode_batch_shape(self, models):
+        """A list should produce an (N, 384) matrix."""
+        _, onnx_model = models
+        assert onnx_model.encode(["One", "Two", "Three"]).shape == (3, 384)
+
+    def test_experiment_pair_distances_match(self, models):
+        """Cosine distances on the 21 experiment pairs should match within tolerance."""
+        from batch_calculate_distances import sentences
+
+        torch_model, onnx_model = models
+        originals = [s['original'] for s in sentences]
+        finals = [s['final'] for s in sentences]
+
+        torch_orig, torch_final = torch_model.encode(originals), torch_model.encode(finals)
+        onnx_orig, onnx_final = onnx_model.encode(originals), onnx_model.encode(finals)
+
+        for i in range(len(sentences)):
+            d_torch = cosine_distance(torch_orig[i], torch_final[i])
+            d_onnx = cosine_distance(onnx_orig[i], onnx_final[i])
+            assert abs(d_torch - d_onnx) < DISTANCE_TOLERANCE, f"pair {sentences[i]['id']}"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
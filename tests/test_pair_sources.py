@@ -0,0 +1,136 @@
+"""
+Unit tests for pair_sources.py
+
+Tests cover:
+- Reading each supported format, including the experiment's own data files
+- Format detection and validation
+- Lazy, bounded-size chunking
+"""
+import pytest
+import sys
+import json
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from pair_sources import (
+    detect_format,
+    iter_pair_chunks,
+    iter_pairs,
+    iter_sentence_file_pairs
+)
+
+DATA_DIR = base_dir / 'data' / 'experiment_raw_data'
+
+
+class TestExperimentData:
+    """Tests against the files shipped in data/experiment_raw_data."""
+
+    def test_pipe_file(self):
+        """The analysis file should give 21 pairs with ids and typo rates."""
+        pairs = list(iter_pairs(DATA_DIR / 'sentence_pairs_for_analysis.txt'))
+        assert len(pairs) == 21
+        assert pairs[0]['id'] == 1 and pairs[0]['typo_rate'] == 20
+        assert pairs[-1]['typo_rate'] == 50
+        assert all(p['original'] and p['final'] for p in pairs)
+
+    def test_sentence_files(self):
+        """The sentence_XX files should pair up by number, in order."""
+        pairs = list(iter_pairs(DATA_DIR))
+        assert [p['id'] for p in pairs] == list(range(1, 22))
+        assert pairs[0]['original'].startswith("The ancient library")
+        assert pairs[0]['final'].startswith("The ancent library")
+
+    def test_sentence_files_typo_rates(self):
+        """Typo rates should come from the analysis file in the same directory."""
+        rates = [p['typo_rate'] for p in iter_pairs(DATA_DIR)]
+        expected = [p['typo_rate'] for p in iter_pairs(DATA_DIR / 'sentence_pairs_for_analysis.txt')]
+        assert rates == expected
+        assert rates[:3] == [20, 20, 20] and rates[-1] == 50
+
+
+class TestFileFormats:
+    """Tests for JSONL and CSV sources."""
+
+    def test_jsonl(self, tmp_path):
+        """JSONL records should keep optional fields and default the id."""
+        path = tmp_path / 'pairs.jsonl'
+        path.write_text(json.dumps({'original': 'a', 'final': 'b', 'typo_rate': 30, 'domain': 'X'})
+                        + '\n\n' + json.dumps({'id': 'p2', 'original': 'c', 'final': 'd'}) + '\n',
+                        encoding='utf-8')
+        first, second = iter_pairs(path)
+        assert first == {'id': 1, 'typo_rate': 30, 'domain': 'X', 'original': 'a', 'final': 'b'}
+        assert second['id'] == 'p2' and second['typo_rate'] is None
+
+    def test_csv(self, tmp_path):
+        """CSV rows should parse numeric ids and rates, with commas in quoted text."""
+        path = tmp_path / 'pairs.csv'
+        path.write_text('id,typo_rate,domain,original,final\n'
+                        '7,25,Physics,"Hello, world",Hi\n'
+                        '8,,,"x","y"\n', encoding='utf-8')
+        pairs = list(iter_pairs(path))
+        assert pairs[0]['id'] == 7 and pairs[0]['typo_rate'] == 25
+        assert pairs[0]['original'] == "Hello, world"
+        assert pairs[1]['typo_rate'] is None and pairs[1]['domain'] is None
+
+    def test_missing_field(self, tmp_path):
+        """A record without original/final should be rejected."""
+        path = tmp_path / 'pairs.jsonl'
+        path.write_text(json.dumps({'original': 'only'}) + '\n', encoding='utf-8')
+        with pytest.raises(ValueError):
+            list(iter_pairs(path))
+
+    def test_unpaired_sentence_file_skipped(self, tmp_path):
+        """An original without a corrupted partner should be skipped."""
+        (tmp_path / 'sentence_01_original.txt').write_text('a', encoding='utf-8')
+        (tmp_path / 'sentence_01_corrupted.txt').write_text('b', encoding='utf-8')
+        (tmp_path / 'sentence_02_original.txt').write_text('c', encoding='utf-8')
+        assert [p['id'] for p in iter_sentence_file_pairs(tmp_path)] == [1]
+
+    def test_sentence_files_without_rates(self, tmp_path):
+        """Without an analysis file, or for ids it lacks, the typo rate should be None."""
+        for i in (1, 2):
+            (tmp_path / f'sentence_0{i}_original.txt').write_text('a', encoding='utf-8')
+            (tmp_path / f'sentence_0{i}_corrupted.txt').write_text('b', encoding='utf-8')
+        assert [p['typo_rate'] for p in iter_sentence_file_pairs(tmp_path)] == [None, None]
+
+        (tmp_path / 'sentence_pairs_for_analysis.txt').write_text('01|35|a|b\n', encoding='utf-8')
+        assert [p['typo_rate'] for p in iter_sentence_file_pairs(tmp_path)] == [35, None]
+
+
+class TestDetectionAndChunking:
+    """Tests for detect_format and iter_pair_chunks."""
+
+    def test_detect_format(self, tmp_path):
+        """Formats should be detected from suffixes and directories."""
+        assert detect_format(tmp_path) == 'sentence-files'
+        assert detect_format(tmp_path / 'a.jsonl') == 'jsonl'
+        assert detect_format(tmp_path / 'a.csv') == 'csv'
+        assert detect_format(tmp_path / 'a.txt') == 'pipe'
+        with pytest.raises(ValueError):
+            detect_format(tmp_path / 'a.parquet')
+
+    def test_unknown_format(self, tmp_path):
+        """An explicit unknown format should be rejected."""
+        with pytest.raises(ValueError):
+            iter_pairs(tmp_path / 'a.txt', fmt='xml')
+
+    def test_chunks_are_lazy_and_bounded(self):
+        """Chunks should be bounded and pull from the source only as needed."""
+        consumed = []
+
+        def source():
+            for i in range(10):
+                consumed.append(i)
+                yield {'id': i}
+
+        chunks = iter_pair_chunks(source(), 4)
+        assert [p['id'] for p in next(chunks)] == [0, 1, 2, 3]
+        assert len(consumed) == 4
+        assert [len(c) for c in chunks] == [4, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,186 @@
+"""
+Unit tests for parallel_encoding.py
+
+Tests cover:
+- Shard splitting and CPU detection
+- Pre-fork pool result ordering and worker usage
+- Per-pair error handling in distance shards
+- Automatic pool sizing, spawn workers and the speedup report
+"""
+import pytest
+import os
+import sys
+import time
+import numpy as np
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from parallel_encoding import (
+    PreforkPool,
+    available_cpu_count,
+    compute_embeddings,
+    compute_pair_distances,
+    is_fork_available,
+    measure_speedup,
+    plan_workers,
+    split_into_shards
+)
+
+
+class FakeModel:
+    """Deterministic bag-of-characters encoder."""
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        if any(t == 'BAD' for t in texts):
+            raise ValueError("bad input")
+        vectors = np.zeros((len(texts), 384), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for ch in text.encode('utf-8'):
+                vectors[row, ch % 384] += 1.0
+            vectors[row, 383] += 1.0
+        return vectors
+
+
+def shard_pids(model, items):
+    """Shard function reporting the worker pid for each item."""
+    time.sleep(0.05)  # keep one worker from draining every shard
+    return [(item, os.getpid()) for item in items]
+
+
+def reference_distance(text1, text2):
+    emb = FakeModel().encode([text1, text2])
+    return float(1 - emb[0] @ emb[1] / (np.linalg.norm(emb[0]) * np.linalg.norm(emb[1])))
+
+
+class TestHelpers:
+    """Tests for shard splitting and CPU detection."""
+
+    def test_split_preserves_order(self):
+        """Shards concatenated should equal the input."""
+        items = list(range(10))
+        shards = split_into_shards(items, 3)
+        assert [x for shard in shards for x in shard] == items
+        assert [len(s) for s in shards] == [4, 3, 3]
+
+    def test_split_more_shards_than_items(self):
+        """Should not create empty shards."""
+        assert len(split_into_shards([1, 2], 8)) == 2
+
+    def test_available_cpu_count_positive(self):
+        """Should report at least one CPU."""
+        assert available_cpu_count() >= 1
+
+
+class TestPreforkPool:
+    """Tests for PreforkPool."""
+
+    @pytest.mark.skipif(not is_fork_available(), reason="fork not available")
+    def test_results_in_input_order(self):
+        """Results should come back in input order across workers."""
+        items = list(range(50))
+        with PreforkPool(model=FakeModel(), num_workers=4, threads_per_worker=1) as pool:
+            results = pool.map_shards(shard_pids, items)
+        assert [item for item, _ in results] == items
+
+    @pytest.mark.skipif(not is_fork_available(), reason="fork not available")
+    def test_uses_multiple_processes(self):
+        """Work should be spread across forked workers."""
+        with PreforkPool(model=FakeModel(), num_workers=3, threads_per_worker=1) as pool:
+            results = pool.map_shards(shard_pids, list(range(30)))
+        pids = {pid for _, pid in results}
+        assert os.getpid() not in pids
+        assert len(pids) > 1
+
+    def test_single_worker_runs_in_process(self):
+        """One worker should not fork."""
+        with PreforkPool(model=FakeModel(), num_workers=1) as pool:
+            results = pool.map_shards(shard_pids, [1, 2, 3])
+        assert {pid for _, pid in results} == {os.getpid()}
+
+    def test_empty_input(self):
+        """Empty input should return an empty list."""
+        with PreforkPool(model=FakeModel(), num_workers=2) as pool:
+            assert pool.map_shards(shard_pids, []) == []
+
+
+class TestComputePairDistances:
+    """Tests for compute_pair_distances."""
+
+    def test_matches_reference(self):
+        """Distances should match a direct calculation, in order."""
+        pairs = [("Hello world", "Hello there"), ("Cat", "Dog"), ("Same", "Same")] * 5
+        distances = compute_pair_distances(pairs, num_workers=3, threads_per_worker=1,
+                                           model=FakeModel())
+        expected = [reference_distance(a, b) for a, b in pairs]
+        np.testing.assert_allclose(distances, expected, atol=1e-6)
+
+    def test_bad_pair_yields_none(self):
+        """A failing pair should get None without losing its neighbours."""
+        pairs = [("Good", "Fine"), ("BAD", "Fine"), ("Also", "Good")]
+        distances = compute_pair_distances(pairs, num_workers=2, threads_per_worker=1,
+                                           model=FakeModel())
+        assert distances[1] is None
+        assert distances[0] is not None and distances[2] is not None
+
+
+class TestComputeEmbeddings:
+    """Tests for compute_embeddings."""
+
+    def test_order_and_failures(self):
+        """Embeddings come back in order; a failing text gets None."""
+        texts = ["one", "BAD", "three", "four"]
+        embeddings = compute_embeddings(texts, num_workers=2, threads_per_worker=1,
+                                        model=FakeModel())
+        assert embeddings[1] is None
+        np.testing.assert_array_equal(embeddings[3], FakeModel().encode(["four"])[0])
+
+
+class TestAutoSizing:
+    """Tests for plan_workers and num_workers='auto'."""
+
+    def test_one_worker_per_cpu_for_large_jobs(self):
+        """Large jobs should use every CPU as a single-threaded worker."""
+        assert plan_workers(100000, cpus=32) == (32, 1)
+
+    def test_small_jobs_use_fewer_workers(self):
+        """Small jobs should use fewer workers with more threads each."""
+        workers, threads = plan_workers(100, cpus=32, min_items_per_worker=25)
+        assert (workers, threads) == (4, 8)
+        assert plan_workers(3, cpus=32) == (1, 32)
+
+    def test_auto_matches_reference(self):
+        """The automatic layout should return the same results in order."""
+        texts = [f"text number {i}" for i in range(100)]
+        embeddings = compute_embeddings(texts, num_workers='auto', model=FakeModel())
+        np.testing.assert_array_equal(np.stack(embeddings), FakeModel().encode(texts))
+
+
+class TestSpawnWorkers:
+    """Tests for workers that hold their own model."""
+
+    def test_spawn_matches_reference(self):
+        """Spawned workers with a pickled model should give the same results."""
+        texts = ["alpha", "beta", "gamma", "delta", "epsilon"]
+        embeddings = compute_embeddings(texts, num_workers=2, threads_per_worker=1,
+                                        model=FakeModel(), start_method='spawn')
+        np.testing.assert_array_equal(np.stack(embeddings), FakeModel().encode(texts))
+
+
+class TestMeasureSpeedup:
+    """Tests for measure_speedup."""
+
+    def test_report_fields(self):
+        """The report should include both timings and their ratio."""
+        report = measure_speedup([f"text {i}" for i in range(20)], num_workers=2,
+                                 threads_per_worker=1, model=FakeModel())
+        assert report['num_workers'] == 2 and report['texts'] == 20
+        assert report['single_process_seconds'] > 0 and report['parallel_seconds'] > 0
+        assert report['speedup'] == pytest.approx(
+            report['single_process_seconds'] / report['parallel_seconds'])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
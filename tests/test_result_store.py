@@ -0,0 +1,148 @@
+"""
+Unit tests for result_store.py
+
+Tests cover:
+- Round trip of rows and embeddings through the store
+- Lazy, memory-mapped subset reads
+- Missing values and failed embeddings
+- Appending after committed rows and dropping uncommitted bytes
+- Table export
+"""
+import pytest
+import sys
+import numpy as np
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from result_store import ResultStore, ResultStoreWriter, export_table, read_meta
+
+DIM = 8
+
+
+def make_rows(start, n):
+    records = [{'id': i, 'typo_rate': 20 + 5 * (i % 7), 'domain': f"Domain {i % 3}",
+                'distance': i / 100.0} for i in range(start, start + n)]
+    rng = np.random.default_rng(start)
+    return records, rng.random((n, DIM), dtype=np.float32), rng.random((n, DIM), dtype=np.float32)
+
+
+class TestRoundTrip:
+    """Tests for writing and reading a store."""
+
+    def test_rows_and_embeddings(self, tmp_path):
+        """Everything written should read back exactly, across chunks."""
+        first, second = make_rows(0, 5), make_rows(5, 3)
+        with ResultStoreWriter(tmp_path) as writer:
+            writer.append(*first)
+            writer.append(*second)
+
+        store = ResultStore(tmp_path)
+        assert len(store) == 8 and store.dim == DIM
+        np.testing.assert_array_equal(store.embeddings('final'), np.vstack([first[2], second[2]]))
+        assert store.to_results() == first[0] + second[0]
+
+    def test_subset_is_memmapped(self, tmp_path):
+        """Columns should be memmaps and subsets should pick the right rows."""
+        records, original, final = make_rows(0, 10)
+        with ResultStoreWriter(tmp_path) as writer:
+            writer.append(records, original, final)
+
+        store = ResultStore(tmp_path)
+        assert isinstance(store.embeddings('original'), np.memmap)
+        subset = store.select([2, 7], columns=('id', 'distance', 'original'))
+        assert subset['id'] == [2, 7]
+        np.testing.assert_array_equal(subset['original'], original[[2, 7]])
+        assert store.select(store.distance > 0.05, columns=('id',))['id'] == [6, 7, 8, 9]
+
+    def test_missing_values(self, tmp_path):
+        """None distances, rates and embeddings should survive the round trip."""
+        records = [{'id': 'a', 'typo_rate': None, 'domain': None, 'distance': None},
+                   {'id': 'b', 'typo_rate': 12.5, 'domain': 'X', 'distance': 0.25}]
+        with ResultStoreWriter(tmp_path) as writer:
+            writer.append(records, [None, np.ones(DIM)], [None, np.ones(DIM)])
+
+        store = ResultStore(tmp_path)
+        assert store.to_results() == records
+        np.testing.assert_array_equal(store.embeddings('original')[0], np.zeros(DIM))
+
+    def test_no_store(self, tmp_path):
+        """Opening an empty directory should fail clearly."""
+        with pytest.raises(FileNotFoundError):
+            ResultStore(tmp_path)
+
+
+class TestAppend:
+    """Tests for committing and reopening."""
+
+    def test_reopen_appends(self, tmp_path):
+        """overwrite=False should continue after the committed rows."""
+        with ResultStoreWriter(tmp_path) as writer:
+            writer.append(*make_rows(0, 4))
+        with ResultStoreWriter(tmp_path, overwrite=False) as writer:
+            writer.append(*make_rows(4, 2))
+        assert ResultStore(tmp_path).ids == list(range(6))
+
+    def test_uncommitted_bytes_dropped(self, tmp_path):
+        """Bytes past the committed row count (a crashed append) should be discarded."""
+        with ResultStoreWriter(tmp_path) as writer:
+            writer.append(*make_rows(0, 4))
+        with open(tmp_path / 'final.f32', 'ab') as f:
+            f.write(b'\0' * 100)
+        with open(tmp_path / 'labels.jsonl', 'a', encoding='utf-8') as f:
+            f.write('[99, "partial"]\n')
+
+        with ResultStoreWriter(tmp_path, overwrite=False) as writer:
+            writer.append(*make_rows(4, 1))
+        store = ResultStore(tmp_path)
+        assert store.ids == [0, 1, 2, 3, 4]
+        assert (tmp_path / 'final.f32').stat().st_size == 5 * DIM * 4
+
+    def test_overwrite_clears_meta(self, tmp_path):
+        """A new writer should hide the old store until it commits."""
+        with ResultStoreWriter(tmp_path) as writer:
+            writer.append(*make_rows(0, 4))
+        writer = ResultStoreWriter(tmp_path)
+        assert read_meta(tmp_path) is None
+        writer.close()
+        assert len(ResultStore(tmp_path)) == 0
+
+    def test_shape_mismatch(self, tmp_path):
+        """Embeddings of the wrong shape should be rejected."""
+        records, original, final = make_rows(0, 3)
+        with ResultStoreWriter(tmp_path, dim=DIM) as writer:
+            with pytest.raises(ValueError):
+                writer.append(records, original[:2], final)
+
+
+class TestExport:
+    """Tests for export_table."""
+
+    def test_npz(self, tmp_path):
+        """The npz export should hold every column."""
+        records, original, final = make_rows(0, 3)
+        with ResultStoreWriter(tmp_path / 'store') as writer:
+            writer.append(records, original, final)
+
+        path = export_table(ResultStore(tmp_path / 'store'), tmp_path / 'results.npz')
+        data = np.load(path)
+        np.testing.assert_array_equal(data['final_embedding'], final)
+        assert list(data['id']) == ['0', '1', '2']
+
+    def test_parquet(self, tmp_path):
+        """The Parquet export should hold fixed-size embedding lists."""
+        pq = pytest.importorskip('pyarrow.parquet')
+        records, original, final = make_rows(0, 3)
+        with ResultStoreWriter(tmp_path / 'store') as writer:
+            writer.append(records, original, final)
+
+        path = export_table(ResultStore(tmp_path / 'store'), tmp_path / 'results.parquet')
+        table = pq.read_table(path)
+        assert table.num_rows == 3
+        np.testing.assert_allclose(table.column('final_embedding')[1].as_py(), final[1])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
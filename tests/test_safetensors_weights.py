@@ -0,0 +1,179 @@
+"""
+Unit tests for safetensors_weights.py
+
+Tests cover:
+- Weight file detection (safetensors or pytorch_model.bin)
+- Header parsing without the safetensors package
+- Memory-mapped state dicts and parameter attachment (needs torch)
+- Building the model from the mapping, with fallbacks for older
+  sentence-transformers and failed builds
+"""
+import pytest
+import sys
+import json
+import struct
+import tempfile
+import numpy as np
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+import safetensors_weights
+from safetensors_weights import (
+    find_weights_file,
+    has_model_weights,
+    load_with_mmap_weights,
+    read_safetensors_header
+)
+
+
+def write_safetensors(path, tensors):
+    """Write a minimal safetensors file from float32 numpy arrays."""
+    header, offset, blobs = {}, 0, []
+    for name, array in tensors.items():
+        data = np.ascontiguousarray(array, dtype=np.float32).tobytes()
+        header[name] = {'dtype': 'F32', 'shape': list(array.shape),
+                        'data_offsets': [offset, offset + len(data)]}
+        offset += len(data)
+        blobs.append(data)
+    header['__metadata__'] = {'format': 'pt'}
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 8)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+
+
+@pytest.fixture
+def model_dir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield Path(tmpdir)
+
+
+class TestWeightFileDetection:
+    """Tests for locating weight files."""
+
+    def test_no_weights(self, model_dir):
+        """Empty directory has no weights."""
+        assert not has_model_weights(model_dir)
+        assert find_weights_file(model_dir) is None
+
+    def test_bin_only(self, model_dir):
+        """pytorch_model.bin alone is accepted."""
+        (model_dir / 'pytorch_model.bin').write_bytes(b'')
+        assert find_weights_file(model_dir).name == 'pytorch_model.bin'
+
+    def test_prefers_safetensors(self, model_dir):
+        """model.safetensors is preferred when both exist."""
+        (model_dir / 'pytorch_model.bin').write_bytes(b'')
+        (model_dir / 'model.safetensors').write_bytes(b'')
+        assert find_weights_file(model_dir).name == 'model.safetensors'
+
+
+class TestHeaderParsing:
+    """Tests for read_safetensors_header."""
+
+    def test_reads_entries_and_data_offset(self, model_dir):
+        """Header should list tensors and drop metadata."""
+        path = model_dir / 'model.safetensors'
+        write_safetensors(path, {'a': np.zeros((2, 3)), 'b': np.ones(4)})
+        header, data_start = read_safetensors_header(path)
+        assert set(header) == {'a', 'b'}
+        assert header['a']['shape'] == [2, 3]
+        assert data_start % 8 == 0
+        assert path.stat().st_size == data_start + (6 + 4) * 4
+
+
+class TestMemoryMapping:
+    """Tests for mmap-backed tensors (require torch)."""
+
+    def test_mmap_state_dict_values(self, model_dir):
+        """Mapped tensors should hold the file's values."""
+        torch = pytest.importorskip('torch')
+        from safetensors_weights import mmap_state_dict
+
+        path = model_dir / 'model.safetensors'
+        weight = np.arange(12, dtype=np.float32).reshape(3, 4)
+        write_safetensors(path, {'linear.weight': weight})
+        state = mmap_state_dict(path)
+        np.testing.assert_array_equal(state['linear.weight'].numpy(), weight)
+
+    def test_attach_mmap_weights(self, model_dir):
+        """Parameters should be replaced by mapped tensors with identical output."""
+        torch = pytest.importorskip('torch')
+        from safetensors_weights import attach_mmap_weights
+
+        module = torch.nn.Linear(4, 3)
+        path = model_dir / 'model.safetensors'
+        write_safetensors(path, {
+            'linear.weight': module.weight.detach().numpy(),
+            'linear.bias': module.bias.detach().numpy(),
+        })
+        x = torch.randn(2, 4)
+        expected = module(x)
+
+        assert attach_mmap_weights(module, path) == 2
+        torch.testing.assert_close(module(x), expected)
+
+
+class FakeSentenceTransformer:
+    """Records constructor arguments like SentenceTransformer >= 2.3."""
+
+    def __init__(self, model_name_or_path, device=None, model_kwargs=None):
+        self.path, self.device, self.model_kwargs = model_name_or_path, device, model_kwargs
+
+
+class OldSentenceTransformer:
+    """SentenceTransformer < 2.3: no model_kwargs."""
+
+    def __init__(self, model_name_or_path, device=None):
+        self.path = model_name_or_path
+
+
+class TestLoadWithMmapWeights:
+    """Tests for building the model from mapped weights."""
+
+    @pytest.fixture
+    def mapped(self, model_dir, monkeypatch):
+        (model_dir / 'model.safetensors').write_bytes(b'')
+        state = {'encoder.weight': object()}
+        monkeypatch.setattr(safetensors_weights, 'mmap_state_dict', lambda path: state)
+        monkeypatch.delenv('MODEL_MMAP_WEIGHTS', raising=False)
+        return state
+
+    def test_builds_from_mapping(self, model_dir, mapped):
+        """The mapped state dict should be passed to from_pretrained, before any weights are read."""
+        model = load_with_mmap_weights(FakeSentenceTransformer, model_dir, verbose=False)
+        assert model.model_kwargs['state_dict'] is mapped
+        assert model.model_kwargs['low_cpu_mem_usage'] is True
+
+    def test_disabled(self, model_dir, mapped, monkeypatch):
+        """MODEL_MMAP_WEIGHTS=0 should load a private copy."""
+        monkeypatch.setenv('MODEL_MMAP_WEIGHTS', '0')
+        assert load_with_mmap_weights(FakeSentenceTransformer, model_dir, verbose=False).model_kwargs is None
+
+    def test_build_failure_falls_back(self, model_dir, mapped, monkeypatch):
+        """A failed build from the mapping should retry with a regular load."""
+        class Picky(FakeSentenceTransformer):
+            def __init__(self, path, device=None, model_kwargs=None):
+                if model_kwargs:
+                    raise RuntimeError("unexpected keys")
+                super().__init__(path, device)
+
+        assert load_with_mmap_weights(Picky, model_dir, verbose=False).model_kwargs is None
+
+    def test_old_sentence_transformers_attaches(self, model_dir, mapped, monkeypatch):
+        """Without model_kwargs the weights are attached after a regular load."""
+        attached = []
+        monkeypatch.setattr(safetensors_weights, 'use_mmap_weights',
+                            lambda model, path, verbose=True: attached.append(model))
+        model = load_with_mmap_weights(OldSentenceTransformer, model_dir, verbose=False)
+        assert attached == [model]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,156 @@
+"""
+Unit tests for streaming_stats.py
+
+Tests cover:
+- Batched Welford moments against NumPy
+- Quantile sketch accuracy, including zero and negative values
+- Exact, order-independent merging of per-worker statistics
+- Per-group summaries in group_stats() form
+"""
+import pytest
+import sys
+import numpy as np
+from pathlib import Path
+
+# Add project root to path
+base_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(base_dir))
+
+from drift_stats import group_stats
+from streaming_stats import QuantileSketch, RunningStats, StreamingGroupStats
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    values = rng.gamma(2.0, 0.2, size=20000)
+    rates = rng.choice([20, 25, 30, 35], size=20000)
+    return values, rates
+
+
+class TestRunningStats:
+    """Tests for RunningStats."""
+
+    def test_moments_match_numpy(self, data):
+        """Batched updates should give NumPy's mean, std, min and max."""
+        values, _ = data
+        stats = RunningStats()
+        for start in range(0, len(values), 777):
+            stats.update(values[start:start + 777])
+        assert stats.n == len(values)
+        assert stats.mean == pytest.approx(values.mean(), rel=1e-12)
+        assert stats.std == pytest.approx(values.std(), rel=1e-10)
+        assert stats.min == values.min() and stats.max == values.max()
+
+    def test_nan_ignored(self):
+        """NaN values should not count."""
+        stats = RunningStats()
+        stats.update([0.2, np.nan, 0.4])
+        assert stats.n == 2 and stats.mean == pytest.approx(0.3)
+
+    def test_summary_quantiles_within_accuracy(self, data):
+        """Median and percentiles should be within the sketch's relative accuracy."""
+        values, _ = data
+        stats = RunningStats(relative_accuracy=0.01)
+        stats.update(values)
+        summary = stats.summary(percentiles=(10, 25, 75, 90))
+        assert summary['median'] == pytest.approx(np.median(values), rel=0.011)
+        for q in (10, 25, 75, 90):
+            assert summary[f"p{q}"] == pytest.approx(np.percentile(values, q), rel=0.011)
+
+    def test_empty_summary(self):
+        """An empty RunningStats should refuse to summarize."""
+        with pytest.raises(ValueError):
+            RunningStats().summary()
+
+
+class TestQuantileSketch:
+    """Tests for QuantileSketch."""
+
+    def test_zero_and_negative_values(self):
+        """Zero and negative values should be ranked correctly."""
+        sketch = QuantileSketch()
+        sketch.update([-0.5, -0.1, 0.0, 0.0, 0.3])
+        low, middle, high = sketch.quantiles([0.0, 0.5, 1.0])
+        assert low == pytest.approx(-0.5, rel=0.005)
+        assert middle == 0.0
+        assert high == pytest.approx(0.3, rel=0.005)
+
+    def test_merge_is_exact(self, data):
+        """Merged sketches should equal one sketch of all the values, in any order."""
+        values, _ = data
+        whole = QuantileSketch()
+        whole.update(values)
+        parts = [QuantileSketch() for _ in range(3)]
+        for part, chunk in zip(parts, np.array_split(values, 3)):
+            part.update(chunk)
+        merged = parts[2]
+        merged.merge(parts[0])
+        merged.merge(parts[1])
+        qs = np.linspace(0, 1, 21)
+        np.testing.assert_array_equal(merged.quantiles(qs), whole.quantiles(qs))
+
+    def test_merge_mismatch(self):
+        """Sketches with different accuracy should not merge."""
+        with pytest.raises(ValueError):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+    def test_memory_independent_of_count(self):
+        """The number of buckets should depend on the value range, not the count."""
+        rng = np.random.default_rng(1)
+        sketch = QuantileSketch(relative_accuracy=0.005)
+        for _ in range(20):
+            sketch.update(rng.uniform(0.01, 2.0, size=10000))
+        # log(2 / 0.01) / log(1.005 / 0.995) buckets cover [0.01, 2]
+        assert len(sketch._positive.counts) <= 532
+        assert sketch.count == 200000
+
+
+class TestStreamingGroupStats:
+    """Tests for StreamingGroupStats."""
+
+    def test_matches_group_stats(self, data):
+        """Streamed group summaries should match group_stats."""
+        values, rates = data
+        stats = StreamingGroupStats()
+        for start in range(0, len(values), 1000):
+            stats.update(values[start:start + 1000], rates[start:start + 1000])
+        expected = group_stats(values, rates)
+        summary = stats.summary()
+        assert list(summary) == list(expected)
+        for rate, group in summary.items():
+            assert group['n'] == expected[rate]['n']
+            assert group['mean'] == pytest.approx(expected[rate]['mean'])
+            assert group['std'] == pytest.approx(expected[rate]['std'])
+            assert group['median'] == pytest.approx(expected[rate]['median'], rel=0.006)
+            assert group['p75'] == pytest.approx(expected[rate]['p75'], rel=0.006)
+
+    def test_worker_merge(self, data):
+        """Per-worker statistics should merge into the single-process result."""
+        values, rates = data
+        single, first, second = StreamingGroupStats(), StreamingGroupStats(), StreamingGroupStats()
+        single.update(values, rates)
+        first.update(values[:5000], rates[:5000])
+        second.update(values[5000:], rates[5000:])
+        first.merge(second)
+        assert first.overall.n == single.overall.n
+        for rate, group in single.summary().items():
+            merged = first.summary()[rate]
+            assert merged['n'] == group['n'] and merged['median'] == group['median']
+            assert merged['mean'] == pytest.approx(group['mean'], rel=1e-12)
+
+    def test_missing_keys_only_overall(self):
+        """Rows without a key should count only towards the overall statistics."""
+        stats = StreamingGroupStats()
+        stats.update([0.1, 0.2, 0.3], [20, None, 20])
+        assert stats.overall.n == 3
+        assert stats.summary()[20]['n'] == 2
+
+    def test_length_mismatch(self):
+        """Values and keys of different lengths should be rejected."""
+        with pytest.raises(ValueError):
+            StreamingGroupStats().update([0.1, 0.2], [20])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])